@@ -1,7 +1,7 @@
 # beta version of zoning projector app
 import streamlit as st
 import pandas as pd
-import sim, projector_summary
+import sim, widgets, plots, projector_summary, profiling, montecarlo, policy_solver, export, scenario_store, cohorts, impacts
 
 st.set_page_config(page_title="Zoning Projector", layout="wide")
 
@@ -38,12 +38,51 @@ else:
 
 st.caption("Version 0.94.8.19 'Meurman'")
 
-tab1, tab2 = st.tabs(["Projektori","Dokumentaatio"] if lin==0 else ["Projector","Documentation"])
+# ----------- FRAGMENTS ------------
+# A widget change reruns only the fragment holding the widget: conceptor sliders
+# rerun the projector, panel inputs only their panel. Header, tabs and the
+# documentation render on full runs only (first load, language change).
 
-with tab1:
+def fmt(x): return f"{int(x):,}".replace(",", " ")
+
+
+def simulate(params, profile=False):
+    """
+    main_sim of the conceptor params, kept in session state: reruns that do not
+    change the normalized args (other widgets, slider released on the same
+    value) reuse the last result instead of simulating again.
+    Profiled runs bypass the result cache, so every stage is measured.
+    """
+    key = sim.args_hash(dict(params, engine="listsched"))
+    last = st.session_state.get("simulation")
+    if last is None or last["hash"] != key or profile:
+        last = sim.main_sim(args=params, engine="listsched", output="table", cache=not profile, aggregate=True, profile=profile) #move to API later
+        last["hash"] = key   # main_sim hashes only with cache on
+        st.session_state["simulation"] = last
+    return last
+
+
+# Monte Carlo bands (seeded, so cached per params)
+@st.cache_data(max_entries=16)
+def uncertainty_bands(params):
+    return montecarlo.main_sim_mc({**params, "engine": "listsched"}, replications=2000, seed=0)
+
+
+@st.cache_resource
+def open_store():
+    return scenario_store.ScenarioStore()
+
+
+@st.cache_data
+def documentation(lin):
+    return projector_summary.projector_summary(lin=lin)
+
+
+@st.fragment
+def projector(lin):
 
     # Conceptor ..basic and enhanced
-    residential_buildings_dict, my_unit_size_policy, pre_con_sim_time, num_comp, house_hold_shares_estimates, avg_family_size, apartment_efficiency_factor = sim.conceptor(lin=lin)
+    residential_buildings_dict, my_unit_size_policy, pre_con_sim_time, num_comp, house_hold_shares_estimates, avg_family_size, apartment_efficiency_factor = widgets.conceptor(lin=lin)
     
     my_params = {
         "buildings": residential_buildings_dict,
@@ -56,21 +95,45 @@ with tab1:
         "apt_efficiency": apartment_efficiency_factor
     }
 
-    CONSIM_respond = sim.main_sim(args=my_params) #move to API later
-    sim_df = pd.DataFrame(CONSIM_respond.get('body'))
+    # opt-in profiling with ?profile=1
+    profile = st.query_params.get("profile") == "1"
+    app_profiler = profiling.Profiler() if profile else profiling.NULL_PROFILER
+
+    CONSIM_respond = simulate(my_params, profile=profile)
+    # yearly (year, type) totals feed the plot, the metric and the download
+    cube = CONSIM_respond.get('cube')
+
+    uncertainty_text = ["Epävarmuusvyöhykkeet (P10-P90)", "Uncertainty bands (P10-P90)"]
+    uncertainty_help = ["Monte Carlo -simulointi vaihtelee rakennusaikoja, suunnitteluaikaa ja kotitalousjakaumia.",
+                        "Monte Carlo simulation varies construction durations, pre-construction time and household distributions."]
+    cohort_text = ["Ikääntyminen ja vaihtuvuus", "Aging and turnover"]
+    cohort_help = ["Kohorttimalli: asukkaat ikääntyvät, syntyvyys ja poismuutto huomioidaan vuosittain muuttoon asti ja sen jälkeen.",
+                   "Cohort model: residents age, and births and move-outs are accounted for year by year after move-in."]
+    resolution_names = {"year": ["Vuosi", "Year"], "quarter": ["Neljännes", "Quarter"], "month": ["Kuukausi", "Month"]}
+    c1, c2, c3 = st.columns([1, 1, 1], vertical_alignment="center")
+    show_cohorts = c2.toggle(cohort_text[lin], value=False, help=cohort_help[lin])
+    show_bands = c1.toggle(uncertainty_text[lin], value=False, help=uncertainty_help[lin], disabled=show_cohorts)
+    resolution = c3.segmented_control("Aikajako" if lin==0 else "Resolution", list(sim.RESOLUTIONS),
+                                      format_func=lambda r: resolution_names[r][lin], default="year",
+                                      label_visibility="collapsed") or "year"
+    # quarters / months are resampled from the completion days of the same run
+    timeline = cube if resolution == "year" else sim.aggregate(CONSIM_respond['body'], resolution)
 
     with st.container(border=True):
-        st.plotly_chart(sim.simulation_plot(sim_df,lin=options[selection]), use_container_width=True, config = {'displayModeBar': False})
+        with app_profiler.stage("plot"):
+            bands = uncertainty_bands(my_params) if show_bands and not show_cohorts else None
+            residents = cohorts.cohort_projection(cube) if show_cohorts else None
+            fig = plots.cached_simulation_plot(CONSIM_respond['hash'], timeline, lin=lin, bands=bands, cohorts=residents)
+        st.plotly_chart(fig, use_container_width=True, config = {'displayModeBar': False})
         
-        #st.dataframe(sim_df)#[['avg_unit_size','families','singles','other']].describe(), use_container_width=True)
+        #st.dataframe(CONSIM_respond.get('body').to_frame())#[['avg_unit_size','families','singles','other']].describe(), use_container_width=True)
         
         cols = ['families', 'singles', 'other']
-        pop_sum = sim_df[cols].sum().sum()
-        gfa_sum = sim_df['volume'].sum()
-        def fmt(x): return f"{int(x):,}".replace(",", " ")
-        gfa_sum = fmt(gfa_sum)
+        pop_sum = int(sum(cube.totals(col).sum() for col in cols))
+        gfa_sum = fmt(cube.totals('volume').sum())
 
-        con_time_tot = sim_df[sim_df['volume']>0]['con_year'].max() - (sim_df[sim_df['volume']>0]['con_year'].min() -1)
+        active_years = cube.active_years()
+        con_time_tot = active_years.max() - (active_years.min() -1)
         metric_title = [f" {tot_pop_metric_text[lin]} ({con_time_tot}v)",
                         f" {tot_pop_metric_text[lin]} ({con_time_tot}yr)"]
         metric_help_text = ["Väestöennuste huomioi eri asuntotyyppien erilaiset kotitalouskoot, jolloin arvio on tarkempi kuin perinteinen kerrosalapohjainen arvio.",
@@ -79,46 +142,155 @@ with tab1:
         
         st.metric(metric_title[lin], value=round(pop_sum,-1),delta=f"{gfa_sum} kem²", help=metric_help_text[lin])
 
-        # DL
-        @st.cache_data
-        def convert_for_download(df):
-            return df.to_csv().encode("utf-8")
-        
-        from datetime import datetime
-        now = datetime.now()
-        date_time = now.strftime("%m/%d/%Y-%H-%M-%S")
-        
-        #concat initial pop levels
-        def get_summary_df(sim_df=None):
-            init_year = sim_df['con_year'].min()
-            data = {
-                'con_year': [init_year-1],  # initial year
-                'families': [0],  # initial count of families
-                'singles': [0],   # initial count of singles
-                'other': [0]  # initial count of others
-            }
-            init_df = pd.DataFrame(data)
-            df = pd.concat([init_df, sim_df]).reset_index(drop=True)
-            return df
-        
-        summary_df = get_summary_df(sim_df.drop(columns=['project_id','avg_unit_size','company']))
-        cols = ['con_year','type','volume','families', 'singles', 'other']
-        summary_df = summary_df[cols].rename(columns={'con_year':'Year','type':'Building Type','volume':'GFA (m²)','families':'Family population','singles':'Single population','other':'Other population'})
-        csv = convert_for_download(summary_df)
-
-        st.download_button(
-            label="Lataa ennuste CSV-tiedostona" if lin==0 else "Download projection as CSV file",
-            data=csv,
-            file_name=f"projector_projection_{date_time}.csv",
-            mime="text/csv",
-            icon=":material/download:",
-            disabled=False
-        )
+        download_panel(timeline, lin)
 
+    if show_cohorts:
+        # school and daycare demand of the aging residents
+        demand_texts = [["Palvelutarve", "Varhaiskasvatus (1-6 v)", "Perusopetus (7-15 v)", "Toinen aste (16-18 v)"],
+                        ["Service demand", "Daycare (1-6 yr)", "School (7-15 yr)", "Upper secondary (16-18 yr)"]]
+        with st.expander(demand_texts[lin][0]):
+            demand = cohorts.band_totals(residents)
+            st.line_chart(pd.DataFrame({
+                demand_texts[lin][1]: demand["daycare"].round(),
+                demand_texts[lin][2]: demand["school"].round(),
+                demand_texts[lin][3]: demand["upper_secondary"].round(),
+            }, index=pd.Index(residents["years"], name="Vuosi" if lin==0 else "Year")))
+
+    # impact indicators (impacts.KERNELS) of the projection
+    impact_names = {
+        "embodied_carbon": ["Rakentamisen hiilijalanjälki", "Embodied carbon"],
+        "operational_carbon": ["Käytön hiilijalanjälki", "Operational carbon"],
+        "daycare_children": ["Varhaiskasvatuksen lapset", "Children in daycare"],
+        "school_pupils": ["Peruskoululaiset", "School pupils"],
+        "transit_trips": ["Joukkoliikennematkat", "Transit trips"],
+        "tax_revenue": ["Kunnallisverotulot", "Municipal tax revenue"],
+    }
+    with st.expander("Vaikutukset" if lin==0 else "Impacts"):
+        # with cohorts on, children come from the cohort model's age bands (as in the service demand)
+        indicators = CONSIM_respond["impacts"]
+        indicator_totals = impacts.totals(indicators, residents, my_params.get("impacts"))
+        st.dataframe(pd.DataFrame({
+            f"{impact_names.get(name, [name, name])[lin]} ({impacts.KERNELS[name]['unit']})": values.round(1)
+            for name, values in indicator_totals.items()
+        }, index=pd.Index(indicators.years, name="Vuosi" if lin==0 else "Year")), use_container_width=True)
+
+    solver_panel(my_params, int(active_years.max()), lin)
+    store_panel(my_params, lin)
+
+    if profile:
+        app_profiler.close()
+        metrics = CONSIM_respond["metrics"]
+        metrics["stages"].update(app_profiler.as_dict()["stages"])
+        with st.expander("Profiling"):
+            st.json(metrics)
+            st.code(profiling.to_prometheus(metrics), language="text")
+
+
+@st.fragment
+def download_panel(cube, lin):
+    # DL: the file is built only when the button is clicked
+    from datetime import datetime
+    now = datetime.now()
+    date_time = now.strftime("%m/%d/%Y-%H-%M-%S")
+    
+    #concat initial pop levels
+    def get_summary_df(sim_df=None):
+        init_year = sim_df['con_year'].min()
+        data = {
+            'con_year': [init_year-1],  # initial year
+            'volume': [0],  # initial GFA
+            'units': [0],  # initial units
+            'families': [0],  # initial count of families
+            'singles': [0],   # initial count of singles
+            'other': [0]  # initial count of others
+        }
+        if 'period' in sim_df:
+            data['period'] = [str(init_year-1)]
+        init_df = pd.DataFrame(data)
+        df = pd.concat([init_df, sim_df]).reset_index(drop=True)
+        return df
+
+    def export_projection(fmt):
+        summary_df = get_summary_df(cube.to_frame())
+        cols = ['con_year','type','volume','units','families', 'singles', 'other']
+        if cube.resolution != "year":
+            cols.insert(1, 'period')
+        summary_df = summary_df[cols].astype({'con_year': 'int64', 'units': 'int64', 'families': 'int64', 'singles': 'int64', 'other': 'int64'})
+        summary_df = summary_df.rename(columns={'con_year':'Year','period':'Period','type':'Building Type','volume':'GFA (m²)','units':'Units','families':'Family population','singles':'Single population','other':'Other population'})
+        return export.to_bytes(summary_df, fmt)
+
+    format_names = {"csv": "CSV", "parquet": "Parquet", "arrow": "Arrow", "xlsx": "Excel"}
+    c1, c2 = st.columns([1, 3], vertical_alignment="bottom")
+    dl_format = c1.selectbox("Tiedostomuoto" if lin==0 else "File format", export.available_formats(),
+                             format_func=format_names.get)
+
+    c2.download_button(
+        label="Lataa ennuste" if lin==0 else "Download projection",
+        data=lambda: export_projection(dl_format),
+        file_name=f"projector_projection_{date_time}.{export.FORMATS[dl_format]['extension']}",
+        mime=export.FORMATS[dl_format]['mime'],
+        icon=":material/download:",
+        on_click="ignore",
+        disabled=False
+    )
+
+
+@st.fragment
+def solver_panel(params, last_year, lin):
+    # policy solver: cheapest unit size policy reaching population targets
+    solver_texts = [
+        ["Väestötavoitteen asuntojakaumapolitiikka", "Tavoitevuosi", "Perheissä asuvat vähintään", "Väestökasvu vähintään", "Etsi politiikka",
+         "Mikään sallittu politiikka ei saavuta tavoitetta.", "Pienten asuntojen osuus enintään {}%, suurten asuntojen osuus vähintään {}% ({} perheissä asuvaa, {} asukasta vuoteen {} mennessä)."],
+        ["Unit size policy for a population target", "Target year", "Family population at least", "Population growth at least", "Find policy",
+         "No feasible policy reaches the target.", "Small units at most {}%, large units at least {}% ({} family population, {} population by {})."],
+    ]
+    with st.expander(solver_texts[lin][0]):
+        c1, c2, c3 = st.columns(3)
+        target_year = c1.number_input(solver_texts[lin][1], value=last_year, step=1)
+        family_target = c2.number_input(solver_texts[lin][2], min_value=0, value=0, step=100)
+        population_target = c3.number_input(solver_texts[lin][3], min_value=0, value=0, step=100)
+        if st.button(solver_texts[lin][4]):
+            solved = policy_solver.solve_policy(params, year=int(target_year),
+                                                families=family_target or None,
+                                                population=population_target or None)
+            if solved["policy"] is None:
+                st.warning(solver_texts[lin][5])
+            else:
+                st.success(solver_texts[lin][6].format(solved["pct_small_max"], solved["pct_large_min"],
+                                                        fmt(solved["families"]), fmt(solved["population"]), solved["year"]))
+
+
+@st.fragment
+def store_panel(params, lin):
+    # scenario store: saved runs survive the session and can be compared
+    store_texts = [
+        ["Tallennetut skenaariot", "Skenaarion nimi", "Tallenna skenaario", "Skenaario tallennettu.", "Skenaario oli jo tallennettu.", "Vertaa skenaarioita"],
+        ["Saved scenarios", "Scenario name", "Save scenario", "Scenario saved.", "Scenario was already saved.", "Compare scenarios"],
+    ]
+    with st.expander(store_texts[lin][0]):
+        store = open_store()
+        c1, c2 = st.columns([3, 1], vertical_alignment="bottom")
+        scenario_label = c1.text_input(store_texts[lin][1])
+        if c2.button(store_texts[lin][2]):
+            stored = store.fetch_or_compute(params, label=scenario_label or None)
+            st.info(store_texts[lin][4] if stored["cached"] else store_texts[lin][3])
+
+        runs = store.query(limit=50)
+        if len(runs):
+            run_names = {h: f"{label or h[:10]} ({created[:16]})" for h, label, created in zip(runs["hash"], runs["label"], runs["created_at"])}
+            compared = st.multiselect(store_texts[lin][5], list(run_names), format_func=run_names.get)
+            if compared:
+                st.line_chart(store.compare(compared))
+                st.dataframe(runs[runs["hash"].isin(compared)].drop(columns=["hash"]), hide_index=True)
+
+
+tab1, tab2 = st.tabs(["Projektori","Dokumentaatio"] if lin==0 else ["Projector","Documentation"])
+
+with tab1:
+    projector(lin)
     
 with tab2:
-    md_text = projector_summary.projector_summary(lin=lin)
-    st.markdown(md_text)
+    st.markdown(documentation(lin))
             
 
 # ----------- FOOTER -----------
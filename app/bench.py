@@ -0,0 +1,199 @@
+# benchmark suite: construction, allocation, aggregation, plotting and main_sim at scale,
+# plus the cold import time of the simulation core
+#   python bench.py                               # 10^2..10^6 projects, writes bench_results.json
+#   python bench.py --sizes 100 10000 --baseline bench_baseline.json
+#   python bench.py --save-baseline bench_baseline.json
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+import plots
+import sim
+
+# project size ranges (GFA m²) as in conceptor()
+SIZE_RANGES = {
+    "one-family-house": (50, 200),
+    "multi-family-house": (200, 2000),
+    "apartment-condo": (2000, 9000),
+}
+POLICY = {"apartment-condo": [50, 30, 25, 70]}
+
+# `import sim` must stay UI-free and within this many seconds
+IMPORT_BUDGET = 0.5
+HEAVY_MODULES = ("streamlit", "plotly", "pandas", "simpy")
+
+
+def synthetic_portfolio(n_projects, seed=0):
+    """
+    n_projects over all three building types with varied project sizes
+    (rounded to 10 m², so groups stay small and every stage sees real work).
+    """
+    rng = np.random.default_rng(seed)
+    types = list(SIZE_RANGES)
+    type_idx = rng.integers(0, len(types), n_projects)
+    buildings = []
+    for i in type_idx.tolist():
+        lo, hi = SIZE_RANGES[types[i]]
+        buildings.append({"type": types[i], "gfa": int(rng.integers(lo, hi) // 10 * 10)})
+    return {
+        "buildings": buildings,
+        "pre_con_time": 2,
+        "num_companies": max(1, n_projects // 200),
+        "base_year": 2030,
+        "engine": "listsched",
+    }
+
+
+def _measure(func, repeat):
+    # one untimed warm-up run (imports, caches), best wall time of `repeat`
+    # runs, then peak traced memory of one more
+    func()
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - t)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, best, peak
+
+
+def run_case(n_projects, policy, repeat=3):
+    args = synthetic_portfolio(n_projects)
+    args["unit_size_policy"] = POLICY if policy else None
+    params = sim.normalize_args(args)
+    case = f"n={n_projects}{'/policy' if policy else ''}"
+    rows = []
+
+    def record(stage, func):
+        result, seconds, peak = _measure(func, repeat)
+        rows.append({
+            "case": case,
+            "stage": stage,
+            "projects": n_projects,
+            "policy": policy,
+            "seconds": seconds,
+            "peak_mb": peak / 2**20,
+            "rows": len(result) if hasattr(result, "__len__") else None,
+        })
+        return result
+
+    constructed = record("construction", lambda: sim._construction_stage(params))
+    allocated = record("allocation", lambda: sim._allocation_stage(params, constructed))
+    cube = record("aggregation", lambda: sim.aggregate(allocated))
+    record("impacts", lambda: sim._impact_stage(params, cube))
+    record("plot", lambda: plots.simulation_plot(cube, lin=1).data)
+    record("main_sim", lambda: sim.main_sim(args, output="table", aggregate=True)["body"])
+    return rows
+
+
+def measure_import(module="sim", repeat=3):
+    """
+    Cold import of module in fresh interpreters: best wall time of repeat
+    runs and the HEAVY_MODULES it pulled in.
+    """
+    code = (
+        "import json, sys, time\n"
+        "t = time.perf_counter()\n"
+        f"import {module}\n"
+        "seconds = time.perf_counter() - t\n"
+        f"print(json.dumps({{'seconds': seconds, 'heavy': [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))"
+    )
+    runs = [
+        json.loads(subprocess.run(
+            [sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True,
+        ).stdout)
+        for _ in range(repeat)
+    ]
+    return {"module": module, "seconds": min(r["seconds"] for r in runs), "heavy": runs[0]["heavy"]}
+
+
+def compare(results, baseline, tolerance, min_seconds):
+    """
+    Rows slower than baseline * (1 + tolerance) (and by more than min_seconds),
+    including the cold import as case 'import', stage <module>.
+    """
+    def import_row(imported):
+        return {"case": "import", "stage": imported["module"], "seconds": imported["seconds"]}
+
+    base = {(r["case"], r["stage"]): r for r in baseline["results"]}
+    rows = list(results["results"])
+    if "import" in baseline and "import" in results:
+        base["import", baseline["import"]["module"]] = import_row(baseline["import"])
+        rows.append(import_row(results["import"]))
+    regressions = []
+    for r in rows:
+        b = base.get((r["case"], r["stage"]))
+        if b is None:
+            continue
+        limit = max(b["seconds"] * (1 + tolerance), b["seconds"] + min_seconds)
+        if r["seconds"] > limit:
+            regressions.append({**r, "baseline_seconds": b["seconds"]})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10**k for k in range(2, 7)])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--baseline", help="fail if slower than this results file")
+    parser.add_argument("--save-baseline", help="also write the results here")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed relative slowdown")
+    parser.add_argument("--min-seconds", type=float, default=0.005, help="ignore smaller slowdowns")
+    parser.add_argument("--import-budget", type=float, default=IMPORT_BUDGET, help="max cold `import sim` seconds")
+    opts = parser.parse_args(argv)
+
+    results = {
+        "meta": {
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+        },
+        "results": [],
+        "import": measure_import(repeat=opts.repeat),
+    }
+    imported = results["import"]
+    print(f"{'import sim':>35} {imported['seconds']*1000:10.2f} ms  heavy modules: {imported['heavy'] or 'none'}")
+    for n in opts.sizes:
+        for policy in (False, True):
+            rows = run_case(n, policy, repeat=opts.repeat)
+            results["results"].extend(rows)
+            for r in rows:
+                print(f"{r['case']:>22} {r['stage']:>12} {r['seconds']*1000:10.2f} ms {r['peak_mb']:9.2f} MB")
+
+    for path in filter(None, (opts.out, opts.save_baseline)):
+        with open(path, "w") as f:
+            json.dump(results, f, indent=1)
+
+    # report every failure before exiting
+    failed = False
+    if opts.baseline:
+        with open(opts.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, opts.tolerance, opts.min_seconds)
+        for r in regressions:
+            print(f"REGRESSION {r['case']} {r['stage']}: "
+                  f"{r['seconds']*1000:.2f} ms vs baseline {r['baseline_seconds']*1000:.2f} ms")
+        failed = bool(regressions)
+
+    if imported["seconds"] > opts.import_budget or imported["heavy"]:
+        print(f"IMPORT BUDGET `import sim`: {imported['seconds']*1000:.2f} ms "
+              f"(budget {opts.import_budget*1000:.0f} ms), heavy modules: {imported['heavy'] or 'none'}")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
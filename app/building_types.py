@@ -0,0 +1,138 @@
+# registry of building types: construction, capacity, efficiency, unit model and households per type
+import numpy as np
+
+# name -> spec; see register() for the fields
+TYPES = {}
+
+# spec of types missing from the registry (apartment logic, like before the registry)
+FALLBACK = {
+    "labels": None, "color": "brown", "constime": 12, "capacity": 1, "efficiency": 0.80,
+    "units": {"model": "apartment"}, "households": None, "conceptor": None,
+}
+
+UNIT_MODELS = ("apartment", "fixed")
+
+
+def register(name, labels, color, constime, capacity, efficiency, units, households, conceptor=None):
+    """
+    Adds (or replaces) a building type.
+
+    Input:
+      labels: [FIN, ENG] chart and table label
+      color: chart color
+      constime: default construction time (months) of a typical project
+      capacity: parallel projects per construction company
+      efficiency: net / gross floor area; None uses the run's apt_efficiency
+      units: unit model
+        - {'model': 'apartment'}: dynamic size mix of allocate_units, unit size policy applies
+        - {'model': 'fixed', 'size': m² per unit or None (one unit per building),
+           'small': share, 'large': share}: the rest of the units are medium
+      households: household distribution of the units; None by unit size
+        (small / medium / large), a household_shares key (e.g. 'family_houses')
+        or an explicit [families, singles, other] percentage list
+      conceptor: optional UI defaults {'titles': ([FIN, ENG] volume, [FIN, ENG] project size),
+        'volume': (default, step), 'project': (min, max, default, step)}
+    """
+    if units["model"] not in UNIT_MODELS:
+        raise ValueError(f"Unknown unit model: {units['model']}")
+    TYPES[name] = {
+        "labels": labels, "color": color, "constime": constime, "capacity": capacity,
+        "efficiency": efficiency, "units": units, "households": households, "conceptor": conceptor,
+    }
+
+
+def spec(name):
+    return TYPES.get(name, FALLBACK)
+
+
+def label(name, lin=1):
+    labels = spec(name)["labels"]
+    return labels[lin] if labels else name
+
+
+def type_codes(labels):
+    """(type names, code per row) of a building type label array."""
+    labels = np.asarray(labels, dtype=object).ravel().tolist()
+    names = {}
+    codes = np.fromiter((names.setdefault(name, len(names)) for name in labels), dtype=np.int64, count=len(labels))
+    return list(names), codes
+
+
+def compile_types(types):
+    """
+    Parameter arrays indexed by type code, so per-row values are gathers
+    (values[codes]) instead of branches on the type label.
+
+    Input:
+      types: type names in code order (e.g. ProjectTable.types)
+    Output:
+      dict of (n types,) arrays: constime, capacity, efficiency (nan: the
+      run's apt_efficiency), apartment (bool), unit_size (0: one unit per
+      building), small, large; and households (list of the registry values)
+    """
+    specs = [spec(name) for name in types]
+    fixed = [s["units"] if s["units"]["model"] == "fixed" else {} for s in specs]
+    return {
+        "constime": np.array([s["constime"] for s in specs], dtype=np.float64),
+        "capacity": np.array([s["capacity"] for s in specs], dtype=np.float64),
+        "efficiency": np.array([np.nan if s["efficiency"] is None else s["efficiency"] for s in specs]),
+        "apartment": np.array([s["units"]["model"] == "apartment" for s in specs], dtype=bool),
+        "unit_size": np.array([u.get("size") or 0 for u in fixed], dtype=np.float64),
+        "small": np.array([u.get("small", 0.0) for u in fixed], dtype=np.float64),
+        "large": np.array([u.get("large", 0.0) for u in fixed], dtype=np.float64),
+        "households": [s["households"] for s in specs],
+    }
+
+
+# -------- types -------
+
+register(
+    "one-family-house", labels=["Omakotitalot", "One-family-house"], color="burlywood",
+    constime=10, capacity=4, efficiency=0.80,
+    units={"model": "fixed", "size": None, "large": 1.0},
+    households="family_houses",
+    conceptor={"titles": (["Pientalojen kokonaismitoitus", "One-family-house volume"],
+                          ["Pientalojen hankekoko", "One-family-house project size"]),
+               "volume": (5000, 1000), "project": (50, 200, 120, 10)},
+)
+
+register(
+    "multi-family-house", labels=["Rivi/paritalot", "Multi-family-house"], color="peru",
+    constime=12, capacity=2, efficiency=0.80,
+    units={"model": "fixed", "size": 90, "large": 0.30},
+    households="family_houses",
+    conceptor={"titles": (["Rivitalojen kokonaismitoitus", "Multi-family-house volume"],
+                          ["Rivitalojen hankekoko", "Multi-family-house project size"]),
+               "volume": (10000, 1000), "project": (200, 2000, 900, 100)},
+)
+
+register(
+    "apartment-condo", labels=["Kerrostalot", "Apartment-condo"], color="sienna",
+    constime=24, capacity=1, efficiency=None,
+    units={"model": "apartment"},
+    households=None,
+    conceptor={"titles": (["Kerrostalojen kokonaismitoitus", "Apartment building volume"],
+                          ["Kerrostalojen hankekoko", "Apartment building project size"]),
+               "volume": (40000, 5000), "project": (2000, 9000, 5000, 1000)},
+)
+
+# service housing for the elderly: one- and two-room units, common spaces lower the efficiency
+register(
+    "senior-housing", labels=["Senioriasunnot", "Senior housing"], color="rosybrown",
+    constime=18, capacity=1, efficiency=0.70,
+    units={"model": "fixed", "size": 50, "small": 0.30},
+    households=[0, 70, 30],
+    conceptor={"titles": (["Senioriasuntojen kokonaismitoitus", "Senior housing volume"],
+                          ["Senioriasuntojen hankekoko", "Senior housing project size"]),
+               "volume": (0, 1000), "project": (1000, 6000, 3000, 500)},
+)
+
+register(
+    "student-housing", labels=["Opiskelija-asunnot", "Student housing"], color="tan",
+    constime=14, capacity=1, efficiency=0.75,
+    units={"model": "fixed", "size": 28, "small": 1.0},
+    households=[0, 90, 10],
+    conceptor={"titles": (["Opiskelija-asuntojen kokonaismitoitus", "Student housing volume"],
+                          ["Opiskelija-asuntojen hankekoko", "Student housing project size"]),
+               "volume": (0, 1000), "project": (1000, 6000, 3000, 500)},
+)
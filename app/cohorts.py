@@ -0,0 +1,136 @@
+# cohort-component population model: move-ins by age, then aging, births and turnover year by year
+import numpy as np
+
+AGES = np.arange(101)   # single-year cohorts, the last one is 100+
+HOUSEHOLDS = ("families", "singles", "other")
+
+# move-in age profiles per household category: (mean age, sd, weight) components
+DEFAULT_AGE_PROFILES = {
+    "families": [(36, 6, 0.57), (7, 4.5, 0.43)],                 # parents, children
+    "singles": [(27, 6, 0.60), (50, 12, 0.25), (78, 8, 0.15)],
+    "other": [(30, 8, 0.50), (62, 10, 0.35), (12, 5, 0.15)],
+}
+
+DEFAULT_RATES = {
+    "tfr": 1.3,                    # births per woman (total fertility rate)
+    "fertility_age": (31, 5),      # mean and sd of the age-specific fertility curve
+    "female_share": 0.5,
+    "mortality": (-10.0, 0.095),   # Gompertz: log q(age) = a + b * age
+    "turnover": 0.08,              # yearly move-out share, all ages
+    "turnover_young": 0.12,        # additional move-out share at ages 18-29
+}
+
+# service age bands (inclusive ages)
+AGE_BANDS = {
+    "daycare": (1, 6),
+    "school": (7, 15),
+    "upper_secondary": (16, 18),
+    "working_age": (19, 64),
+    "elderly": (65, 100),
+}
+
+
+def cohort_projection(cube, horizon=50, profiles=None, rates=None):
+    """
+    Population of the move-ins of a YearlyCube, aged year by year.
+
+    Every year the residents survive and age one year, women of fertile age
+    give birth into age 0, and a share of the residents moves out; movers are
+    replaced by newcomers with the move-in age profile of the same household
+    category, so dwellings stay occupied. The year's move-ins are added last.
+
+    Input:
+      cube: YearlyCube (sub-annual cubes are summed by year)
+      horizon: years from the first move-in year (at least the cube's span)
+      profiles: overrides of DEFAULT_AGE_PROFILES
+      rates: overrides of DEFAULT_RATES
+    Output:
+      dict with years, ages, households and
+      population: (year, household, age) residents at the end of each year
+    """
+    if len(cube) == 0:
+        return {"years": np.zeros(0, dtype=np.int64), "ages": AGES, "households": HOUSEHOLDS,
+                "population": np.zeros((0, len(HOUSEHOLDS), len(AGES)))}
+
+    years = cube.period_years().astype(np.int64)
+    first = int(years.min())
+    n_years = max(int(horizon), int(years.max()) - first + 1)
+    inflow = np.stack([
+        np.bincount(years - first, weights=cube.totals(h), minlength=n_years) for h in HOUSEHOLDS
+    ], axis=-1)
+
+    p = age_profiles(profiles)
+    return {
+        "years": first + np.arange(n_years),
+        "ages": AGES,
+        "households": HOUSEHOLDS,
+        "population": evolve(inflow, transition_matrices(p, rates), p),
+    }
+
+
+def age_profiles(profiles=None):
+    """(household, age) move-in age distributions, each summing to 1."""
+    profiles = {**DEFAULT_AGE_PROFILES, **(profiles or {})}
+    rows = []
+    for h in HOUSEHOLDS:
+        row = sum(w * np.exp(-0.5 * ((AGES - mean) / sd) ** 2) / sd for mean, sd, w in profiles[h])
+        rows.append(row / row.sum())
+    return np.array(rows)
+
+
+def transition_matrices(profiles, rates=None):
+    """
+    (household, age, age) one-year transition matrices T with
+    next = T @ current for the residents of one household category.
+    """
+    rates = {**DEFAULT_RATES, **(rates or {})}
+    a, b = rates["mortality"]
+    survival = 1 - np.clip(np.exp(a + b * AGES), 0, 1)
+    young = (AGES >= 18) & (AGES <= 29)
+    moving = np.clip(rates["turnover"] + rates["turnover_young"] * young, 0, 1)
+
+    mean, sd = rates["fertility_age"]
+    fertility = np.exp(-0.5 * ((AGES - mean) / sd) ** 2) * ((AGES >= 15) & (AGES <= 49))
+    fertility *= rates["tfr"] / fertility.sum()
+
+    n = len(AGES)
+    staying = survival * (1 - moving)
+    aging = np.zeros((n, n))
+    aging[np.arange(1, n), np.arange(n - 1)] = staying[:-1]
+    aging[-1, -1] += staying[-1]
+    aging[0] += rates["female_share"] * fertility
+
+    # movers' dwellings go to newcomers with the category's profile
+    return aging[None] + profiles[:, :, None] * (survival * moving)[None, None, :]
+
+
+def evolve(inflow, transition, profiles):
+    """
+    Advances residents over the year axis with one batched matmul per year.
+
+    Input:
+      inflow: (..., year, household) move-ins; leading axes (scenarios,
+              replications) are evolved together
+      transition: (household, age, age) from transition_matrices()
+      profiles: (household, age) from age_profiles()
+    Output:
+      (..., year, household, age) residents at the end of each year
+    """
+    inflow = np.asarray(inflow, dtype=np.float64)
+    arrivals = inflow[..., None] * profiles
+    n_years, n_households, n_ages = arrivals.shape[-3:]
+
+    # (year, household, age, batch): one (age x age) @ (age x batch) product per household
+    flat = np.moveaxis(arrivals.reshape(-1, n_years, n_households, n_ages), 0, -1)
+    population = np.empty_like(flat)
+    state = np.zeros(flat.shape[1:])
+    for t in range(n_years):
+        state = transition @ state + flat[t]
+        population[t] = state
+    return np.moveaxis(population, -1, 0).reshape(arrivals.shape)
+
+
+def band_totals(result, bands=AGE_BANDS):
+    """{band: (year,) residents aged within the band} over all households."""
+    by_age = result["population"].sum(axis=-2)
+    return {name: by_age[..., lo:hi + 1].sum(axis=-1) for name, (lo, hi) in bands.items()}
@@ -0,0 +1,106 @@
+# export of projection tables as CSV, Parquet, Arrow IPC or Excel, in memory or streamed chunk by chunk
+import io
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:   # optional: parquet / arrow export
+    pa = pq = None
+
+try:
+    import openpyxl
+except ImportError:   # optional: excel export
+    openpyxl = None
+
+FORMATS = {
+    "csv": {"extension": "csv", "mime": "text/csv"},
+    "parquet": {"extension": "parquet", "mime": "application/vnd.apache.parquet"},
+    "arrow": {"extension": "arrow", "mime": "application/vnd.apache.arrow.file"},
+    "xlsx": {"extension": "xlsx", "mime": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"},
+}
+EXCEL_MAX_ROWS = 1_048_576
+
+
+def available_formats():
+    """Formats whose optional dependencies are installed."""
+    missing = set()
+    if pa is None:
+        missing |= {"parquet", "arrow"}
+    if openpyxl is None:
+        missing.add("xlsx")
+    return [fmt for fmt in FORMATS if fmt not in missing]
+
+
+def to_bytes(df, fmt="csv"):
+    """One DataFrame as file contents (no index)."""
+    buffer = io.BytesIO()
+    write_stream([df], buffer, fmt)
+    return buffer.getvalue()
+
+
+def write_stream(frames, target, fmt="csv"):
+    """
+    Writes DataFrames with the same columns one after another into one file,
+    so large outputs (main_sim_iter bodies, ScenarioGrid.iter_frames) never
+    have to be concatenated in memory.
+
+    Input:
+      frames: iterable of DataFrames
+      target: path or writable binary file object
+      fmt: one of FORMATS
+    Output:
+      number of rows written
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if fmt not in available_formats():
+        raise ImportError(f"Export format '{fmt}' needs {'openpyxl' if fmt == 'xlsx' else 'pyarrow'}")
+
+    if isinstance(target, (str, os.PathLike)):
+        with open(target, "wb") as f:
+            return write_stream(frames, f, fmt)
+
+    writers = {"csv": _write_csv, "parquet": _write_arrow, "arrow": _write_arrow, "xlsx": _write_xlsx}
+    return writers[fmt](iter(frames), target, fmt)
+
+
+def _write_csv(frames, target, fmt):
+    rows = 0
+    for i, df in enumerate(frames):
+        target.write(df.to_csv(index=False, header=i == 0).encode("utf-8"))
+        rows += len(df)
+    return rows
+
+
+def _write_arrow(frames, target, fmt):
+    # schema (and dtypes) of the first frame; later frames are cast to it
+    writer, schema, rows = None, None, 0
+    try:
+        for df in frames:
+            table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+            if writer is None:
+                schema = table.schema
+                writer = pq.ParquetWriter(target, schema) if fmt == "parquet" else pa.ipc.new_file(target, schema)
+            writer.write_table(table)
+            rows += len(df)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def _write_xlsx(frames, target, fmt):
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("projection")
+    rows = 0
+    for i, df in enumerate(frames):
+        if i == 0:
+            sheet.append([str(c) for c in df.columns])
+        rows += len(df)
+        if rows >= EXCEL_MAX_ROWS:
+            raise ValueError(f"Excel export is limited to {EXCEL_MAX_ROWS - 1} rows")
+        for row in df.itertuples(index=False):
+            sheet.append([None if v != v else (v.item() if hasattr(v, "item") else v) for v in row])
+    workbook.save(target)
+    return rows
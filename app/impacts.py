@@ -0,0 +1,162 @@
+# registry of impact kernels (carbon, services, transit, taxes) evaluated on the yearly cube
+import numpy as np
+
+import cohorts
+
+# name -> {'basis', 'unit', 'coefficients', 'weights'}
+KERNELS = {}
+
+# kernels the cohort model replaces when it runs: name -> (age band, coefficient scaling it)
+COHORT_KERNELS = {
+    "daycare_children": ("daycare", "participation"),
+    "school_pupils": ("school", None),
+}
+
+
+def kernel(name, basis, unit, **coefficients):
+    """
+    Registers an impact kernel.
+
+    The decorated function maps the coefficients to weights per cube metric:
+    {metric: scalar or {building type: value}}. An indicator is the weighted
+    sum of the cube metrics, per year and type:
+      - basis 'flow': of the year's completions (e.g. embodied carbon)
+      - basis 'stock': of everything completed so far (e.g. yearly taxes)
+    Coefficients given here are the defaults; main_sim args['impacts']
+    overrides them per kernel (per-type dicts key by key, see coefficients()).
+    """
+    def register(weights):
+        if basis not in ("flow", "stock"):
+            raise ValueError(f"Unknown kernel basis: {basis}")
+        KERNELS[name] = {"basis": basis, "unit": unit, "coefficients": coefficients, "weights": weights}
+        return weights
+    return register
+
+
+def coefficients(name, overrides=None):
+    """
+    Coefficients of a kernel: its defaults with the overrides merged in.
+    Per-type dicts are merged type by type, so overriding one type keeps the
+    defaults of the others.
+    """
+    defaults = KERNELS[name]["coefficients"]
+    unknown = set(overrides or {}) - set(defaults)
+    if unknown:
+        raise ValueError(f"Unknown coefficients of impact kernel {name}: {sorted(unknown)}")
+    merged = dict(defaults)
+    for key, value in (overrides or {}).items():
+        merged[key] = {**defaults[key], **value} if isinstance(defaults[key], dict) and isinstance(value, dict) else value
+    return merged
+
+
+def compile_weights(types, metrics, overrides=None, names=None):
+    """
+    (kernel, type, metric) weight tensor of the selected kernels.
+
+    Input:
+      types / metrics: cube axes
+      overrides: {kernel name: coefficient overrides}
+      names: kernels to compile (default: all registered)
+    Output:
+      (names, weights, stock): stock marks the kernels on the cumulative basis
+    """
+    overrides = overrides or {}
+    names = list(KERNELS) if names is None else list(names)
+    unknown = [n for n in [*names, *overrides] if n not in KERNELS]
+    if unknown:
+        raise ValueError(f"Unknown impact kernels: {sorted(set(unknown))}")
+
+    weights = np.zeros((len(names), len(types), len(metrics)))
+    for k, name in enumerate(names):
+        spec = KERNELS[name]
+        for metric, value in spec["weights"](coefficients(name, overrides.get(name))).items():
+            if isinstance(value, dict):
+                value = [value.get(t, 0.0) for t in types]
+            weights[k, :, metrics.index(metric)] = value
+    stock = np.array([KERNELS[name]["basis"] == "stock" for name in names], dtype=bool)
+    return names, weights, stock
+
+
+def evaluate(values, types, metrics, overrides=None, names=None):
+    """
+    All kernels in one pass: one contraction of the (year, type, metric)
+    values with the (kernel, type, metric) weights, then a cumulative sum
+    over years for the stock kernels. Adding kernels only adds weight rows.
+
+    Output:
+      (names, (year, type, kernel) indicator values)
+    """
+    names, weights, stock = compile_weights(types, metrics, overrides, names)
+    impacts = np.einsum("ytm,ktm->ytk", values, weights)
+    impacts[:, :, stock] = np.cumsum(impacts[:, :, stock], axis=0)
+    return names, impacts
+
+
+def totals(indicators, residents=None, overrides=None):
+    """
+    {kernel: (year,) totals} of an impacts YearlyCube (main_sim 'impacts').
+
+    With a cohorts.cohort_projection() result of the same cube, the kernels
+    in COHORT_KERNELS become its age band residents (times their
+    participation coefficient) instead of static per-resident ratios, so they
+    agree with the cohort model's service demand.
+    """
+    result = {name: indicators.totals(name) for name in indicators.metrics}
+    if residents is None or len(indicators) == 0:
+        return result
+    bands = cohorts.band_totals(residents)
+    position = np.clip(np.searchsorted(residents["years"], indicators.period_years()), 0, len(residents["years"]) - 1)
+    for name, (band, scale) in COHORT_KERNELS.items():
+        if name in result:
+            factor = coefficients(name, (overrides or {}).get(name))[scale] if scale else 1.0
+            result[name] = bands[band][position] * factor
+    return result
+
+
+# -------- kernels -------
+
+@kernel("embodied_carbon", basis="flow", unit="t CO2e",
+        per_m2={"one-family-house": 0.30, "multi-family-house": 0.32, "apartment-condo": 0.40,
+                "senior-housing": 0.42, "student-housing": 0.38})
+def _embodied_carbon(c):
+    # construction emissions per m² GFA
+    return {"volume": c["per_m2"]}
+
+
+@kernel("operational_carbon", basis="stock", unit="t CO2e / yr",
+        per_m2={"one-family-house": 0.018, "multi-family-house": 0.015, "apartment-condo": 0.012,
+                "senior-housing": 0.014, "student-housing": 0.012})
+def _operational_carbon(c):
+    # heating and electricity of the completed GFA
+    return {"volume": c["per_m2"]}
+
+
+@kernel("daycare_children", basis="stock", unit="children",
+        per_resident={"families": 0.14, "singles": 0.0, "other": 0.02}, participation=0.8)
+def _daycare_children(c):
+    # residents aged 1-6 in daycare
+    return {h: share * c["participation"] for h, share in c["per_resident"].items()}
+
+
+@kernel("school_pupils", basis="stock", unit="pupils",
+        per_resident={"families": 0.20, "singles": 0.0, "other": 0.03})
+def _school_pupils(c):
+    # residents aged 7-15
+    return dict(c["per_resident"])
+
+
+@kernel("transit_trips", basis="stock", unit="trips / day",
+        trips_per_resident=2.8,
+        transit_share={"one-family-house": 0.08, "multi-family-house": 0.12, "apartment-condo": 0.25,
+                       "senior-housing": 0.15, "student-housing": 0.45})
+def _transit_trips(c):
+    # daily transit trips of the residents, by the mode share of their building type
+    per_type = {t: c["trips_per_resident"] * share for t, share in c["transit_share"].items()}
+    return {h: per_type for h in ("families", "singles", "other")}
+
+
+@kernel("tax_revenue", basis="stock", unit="EUR / yr",
+        per_resident={"families": 2300.0, "singles": 3900.0, "other": 3100.0})
+def _tax_revenue(c):
+    # municipal income tax per resident (children included in the family average)
+    return dict(c["per_resident"])
@@ -0,0 +1,163 @@
+# Monte Carlo uncertainty mode for main_sim: seeded replications as array operations
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import sim
+
+DEFAULT_UNCERTAINTY = {
+    "duration_sigma": 0.15,       # lognormal sigma of construction durations (per type and replication)
+    "delay_sigma": 0.25,          # lognormal sigma of the pre-construction time
+    "share_concentration": 50,    # Dirichlet concentration of household distributions (0 = fixed)
+}
+PERCENTILES = (10, 50, 90)
+HOUSEHOLDS = ("families", "singles", "other")
+CHUNK_SIZE = 250   # replications per task; results do not depend on the worker count
+
+
+def main_sim_mc(args, replications=1000, seed=0, uncertainty=None, percentiles=PERCENTILES, workers=None):
+    """
+    Stochastic main_sim: P10/P50/P90 (by default) bands over seeded replications.
+
+    Every replication samples
+      - one pre-construction delay multiplier,
+      - one construction duration multiplier per building type,
+      - Dirichlet-perturbed household distributions around the given shares.
+    List scheduling is scale invariant, so a type's completion days are its
+    deterministic schedule times the sampled multiplier: the schedule is
+    computed once and replications are plain (replication x point) arrays.
+    With phases the schedule includes the phase releases, which then scale
+    with the duration multipliers too.
+    With all sigmas and the concentration at 0 every replication equals main_sim.
+
+    Input:
+      args: main_sim args
+      replications: number of replications
+      seed: seed of the replication streams
+      uncertainty: overrides of DEFAULT_UNCERTAINTY
+      workers: processes for the replication chunks (default: cpu count, 1 = in-process)
+    Output:
+      dict with:
+        - years, types, replications, seed, percentiles
+        - volume: (percentile, year, type) yearly GFA
+        - families, singles, other, population: (percentile, year) cumulative people
+    """
+    params = sim.normalize_args(args)
+    uncertainty = {**DEFAULT_UNCERTAINTY, **(uncertainty or {})}
+    points = sim._schedule_points(params)
+
+    seeds = np.random.SeedSequence(seed).spawn(-(-replications // CHUNK_SIZE))
+    sizes = [min(CHUNK_SIZE, replications - i * CHUNK_SIZE) for i in range(len(seeds))]
+    jobs = [(points, params, uncertainty, n, s) for n, s in zip(sizes, seeds)]
+
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunks = list(executor.map(_replicate_chunk, *zip(*jobs)))
+    else:
+        chunks = [_replicate_chunk(*job) for job in jobs]
+
+    return _bands(chunks, points, params, replications, seed, percentiles)
+
+
+def _lognormal(rng, sigma, size):
+    # mean-one multipliers
+    return rng.lognormal(-sigma**2 / 2, sigma, size) if sigma > 0 else np.ones(size)
+
+
+def _perturb_shares(rng, household_shares, n, concentration):
+    """
+    Household shares with each distribution drawn from a Dirichlet around its
+    percentages; zero shares stay zero. Distributions become (n, 1) arrays
+    so allocate_units() broadcasts them over replications.
+    """
+    perturbed = {}
+    for size, share in household_shares.items():
+        p = np.asarray(share["distribution"], dtype=np.float64)
+        draws = np.tile(p, (n, 1))
+        positive = p > 0
+        if concentration and positive.sum() > 1:
+            alpha = concentration * p[positive] / p[positive].sum()
+            draws[:, positive] = rng.dirichlet(alpha, n) * p.sum()
+        perturbed[size] = {**share, "distribution": [draws[:, [i]] for i in range(len(p))]}
+    return perturbed
+
+
+def _replicate_chunk(points, params, uncertainty, n, seed):
+    """
+    n replications as arrays.
+    Output: (volume (n, year, type), households (n, year, 3)), years from base_year.
+    """
+    rng = np.random.default_rng(seed)
+    n_types = len(points["types"])
+
+    delay = _lognormal(rng, uncertainty["delay_sigma"], n)
+    speed = _lognormal(rng, uncertainty["duration_sigma"], (n, n_types))
+    shares = _perturb_shares(rng, params["household_shares_estimates"], n, uncertainty["share_concentration"])
+
+    if len(points["day"]) == 0:
+        return np.zeros((n, 0, n_types)), np.zeros((n, 0, len(HOUSEHOLDS)))
+
+    # completion year offsets per (replication, point)
+    days = (params["pre_con_time"] * sim.DAYS_PER_YEAR * delay[:, None]
+            + speed[:, points["type"]] * points["day"])
+    years = (days // sim.DAYS_PER_YEAR).astype(np.int64)
+    n_years = int(years.max()) + 1
+    rows = np.arange(n)[:, None] * n_years + years
+
+    gfa = points["count"] * points["group_gfa"][points["group"]]
+    volume = np.bincount(
+        (rows * n_types + points["type"]).ravel(),
+        weights=np.broadcast_to(gfa, rows.shape).ravel(),
+        minlength=n * n_years * n_types,
+    ).reshape(n, n_years, n_types)
+
+    units = sim.allocate_units(
+        points["group_types"],
+        points["group_gfa"],
+        household_shares=shares,
+        policy=params["unit_size_policy"],
+        avg_family_size=params["avg_family_size"],
+        apt_efficiency=params["apt_efficiency"],
+    )
+    households = np.stack([
+        np.bincount(
+            rows.ravel(),
+            weights=(np.broadcast_to(units[m], (n, len(points["group_gfa"])))[:, points["group"]]
+                     * points["count"]).ravel(),
+            minlength=n * n_years,
+        ).reshape(n, n_years)
+        for m in HOUSEHOLDS
+    ], axis=-1)
+
+    return volume, households
+
+
+def _bands(chunks, points, params, replications, seed, percentiles):
+    # pad chunks to a common horizon, then percentiles over replications
+    n_years = max((v.shape[1] for v, _ in chunks), default=0)
+
+    def pad(a):
+        return np.pad(a, ((0, 0), (0, n_years - a.shape[1]), (0, 0)))
+
+    volume = np.concatenate([pad(v) for v, _ in chunks])
+    households = np.cumsum(np.concatenate([pad(h) for _, h in chunks]), axis=1)
+
+    # drop leading years without production in any replication
+    first = int(np.argmax(volume.sum(axis=(0, 2)) > 0)) if n_years else 0
+    volume, households = volume[:, first:], households[:, first:]
+
+    q = list(percentiles)
+    result = {
+        "years": params["base_year"] + first + np.arange(volume.shape[1]),
+        "types": points["types"],
+        "replications": replications,
+        "seed": seed,
+        "percentiles": tuple(percentiles),
+        "volume": np.percentile(volume, q, axis=0),
+        "population": np.percentile(households.sum(axis=-1), q, axis=0),
+    }
+    for i, m in enumerate(HOUSEHOLDS):
+        result[m] = np.percentile(households[..., i], q, axis=0)
+    return result
@@ -0,0 +1,86 @@
+# dependency-tracked, memoized stages for main_sim
+import hashlib
+import json
+
+import profiling
+from result_cache import LRUCache
+
+
+def stable_hash(obj):
+    """sha256 of obj as canonical JSON."""
+    payload = json.dumps(obj, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Stage:
+    """
+    One pipeline step: func(params, *upstream_results).
+
+    - reads: param keys the stage depends on
+    - after: names of upstream stages whose results it takes
+    - cache: LRUCache for memoized results
+    """
+
+    __slots__ = ("name", "func", "reads", "after", "cache")
+
+    def __init__(self, name, func, reads, after=(), cache=None):
+        self.name = name
+        self.func = func
+        self.reads = tuple(reads)
+        self.after = tuple(after)
+        self.cache = cache if cache is not None else LRUCache(maxsize=32)
+
+    def key(self, params, upstream_keys):
+        return stable_hash({
+            "stage": self.name,
+            "reads": {k: params[k] for k in self.reads},
+            "after": [upstream_keys[name] for name in self.after],
+        })
+
+
+class Pipeline:
+    """
+    Stages in dependency order. A stage key covers its own reads and the keys
+    of its upstream stages, so changing a param only re-executes the stages
+    reading it and everything downstream of them.
+    """
+
+    def __init__(self, stages, freeze=None):
+        self.stages = list(stages)
+        self.freeze = freeze
+
+    def run(self, params, memo=True):
+        """
+        Returns ({stage name: result}, [names of stages executed]).
+        Stage keys are only computed with memo on.
+        """
+        results = {}
+        keys = {}
+        executed = []
+        profiler = profiling.current()
+
+        for stage in self.stages:
+            key = stage.key(params, keys) if memo else None
+            value = stage.cache.get(key) if memo else None
+
+            if value is None:
+                with profiler.stage(stage.name):
+                    value = stage.func(params, *(results[name] for name in stage.after))
+                profiler.record(stage.name, rows=len(value), cached=False)
+                executed.append(stage.name)
+                if memo:
+                    if self.freeze is not None:
+                        value = self.freeze(value)
+                    stage.cache.put(key, value)
+
+            else:
+                profiler.record(stage.name, rows=len(value), cached=True)
+
+            results[stage.name] = value
+            keys[stage.name] = key
+
+        return results, executed
+
+    def clear(self):
+        for stage in self.stages:
+            stage.cache.clear()
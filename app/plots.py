@@ -0,0 +1,195 @@
+# Plotly charts of the projector app
+import datetime
+
+import numpy as np
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+import building_types
+from result_cache import LRUCache
+
+# max x positions per trace: longer projections are drawn as multi-period bars,
+# so the figure JSON stays the same size whatever the portfolio
+PAYLOAD_POINTS = 60
+
+
+def _figure_nbytes(fig):
+    # size of the JSON plotly_chart sends (figures have no nbytes)
+    return len(fig.to_json())
+
+
+# figures per (result hash, resolution, lin, bands, cohorts); plotly_chart only serializes them
+FIGURE_CACHE = LRUCache(maxsize=64, max_bytes=64 * 2**20, ttl=3600, sizeof=_figure_nbytes)
+
+
+def cached_simulation_plot(key, cube, lin=1, bands=None, cohorts=None):
+    """
+    simulation_plot() reused for the same result hash, cube resolution and language.
+    bands (seeded main_sim_mc) and cohorts (default cohort model) follow from the
+    same args, so only their presence is keyed.
+    """
+    cache_key = (key, cube.resolution, lin, bands is not None, cohorts is not None)
+    fig = FIGURE_CACHE.get(cache_key)
+    if fig is None:
+        fig = simulation_plot(cube, lin=lin, bands=bands, cohorts=cohorts)
+        FIGURE_CACHE.put(cache_key, fig)
+    return fig
+
+
+def _period_bins(keys, points=PAYLOAD_POINTS):
+    # bin width (periods) and bin index of each year / period key
+    keys = np.asarray(keys, dtype=np.int64)
+    if len(keys) == 0:
+        return 1, keys
+    step = max(1, -(-(int(keys.max()) - int(keys.min()) + 1) // points))
+    return step, (keys - keys.min()) // step
+
+
+def simulation_plot(cube,lin=1,bands=None,cohorts=None):
+    """
+    Stacked yearly production per building type and cumulative population lines,
+    drawn from a YearlyCube. Quarterly or monthly cubes split each year's
+    bar slot into its periods.
+    Bars and lines carry at most PAYLOAD_POINTS rounded values each; with more
+    periods production is summed into multi-period bars and the lines are
+    sampled at the bin ends.
+    bands: optional montecarlo.main_sim_mc() result; population lines are then
+    drawn as P50 with a shaded P10-P90 band.
+    cohorts: optional cohorts.cohort_projection() result; population lines are
+    then its residents (aged, born, turned over) instead of cumulative
+    move-ins. Ignored with bands.
+    """
+    #LOCAT
+    yaxis_title_left = ['Vuosiasuntotuotanto (kem²)','Residential production (GFA)']
+    yaxis_title_right = ['Asukasmäärän kasvu','Population increase']
+    xaxis_title = ['Vuosi','Year']
+    # translation of items (building types from their registry)
+    col_translations = {
+        'families':['Perheissä asuvat','Family population'],
+        'singles':['Yksin asuvat','Single population'],
+        'other':['Muut','Other population']
+    }
+
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+
+    periods = cube.periods_per_year
+    step, bins = _period_bins(cube.years)
+    n_bins = int(bins.max()) + 1 if len(bins) else 0
+    bin_start = cube.years.min() + step * np.arange(n_bins) if n_bins else np.zeros(0, dtype=np.int64)
+    # bars centered on their periods; year y spans y - 0.5 ... y + 0.5
+    bar_x = (bin_start + step / 2) / periods - 0.5
+
+    for j, building_type in enumerate(cube.types):
+        translated_name = building_types.label(building_type, lin)
+        volume = np.bincount(bins, weights=cube.metric('volume')[:, j], minlength=n_bins)
+        fig.add_trace(
+            go.Bar(
+                name=translated_name,
+                legendgroup='histo',
+                x=bar_x,
+                y=np.round(volume).astype(np.int64),
+                width=step / periods * 0.8,
+                marker=dict(color=building_types.spec(building_type)['color'], opacity=0.9)
+            ), secondary_y=False
+        )
+    fig.update_layout(barmode='stack')
+
+    # ----------- POP LINES --------------
+
+    # cumulative population, drawn at (the last of binned) periods with actual production
+    years = (cube.years + 0.5) / periods - 0.5 if periods > 1 else cube.years
+    active = cube.totals('volume') > 0
+    if step > 1 and active.any():
+        # bin ends within the production span, and its last period
+        span = np.flatnonzero(active)
+        position = np.arange(len(active))
+        active = (bins != np.append(bins[1:], -1)) & (position >= span[0]) & (position <= span[-1])
+        active[span[-1]] = True
+    cumulative_data = {column: np.round(cube.cumulative(column)).astype(np.int64) for column in ['families', 'singles', 'other']}
+
+    if cohorts is not None:
+        # cohort model residents, at the bin ends of its years
+        _, cohort_bins = _period_bins(cohorts['years'])
+        sample = cohort_bins != np.append(cohort_bins[1:], -1)
+        residents = cohorts['population'].sum(axis=-1)[sample]
+        years = cohorts['years'][sample]
+        active = np.ones(len(years), dtype=bool)
+        cumulative_data = {column: np.round(residents[:, i]).astype(np.int64) for i, column in enumerate(cohorts['households'])}
+
+    # Line plots for households
+    lines = [('other', 'dot'), ('singles', 'dash'), ('families', 'solid')]
+    if bands is not None:
+        lo, mid, hi = 0, len(bands['percentiles']) // 2, len(bands['percentiles']) - 1
+        _, band_bins = _period_bins(bands['years'])
+        sample = band_bins != np.append(band_bins[1:], -1)
+        bands = {**bands, 'years': bands['years'][sample],
+                 **{column: np.round(bands[column][:, sample]).astype(np.int64) for column in ['families', 'singles', 'other']}}
+        for column, line_style in lines:
+            for i, fill in [(lo, None), (hi, 'tonexty')]:
+                fig.add_trace(
+                    go.Scatter(
+                        x=bands['years'],
+                        y=bands[column][i],
+                        mode='lines',
+                        line=dict(width=0),
+                        fill=fill,
+                        fillcolor='rgba(0,0,0,0.12)',
+                        showlegend=False,
+                        legendgroup='lines',
+                        hoverinfo='skip'
+                    ), secondary_y=True
+                )
+            fig.add_trace(
+                go.Scatter(
+                    x=bands['years'],
+                    y=bands[column][mid],
+                    mode='lines',
+                    name=col_translations[column][lin],
+                    legendgroup='lines',
+                    line=dict(color='black', width=1.0, dash=line_style)
+                ), secondary_y=True
+            )
+        cumulative_data = {column: bands[column][hi] for column in ['families', 'singles', 'other']}
+        years = np.union1d(years, bands['years'])
+        lines = []   # drawn as bands
+
+    for column, line_style in lines:
+        fig.add_trace(
+            go.Scatter(
+                x=years[active],
+                y=cumulative_data[column][active],
+                mode='lines',
+                name=col_translations[column][lin],
+                legendgroup='lines',
+                line=dict(color='black', width=1.0, dash=line_style),
+                hoverinfo=None
+            ), secondary_y=True
+        )
+    
+    # Update axes
+    year_now = datetime.datetime.now().year
+    end_year = max(year_now, int(years.max()))
+
+    # Create a range of years from the current year to the end year
+    years_range = list(range(year_now, end_year + 1, -(-step // periods)))
+
+    # Update x-axis
+    fig.update_xaxes(tickvals=years_range, ticktext=years_range,
+                    range=[year_now - 0.5, end_year + step / periods + 0.5],
+                    title=xaxis_title[lin])
+
+    #define second y-axis max
+    y2_max_value = max(values.max() for values in cumulative_data.values())
+    
+    fig.update_yaxes(showgrid=True, zeroline=False)
+    fig.update_yaxes(title=yaxis_title_left[lin])
+    fig.update_yaxes(title=yaxis_title_right[lin], secondary_y=True, range=[0, y2_max_value])
+
+    # Legend and layout
+    fig.update_layout(
+        margin={"r": 10, "t": 10, "l": 10, "b": 10}, height=700,
+        legend=dict(yanchor="top",y=0.95,xanchor="left",x=0.01)
+        #legend=dict(yanchor="top", y=0.95, xanchor="right", x=0.90)
+    )
+
+    return fig
@@ -0,0 +1,129 @@
+# inverse solver: cheapest apartment-condo unit size policy reaching population targets
+import numpy as np
+
+import building_types
+import sim
+
+# market default without a policy (see allocate_units) and the policy slider ranges
+MARKET_DEFAULT = (75, 10)
+PCT_SMALL_MAX = range(10, 81, 5)
+PCT_LARGE_MIN = range(0, 101, 5)
+DEFAULT_SIZES = (30, 70)   # size1 / size2 slider defaults, not used by the allocation
+
+
+def policy_cost(pct_small_max, pct_large_min):
+    """Deviation from the market default mix, in percentage points."""
+    return abs(pct_small_max - MARKET_DEFAULT[0]) + abs(pct_large_min - MARKET_DEFAULT[1])
+
+
+def solve_policy(args, year=None, families=None, population=None,
+                 pct_small_max=PCT_SMALL_MAX, pct_large_min=PCT_LARGE_MIN):
+    """
+    Cheapest feasible unit size policy whose cumulative family and/or total
+    population by `year` reach the targets.
+
+    The small cap only moves S = min(baseline, pct_small_max * units) and the
+    large floor only moves L = max(baseline, pct_large_min * units), so:
+      - one allocate_units() sweep per percentage gives S and L of every value;
+        values that clamp to the same S (or L) give the same allocation,
+      - feasibility (S + L <= units for every apartment building) of all pairs
+        follows from those sweeps without evaluating the pairs,
+      - of the pairs the policy maker can express (pct_small_max +
+        pct_large_min <= 100), the cheapest per (S, L) outcome is evaluated,
+        all in one batched allocate_units() call.
+
+    Input:
+      args: main_sim args (unit_size_policy is ignored)
+      year: target year (default: last completion year)
+      families / population: minimum cumulative family / total population
+      pct_small_max / pct_large_min: candidate percentages
+    Output:
+      dict with policy (unit_size_policy or None if no policy reaches the
+      targets), pct_small_max, pct_large_min, cost, year, families, population,
+      candidates and evaluated (pair counts)
+    """
+    params = sim.normalize_args(args)
+    points = sim._schedule_points(params)
+    completion_year = params["base_year"] + params["pre_con_time"] + points["day"] // sim.DAYS_PER_YEAR
+    if year is None:
+        year = int(completion_year.max()) if len(completion_year) else params["base_year"]
+
+    # projects per group completed by the target year
+    done = np.bincount(
+        points["group"][completion_year <= year],
+        weights=points["count"][completion_year <= year],
+        minlength=len(points["group_gfa"]),
+    )
+    names, codes = building_types.type_codes(points["group_types"])
+    apartments = building_types.compile_types(names)["apartment"][codes]
+
+    def allocate(small, large):
+        return sim.allocate_units(
+            points["group_types"],
+            points["group_gfa"],
+            household_shares=params["household_shares_estimates"],
+            policy={"apartment-condo": [np.asarray(small, dtype=np.float64)[:, None], None,
+                                        np.asarray(large, dtype=np.float64)[:, None], None]},
+            avg_family_size=params["avg_family_size"],
+            apt_efficiency=params["apt_efficiency"],
+            strict=False,
+        )
+
+    # 1D sweeps: S depends on the small cap only, L on the large floor only
+    small = np.array(sorted(pct_small_max, key=lambda p: policy_cost(p, MARKET_DEFAULT[1])))
+    large = np.array(sorted(pct_large_min, key=lambda p: policy_cost(MARKET_DEFAULT[0], p)))
+    by_small = allocate(small, np.full(len(small), min(large)))
+    by_large = allocate(np.full(len(large), min(small)), large)
+    units = (by_small["small"] + by_small["medium"] + by_small["large"])[0]
+
+    _, s_first, s_class = np.unique(by_small["small"], axis=0, return_index=True, return_inverse=True)
+    _, l_first, l_class = np.unique(by_large["large"], axis=0, return_index=True, return_inverse=True)
+    s_counts, l_counts = by_small["small"][s_first], by_large["large"][l_first]
+    s_class, l_class = s_class.ravel(), l_class.ravel()
+    feasible = ~((s_counts[:, None, :] + l_counts[None, :, :] > units) & apartments).any(axis=-1)
+
+    # expressible pairs (unit_size_policy_maker: pct_large_min <= 100 - pct_small_max), cheapest first
+    a, b = (x.ravel() for x in np.meshgrid(np.arange(len(small)), np.arange(len(large)), indexing="ij"))
+    keep = (small[a] + large[b] <= 100) & feasible[s_class[a], l_class[b]]
+    a, b = a[keep], b[keep]
+    order = np.argsort(policy_cost(small[a], large[b]), kind="stable")
+    a, b = a[order], b[order]
+    # one pair per (S, L) outcome: its cheapest
+    _, first = np.unique(np.stack([s_class[a], l_class[b]], axis=1), axis=0, return_index=True)
+    first.sort()
+    i, j = a[first], b[first]
+
+    result = {
+        "policy": None, "pct_small_max": None, "pct_large_min": None, "cost": None, "year": year,
+        "families": None, "population": None,
+        "candidates": len(pct_small_max) * len(pct_large_min), "evaluated": len(i),
+    }
+    if len(i) == 0:
+        return result
+
+    cost = policy_cost(small[i], large[j])
+
+    units_by_pair = allocate(small[i], large[j])
+    fam = units_by_pair["families"] @ done
+    pop = (units_by_pair["families"] + units_by_pair["singles"] + units_by_pair["other"]) @ done
+
+    ok = np.ones(len(i), dtype=bool)
+    if families is not None:
+        ok &= fam >= families
+    if population is not None:
+        ok &= pop >= population
+    if not ok.any():
+        return result
+
+    best = int(np.argmax(ok))
+    sizes = (params["unit_size_policy"] or {}).get("apartment-condo") or [None, DEFAULT_SIZES[0], None, DEFAULT_SIZES[1]]
+    p1, p2 = int(small[i[best]]), int(large[j[best]])
+    result.update({
+        "policy": {"apartment-condo": [p1, int(sizes[1]), p2, int(sizes[3])]},
+        "pct_small_max": p1,
+        "pct_large_min": p2,
+        "cost": int(cost[best]),
+        "families": int(fam[best]),
+        "population": int(pop[best]),
+    })
+    return result
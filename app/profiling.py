@@ -0,0 +1,161 @@
+# opt-in per-stage instrumentation: wall time, tracemalloc allocations, row counts
+import contextlib
+import contextvars
+import threading
+import time
+import tracemalloc
+
+
+class Profiler:
+    """
+    Records per stage:
+      - seconds: wall time
+      - alloc_bytes / peak_bytes: net and peak traced allocation (tracemalloc)
+      - alloc_blocks: net allocated blocks (only with count_blocks=True, uses snapshots)
+      - rows and any extra counters set by the stage (e.g. simpy_events)
+    """
+
+    enabled = True
+
+    def __init__(self, trace_memory=True, count_blocks=False):
+        self.trace_memory = trace_memory
+        self.count_blocks = count_blocks and trace_memory
+        self.stages = {}
+        self._started_tracing = False
+        self._t0 = time.perf_counter()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        info = self.stages.setdefault(name, {})
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            blocks = self._blocks() if self.count_blocks else None
+        t = time.perf_counter()
+        try:
+            yield info
+        finally:
+            info["seconds"] = info.get("seconds", 0.0) + time.perf_counter() - t
+            if self.trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                info["alloc_bytes"] = current - before
+                info["peak_bytes"] = peak - before
+                if blocks is not None:
+                    info["alloc_blocks"] = self._blocks() - blocks
+
+    @staticmethod
+    def _blocks():
+        return sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+
+    def record(self, name, **values):
+        self.stages.setdefault(name, {}).update(values)
+
+    def close(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def as_dict(self):
+        return {
+            "total_seconds": time.perf_counter() - self._t0,
+            "stages": {name: dict(info) for name, info in self.stages.items()},
+        }
+
+
+class _NullProfiler:
+    # disabled instrumentation: no clocks, no tracing
+
+    enabled = False
+    _null = contextlib.nullcontext({})
+
+    def stage(self, name):
+        return self._null
+
+    def record(self, name, **values):
+        pass
+
+    def close(self):
+        pass
+
+
+NULL_PROFILER = _NullProfiler()
+
+_current = contextvars.ContextVar("profiler", default=NULL_PROFILER)
+
+
+def current():
+    """Profiler of the running main_sim call (NULL_PROFILER when disabled)."""
+    return _current.get()
+
+
+@contextlib.contextmanager
+def activate(profiler):
+    token = _current.set(profiler)
+    try:
+        yield profiler
+    finally:
+        _current.reset(token)
+
+
+def to_prometheus(metrics, prefix="projector", labels=None):
+    """Prometheus text exposition of a Profiler.as_dict() result (gauges per stage)."""
+    extra = "".join(f',{k}="{v}"' for k, v in (labels or {}).items())
+    series = {}
+    for stage, info in metrics["stages"].items():
+        for key, value in info.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            series.setdefault(key, []).append(f'{prefix}_stage_{key}{{stage="{stage}"{extra}}} {value}')
+
+    lines = []
+    for key, samples in series.items():
+        lines.append(f"# TYPE {prefix}_stage_{key} gauge")
+        lines.extend(samples)
+    lines.append(f"# TYPE {prefix}_total_seconds gauge")
+    lines.append(f"{prefix}_total_seconds{_labels(labels or {})} {metrics['total_seconds']}")
+    return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in sorted(labels.items())) + "}"
+
+
+class MetricsRegistry:
+    """
+    Cumulative counters for a scrape endpoint: request counts, and per-stage
+    sums over every profiled run passed to observe().
+    """
+
+    def __init__(self, prefix="projector"):
+        self.prefix = prefix
+        self.counters = {}   # (name, labels) -> value
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, metrics):
+        for stage, info in metrics["stages"].items():
+            self.inc("stage_runs_total", stage=stage)
+            for key in ("seconds", "alloc_bytes", "simpy_events", "rows"):
+                if key in info:
+                    self.inc(f"stage_{key}_total", info[key], stage=stage)
+
+    def to_prometheus(self):
+        with self._lock:
+            items = sorted(self.counters.items())
+        lines = []
+        seen = set()
+        for (name, labels), value in items:
+            if name not in seen:
+                lines.append(f"# TYPE {self.prefix}_{name} counter")
+                seen.add(name)
+            lines.append(f"{self.prefix}_{name}{_labels(dict(labels))} {value}")
+        return "\n".join(lines) + "\n"
@@ -20,7 +20,7 @@ def projector_summary(lin=0):
 
     ## Rakennustyypit
 
-    Malli tunnistaa kolme asuntorakennustyyppiä, joilla on erilliset ominaisuudet:
+    Malli tunnistaa viisi asuntorakennustyyppiä, joilla on erilliset ominaisuudet:
 
     **Omakotitalot/townhouse-talot**
     - Hankekoko: 100-200 m²
@@ -37,6 +37,16 @@ def projector_summary(lin=0):
     - Rakentamisaika: noin 24 kuukautta
     - Peruskapasiteettikerroin (1x) vaativalle kerrostalotuotannolle
 
+    **Senioriasunnot**
+    - Hankekoko: 1,000-6,000 m²
+    - Rakentamisaika: noin 18 kuukautta
+    - Noin 50 m² asunnot, tehokkuuskerroin 0.7 yhteistilojen vuoksi; asukkaina pääosin yksin asuvia ja pariskuntia
+
+    **Opiskelija-asunnot**
+    - Hankekoko: 1,000-6,000 m²
+    - Rakentamisaika: noin 14 kuukautta
+    - Noin 28 m² pienasunnot, tehokkuuskerroin 0.75; asukkaina pääosin yksin asuvia
+
     Eriytetty kapasiteettiskaalaus kuvastaa sitä, että kevyemmissä rakennustyypeissä 
     toteutus jakautuu luontevammin useammille toimijoille.
 
@@ -158,7 +168,7 @@ def projector_summary(lin=0):
 
     ## Building Typologies
 
-    The model recognizes three residential building types with distinct characteristics:
+    The model recognizes five residential building types with distinct characteristics:
 
     **Single-family/townhouses**
     - Project size: 100-200 m²
@@ -175,6 +185,16 @@ def projector_summary(lin=0):
     - Construction time: approximately 24 months
     - Base capacity multiplier (1x) for complex apartment development
 
+    **Senior housing**
+    - Project size: 1,000-6,000 m²
+    - Construction time: approximately 18 months
+    - About 50 m² units, efficiency 0.7 due to common spaces; residents mostly singles and couples
+
+    **Student housing**
+    - Project size: 1,000-6,000 m²
+    - Construction time: approximately 14 months
+    - About 28 m² studios, efficiency 0.75; residents mostly singles
+
     Differentiated capacity scaling reflects that lighter building types naturally distribute across multiple developers.
 
     #### Project Duration Scaling
@@ -0,0 +1,89 @@
+# in-process result cache shared by all sessions of the app
+import threading
+import time
+from collections import OrderedDict
+
+
+def _nbytes(value):
+    return getattr(value, "nbytes", 0)
+
+
+class LRUCache:
+    """
+    Bounded LRU cache with entry-count, size and TTL eviction.
+
+    - maxsize: max number of entries
+    - max_bytes: max total size, measured with sizeof(value) (default: value.nbytes)
+    - ttl: seconds an entry stays valid (None = no expiry)
+
+    Thread-safe; hit/miss/eviction counters are available from stats().
+    """
+
+    def __init__(self, maxsize=128, max_bytes=256 * 2**20, ttl=3600, sizeof=_nbytes):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self._data = OrderedDict()   # key -> (value, size, expires)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[2] is not None and entry[2] < time.monotonic():
+                self._drop(key)
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (value, size, expires)
+            self._bytes += size
+            while len(self._data) > self.maxsize or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                self._drop(next(iter(self._data)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and (entry[2] is None or entry[2] >= time.monotonic())
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._data),
+                "bytes": self._bytes,
+            }
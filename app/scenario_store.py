@@ -0,0 +1,251 @@
+# local SQLite store of main_sim runs: normalized args, yearly cube and stage timings
+import datetime
+import json
+import os
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+import sim
+
+DEFAULT_PATH = os.environ.get("PROJECTOR_STORE", "projector_runs.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    hash TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    label TEXT,
+    args TEXT NOT NULL,
+    num_companies INTEGER,
+    pre_con_time INTEGER,
+    apt_efficiency REAL,
+    avg_family_size REAL,
+    base_year INTEGER,
+    pct_small_max REAL,
+    pct_large_min REAL,
+    projects INTEGER,
+    total_gfa REAL,
+    population REAL,
+    seconds REAL
+);
+CREATE INDEX IF NOT EXISTS runs_params ON runs (num_companies, pre_con_time, apt_efficiency, avg_family_size);
+CREATE INDEX IF NOT EXISTS runs_policy ON runs (pct_small_max, pct_large_min);
+CREATE INDEX IF NOT EXISTS runs_created ON runs (created_at);
+CREATE TABLE IF NOT EXISTS yearly (
+    hash TEXT NOT NULL REFERENCES runs (hash) ON DELETE CASCADE,
+    year INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    volume REAL, units REAL, families REAL, singles REAL, other REAL,
+    PRIMARY KEY (hash, year, type)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS timings (
+    hash TEXT NOT NULL REFERENCES runs (hash) ON DELETE CASCADE,
+    stage TEXT NOT NULL,
+    seconds REAL,
+    PRIMARY KEY (hash, stage)
+) WITHOUT ROWID;
+"""
+
+# runs columns usable as query() filters
+QUERY_COLUMNS = (
+    "num_companies", "pre_con_time", "apt_efficiency", "avg_family_size",
+    "base_year", "pct_small_max", "pct_large_min", "label",
+)
+POPULATION = ("families", "singles", "other")
+
+
+def _utc_iso(bound):
+    # created_at is stored as UTC ISO text, so bounds compare as the same text
+    if isinstance(bound, str):
+        bound = datetime.datetime.fromisoformat(bound)
+    return bound.astimezone(datetime.timezone.utc).isoformat(timespec="seconds")
+
+
+class ScenarioStore:
+    """
+    Persistent main_sim results keyed by args_hash.
+
+    Runs are indexed by their main parameters and creation time; each run
+    keeps its YearlyCube as (year, type) rows and its per-stage timings.
+    One connection shared between threads behind a lock.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._lock, self._db:
+            if path != ":memory:":
+                self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA foreign_keys=ON")
+            self._db.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __contains__(self, key):
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM runs WHERE hash = ?", (key,)).fetchone() is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+
+    # -------- write -------
+
+    def put(self, args, cube, metrics=None, label=None):
+        """
+        Stores (or replaces) one run.
+
+        Input:
+          args: main_sim args (stored normalized, keyed by args_hash)
+          cube: YearlyCube of the run
+          metrics: optional main_sim profile metrics (per-stage timings)
+        Output:
+          hash of the run
+        """
+        params = sim.normalize_args(args)
+        key = sim.args_hash(params)
+        policy = (params["unit_size_policy"] or {}).get("apartment-condo") or [None, None, None, None]
+        population = float(sum(cube.totals(m).sum() for m in POPULATION)) if len(cube) else 0.0
+        stages = (metrics or {}).get("stages", {})
+
+        run = {
+            "hash": key,
+            "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "label": label,
+            "args": json.dumps(params, sort_keys=True),
+            "num_companies": params["num_companies"],
+            "pre_con_time": params["pre_con_time"],
+            "apt_efficiency": params["apt_efficiency"],
+            "avg_family_size": params["avg_family_size"],
+            "base_year": params["base_year"],
+            "pct_small_max": policy[0],
+            "pct_large_min": policy[2],
+            "projects": sum(b["count"] for b in params["buildings"]),
+            "total_gfa": float(cube.totals("volume").sum()) if len(cube) else 0.0,
+            "population": population,
+            "seconds": (metrics or {}).get("total_seconds"),
+        }
+        columns = [cube.metrics.index(m) for m in sim.CUBE_METRICS]
+        yearly = [
+            (key, int(year), btype, *cube.values[i, j, columns].tolist())
+            for i, year in enumerate(cube.years) for j, btype in enumerate(cube.types)
+        ]
+
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM runs WHERE hash = ?", (key,))
+            self._db.execute(
+                f"INSERT INTO runs ({', '.join(run)}) VALUES ({', '.join('?' * len(run))})",
+                tuple(run.values()),
+            )
+            self._db.executemany("INSERT INTO yearly VALUES (?, ?, ?, ?, ?, ?, ?, ?)", yearly)
+            self._db.executemany(
+                "INSERT INTO timings VALUES (?, ?, ?)",
+                [(key, stage, values.get("seconds")) for stage, values in stages.items()],
+            )
+        return key
+
+    def delete(self, key):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM runs WHERE hash = ?", (key,))
+
+    # -------- read -------
+
+    def get(self, key):
+        """YearlyCube of a stored run, or None."""
+        with self._lock:
+            if self._db.execute("SELECT 1 FROM runs WHERE hash = ?", (key,)).fetchone() is None:
+                return None
+            rows = self._db.execute(
+                f"SELECT year, type, {', '.join(sim.CUBE_METRICS)} FROM yearly WHERE hash = ? ORDER BY year",
+                (key,),
+            ).fetchall()
+
+        if not rows:
+            return sim.YearlyCube([], [], np.zeros((0, 0, len(sim.CUBE_METRICS))))
+        years = sorted({r["year"] for r in rows})
+        types = sorted({r["type"] for r in rows},
+                       key=lambda t: sim.BUILDING_TYPES.index(t) if t in sim.BUILDING_TYPES else len(sim.BUILDING_TYPES))
+        values = np.zeros((len(years), len(types), len(sim.CUBE_METRICS)))
+        for r in rows:
+            values[years.index(r["year"]), types.index(r["type"])] = [r[m] for m in sim.CUBE_METRICS]
+        return sim.YearlyCube(years, types, values)
+
+    def run(self, key):
+        """Stored run row (dict, args decoded) with its stage timings, or None."""
+        with self._lock:
+            row = self._db.execute("SELECT * FROM runs WHERE hash = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            timings = self._db.execute("SELECT stage, seconds FROM timings WHERE hash = ?", (key,)).fetchall()
+        run = dict(row)
+        run["args"] = json.loads(run["args"])
+        run["timings"] = {t["stage"]: t["seconds"] for t in timings}
+        return run
+
+    def fetch_or_compute(self, args, label=None):
+        """
+        Stored cube of args if known, else main_sim (listsched) and store it.
+        Output: {'cube': YearlyCube, 'hash': ..., 'cached': bool}
+        """
+        params = sim.normalize_args(args, engine="listsched")
+        key = sim.args_hash(params)
+        cube = self.get(key)
+        if cube is not None:
+            return {"cube": cube, "hash": key, "cached": True}
+
+        response = sim.main_sim(params, output="table", aggregate=True, profile=True)
+        self.put(params, response["cube"], response["metrics"], label=label)
+        return {"cube": response["cube"], "hash": key, "cached": False}
+
+    def query(self, since=None, until=None, limit=100, **filters):
+        """
+        Runs matching filters on QUERY_COLUMNS (exact values) and an optional
+        created_at range (datetimes or ISO strings, naive ones in local time),
+        newest first, as a DataFrame.
+        """
+        unknown = set(filters) - set(QUERY_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown query filters: {sorted(unknown)}")
+
+        where, values = [], []
+        for column, value in filters.items():
+            where.append(f"{column} = ?")
+            values.append(value)
+        for op, bound in ((">=", since), ("<", until)):
+            if bound is not None:
+                where.append(f"created_at {op} ?")
+                values.append(_utc_iso(bound))
+
+        sql = "SELECT * FROM runs" + (f" WHERE {' AND '.join(where)}" if where else "")
+        sql += " ORDER BY created_at DESC LIMIT ?"
+        with self._lock:
+            rows = self._db.execute(sql, (*values, limit)).fetchall()
+        columns = [c for c in rows[0].keys() if c != "args"] if rows else ["hash"]
+        return pd.DataFrame([[r[c] for c in columns] for r in rows], columns=columns)
+
+    def compare(self, keys, metric="population", cumulative=True):
+        """
+        Side-by-side yearly totals of stored runs: one column per run
+        (label, or the hash prefix), years as the index.
+        metric: one of sim.CUBE_METRICS or 'population'
+        """
+        columns = {}
+        for key in keys:
+            cube = self.get(key)
+            if cube is None:
+                raise KeyError(key)
+            run = self.run(key)
+            totals = sum(cube.totals(m) for m in POPULATION) if metric == "population" else cube.totals(metric)
+            series = pd.Series(totals, index=cube.years)
+            name = run["label"] or key[:10]
+            if name in columns:
+                name = f"{name} ({key[:6]})"
+            columns[name] = series.cumsum() if cumulative else series
+        df = pd.DataFrame(columns).sort_index()
+        return (df.ffill() if cumulative else df).fillna(0)
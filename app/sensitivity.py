@@ -0,0 +1,277 @@
+# global sensitivity analysis (Morris elementary effects, Saltelli/Sobol indices) of main_sim outputs
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import building_types
+import sim
+
+# factor: (low, high); household_shares.<size> is the family share (%) of that
+# size class, the other shares rescaled to keep the total; project_size_scale
+# scales project sizes at fixed total volume (see _sized_buildings)
+DEFAULT_PROBLEM = {
+    "avg_family_size": (3.0, 4.0),
+    "apt_efficiency": (0.70, 0.90),
+    "num_companies": (1, 4),
+    "project_size_scale": (0.8, 1.2),
+    "household_shares.medium": (10, 40),
+    "household_shares.large": (70, 100),
+}
+INTEGER_FACTORS = ("num_companies", "pre_con_time")
+# factors _evaluate_chunk applies, besides household_shares.<size>
+FACTORS = ("avg_family_size", "apt_efficiency", "num_companies", "pre_con_time", "project_size_scale")
+METRICS = ("population", "families", "singles", "other", "units")
+CHUNK_SIZE = 512   # design rows per task
+
+
+def sobol(args, problem=None, n=1024, metric="population", seed=0, workers=None):
+    """
+    First- and total-order Sobol indices per output year from a Saltelli design.
+
+    n base samples give n * (k + 2) evaluations for k factors (matrices A, B
+    and A with column i from B). First order: Saltelli (2010), total order:
+    Jansen estimator, both on outputs centered on the mean of A and B.
+
+    Input:
+      args: main_sim args the factors are varied around
+      problem: {factor: (low, high)} (default DEFAULT_PROBLEM)
+      metric: cumulative output, one of METRICS
+    Output:
+      dict with method, factors, years, metric, evaluations and
+      S1 / ST: (factor, year) arrays
+    """
+    problem = dict(problem or DEFAULT_PROBLEM)
+    k = len(problem)
+    rng = np.random.default_rng(seed)
+    a, b = rng.random((n, k)), rng.random((n, k))
+    ab = np.repeat(a[None], k, axis=0)
+    ab[np.arange(k), :, np.arange(k)] = b.T
+
+    years, y = evaluate(args, problem, np.concatenate([a, b, ab.reshape(k * n, k)]), metric, workers)
+    # outputs centered on the mean of A and B, as in SALib: the first-order
+    # estimator is biased (S1 > 1 possible) on uncentered outputs
+    y = y - np.concatenate([y[:n], y[n:2 * n]]).mean(axis=0)
+    f_a, f_b, f_ab = y[:n], y[n:2 * n], y[2 * n:].reshape(k, n, -1)
+
+    var = np.var(np.concatenate([f_a, f_b]), axis=0)
+    s1 = np.mean(f_b * (f_ab - f_a), axis=1)
+    st = 0.5 * np.mean((f_a - f_ab) ** 2, axis=1)
+    return {
+        "method": "sobol",
+        "factors": list(problem),
+        "years": years,
+        "metric": metric,
+        "evaluations": len(y),
+        "S1": _ratio(s1, var),
+        "ST": _ratio(st, var),
+    }
+
+
+def morris(args, problem=None, trajectories=20, levels=4, metric="population", seed=0, workers=None):
+    """
+    Morris elementary effects per output year.
+
+    Each trajectory starts on the `levels` grid and moves one factor at a
+    time by delta = levels / (2 * (levels - 1)), giving trajectories * (k + 1)
+    evaluations.
+
+    Output:
+      dict with method, factors, years, metric, evaluations and
+      mu, mu_star, sigma: (factor, year) arrays in output units per unit range
+    """
+    problem = dict(problem or DEFAULT_PROBLEM)
+    k = len(problem)
+    rng = np.random.default_rng(seed)
+    delta = levels / (2 * (levels - 1))
+
+    design = np.empty((trajectories, k + 1, k))
+    steps = np.empty((trajectories, k))
+    moved = np.empty((trajectories, k), dtype=np.int64)
+    for t in range(trajectories):
+        x = rng.integers(0, levels, k) / (levels - 1)
+        design[t, 0] = x
+        for s, i in enumerate(rng.permutation(k)):
+            step = delta if x[i] + delta <= 1 else -delta
+            x = x.copy()
+            x[i] += step
+            design[t, s + 1] = x
+            steps[t, s], moved[t, s] = step, i
+
+    years, y = evaluate(args, problem, design.reshape(-1, k), metric, workers)
+    y = y.reshape(trajectories, k + 1, -1)
+
+    effects = np.empty((k, trajectories, y.shape[-1]))
+    for t in range(trajectories):
+        effects[moved[t], t] = (y[t, 1:] - y[t, :-1]) / steps[t][:, None]
+    return {
+        "method": "morris",
+        "factors": list(problem),
+        "years": years,
+        "metric": metric,
+        "evaluations": trajectories * (k + 1),
+        "mu": effects.mean(axis=1),
+        "mu_star": np.abs(effects).mean(axis=1),
+        "sigma": effects.std(axis=1, ddof=1) if trajectories > 1 else np.zeros((k, y.shape[-1])),
+    }
+
+
+def evaluate(args, problem, design, metric="population", workers=None):
+    """
+    Batched model evaluation of a unit-cube design.
+
+    Rows with the same num_companies and project sizes (on the conceptor
+    slider steps) share one schedule, and their allocation is one
+    allocate_units() call broadcast over the remaining factors. Chunks of
+    rows run on a process pool.
+
+    Input:
+      design: (rows, factor) values in [0, 1], mapped linearly onto problem ranges
+    Output:
+      (years, (rows, year) cumulative metric)
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric: {metric}")
+    params = sim.normalize_args(args)
+    shares = {f"household_shares.{size}" for size in params["household_shares_estimates"]}
+    unknown = [f for f in problem if f not in FACTORS and f not in shares]
+    if unknown:
+        raise ValueError(f"Unknown sensitivity factors: {unknown}")
+    design = np.asarray(design, dtype=np.float64)
+
+    # rows sharing a schedule go to the same chunk
+    shared = [i for i, name in enumerate(problem) if name in ("num_companies", "project_size_scale")]
+    order = np.lexsort(design[:, shared].T[::-1]) if shared else np.arange(len(design))
+    sorted_design = design[order]
+    chunks = [sorted_design[i:i + CHUNK_SIZE] for i in range(0, len(design), CHUNK_SIZE)]
+    jobs = [(params, dict(problem), chunk, metric) for chunk in chunks]
+
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            yearly = list(executor.map(_evaluate_chunk, *zip(*jobs)))
+    else:
+        yearly = [_evaluate_chunk(*job) for job in jobs]
+
+    # common horizon from base_year, then cumulative
+    horizon = max((y.shape[1] for y in yearly), default=0)
+    cumulative = np.empty((len(design), horizon))
+    cumulative[order] = np.cumsum(
+        np.concatenate([np.pad(y, ((0, 0), (0, horizon - y.shape[1]))) for y in yearly]), axis=1
+    )
+    first = int(np.argmax(cumulative.any(axis=0))) if horizon else 0
+    return params["base_year"] + np.arange(first, horizon), cumulative[:, first:]
+
+
+def _factor_values(problem, design):
+    # unit cube -> factor values; integer factors get equal-width bins
+    values = {}
+    for i, (name, (low, high)) in enumerate(problem.items()):
+        u = design[:, i]
+        if name in INTEGER_FACTORS:
+            values[name] = np.minimum(np.floor(low + u * (high - low + 1)), high).astype(np.int64)
+        else:
+            values[name] = low + u * (high - low)
+    return values
+
+
+def _household_shares(household_shares, values, idx):
+    # household distributions with the sampled family shares, as (n, 1) arrays
+    shares = {}
+    for size, share in household_shares.items():
+        p = np.asarray(share["distribution"], dtype=np.float64)
+        rows = np.tile(p, (len(idx), 1))
+        name = f"household_shares.{size}"
+        if name in values:
+            family = values[name][idx]
+            rest = p[1:].sum()
+            rows[:, 0] = family
+            rows[:, 1:] = (p[1:] / rest if rest > 0 else np.array([1.0] + [0.0] * (len(p) - 2)))[None, :] \
+                * (p.sum() - family)[:, None]
+        shares[size] = {**share, "distribution": [rows[:, [i]] for i in range(len(p))]}
+    return shares
+
+
+def _sized_buildings(buildings, scale):
+    """
+    Building groups with project sizes scaled at fixed total volume, sized as
+    conceptor() does: the size on the type's project size slider step, and
+    count = volume // size. Nearby scales give the same groups; scale 1
+    keeps the groups as they are.
+    """
+    if scale == 1:
+        return list(buildings)
+    sized = []
+    for b in buildings:
+        ui = building_types.spec(b["type"])["conceptor"]
+        step = ui["project"][3] if ui else 1
+        gfa = max(step, round(b["gfa"] * scale / step) * step)
+        count = int(b["gfa"] * b["count"] // gfa)
+        if count > 0:
+            sized.append({**b, "gfa": float(gfa), "count": count})
+    return sized
+
+
+def _evaluate_chunk(params, problem, design, metric):
+    """
+    (rows, years from base_year) metric completed per year for a design chunk.
+    """
+    n = len(design)
+    values = _factor_values(problem, design)
+
+    def column(name):
+        return np.broadcast_to(values.get(name, params.get(name, 1.0)), n)
+
+    companies, scale, start = column("num_companies"), column("project_size_scale"), column("pre_con_time")
+
+    # rows grouped by schedule: (num_companies, sized buildings)
+    keys, sized = {}, {}
+    for i, (num_companies, project_size_scale) in enumerate(zip(companies.tolist(), scale.tolist())):
+        if project_size_scale not in sized:
+            sized[project_size_scale] = _sized_buildings(params["buildings"], project_size_scale)
+        buildings = sized[project_size_scale]
+        key = (num_companies, tuple((b["type"], b["gfa"], b["count"], b.get("phase")) for b in buildings))
+        keys.setdefault(key, (buildings, []))[1].append(i)
+
+    parts, memo = [], {}
+    for (num_companies, _), (buildings, idx) in keys.items():
+        idx = np.array(idx)
+        scenario = {
+            **params,
+            "num_companies": int(num_companies),
+            "buildings": buildings,
+        }
+        points = sim._schedule_points(scenario, memo)
+        if len(points["day"]) == 0:
+            continue
+
+        units = sim.allocate_units(
+            points["group_types"],
+            points["group_gfa"],
+            household_shares=_household_shares(params["household_shares_estimates"], values, idx),
+            policy=params["unit_size_policy"],
+            avg_family_size=column("avg_family_size")[idx, None],
+            apt_efficiency=column("apt_efficiency")[idx, None],
+        )
+        if metric == "population":
+            per_project = units["families"] + units["singles"] + units["other"]
+        elif metric == "units":
+            per_project = units["small"] + units["medium"] + units["large"]
+        else:
+            per_project = units[metric]
+        per_project = np.broadcast_to(per_project, (len(idx), len(points["group_gfa"])))
+
+        rows = start[idx, None] + points["day"] // sim.DAYS_PER_YEAR
+        parts.append((idx, rows, per_project[:, points["group"]] * points["count"]))
+
+    horizon = max((int(rows.max()) + 1 for _, rows, _ in parts), default=0)
+    yearly = np.zeros((n, horizon))
+    for idx, rows, weights in parts:
+        cell = (np.arange(len(idx))[:, None] * horizon + rows).ravel()
+        yearly[idx] = np.bincount(cell, weights=weights.ravel(), minlength=len(idx) * horizon).reshape(len(idx), horizon)
+    return yearly
+
+
+def _ratio(num, den):
+    # indices of years without output variance are 0
+    return np.divide(num, den, out=np.zeros_like(num), where=den > 0)
@@ -0,0 +1,429 @@
+# headless HTTP API around sim.main_sim (ASGI, no framework needed)
+#   run: python service.py --port 8000   (uses uvicorn)
+import asyncio
+import json
+import os
+import threading
+import time
+import concurrent.futures
+
+import impacts
+import profiling
+import sim
+
+MAX_WORKERS = int(os.environ.get("PROJECTOR_WORKERS", os.cpu_count() or 1))
+MAX_QUEUE = int(os.environ.get("PROJECTOR_MAX_QUEUE", 32))
+REQUEST_TIMEOUT = float(os.environ.get("PROJECTOR_TIMEOUT", 30))
+MAX_BATCH = 100   # per request; services admitting fewer runs at once clamp it to their capacity
+# profile every run (per-stage numbers then show up in /metrics)
+PROFILE = os.environ.get("PROJECTOR_PROFILE", "0") == "1"
+
+
+class PlainText(str):
+    """Handler result sent as text/plain instead of JSON."""
+
+
+class RequestError(Exception):
+    """Client error with an HTTP status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# -------- request schemas -------
+
+def _number(value, name, minimum=None, maximum=None):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise RequestError(422, f"{name} must be a number")
+    if (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+        raise RequestError(422, f"{name} out of range [{minimum}, {maximum}]")
+    return value
+
+
+def _object(value, name):
+    if not isinstance(value, dict):
+        raise RequestError(422, f"{name} must be an object")
+    return value
+
+
+def _numbers(value, name, length, minimum=None, maximum=None, nullable=False):
+    # fixed-length list of numbers (None allowed where nullable)
+    if not isinstance(value, list) or len(value) != length:
+        raise RequestError(422, f"{name} must be a list of {length} numbers")
+    for i, v in enumerate(value):
+        if not (nullable and v is None):
+            _number(v, f"{name}[{i}]", minimum, maximum)
+    return value
+
+
+def _validate_shares(shares):
+    # {size class: {'range': [min, max], 'distribution': [families, singles, other] %}}
+    _object(shares, "household_shares_estimates")
+    missing = {"small", "medium", "large", "family_houses"} - set(shares)
+    if missing:
+        raise RequestError(422, f"household_shares_estimates misses {sorted(missing)}")
+    for size, share in shares.items():
+        name = f"household_shares_estimates.{size}"
+        _object(share, name)
+        _numbers(share.get("range"), f"{name}.range", 2, minimum=0)
+        _numbers(share.get("distribution"), f"{name}.distribution", 3, minimum=0, maximum=100)
+
+
+def _validate_construction_times(times):
+    # {building type: {'constime': months}}
+    _object(times, "construction_times")
+    for btype, spec in times.items():
+        name = f"construction_times.{btype}"
+        _object(spec, name)
+        if set(spec) - {"constime"}:
+            raise RequestError(422, f"{name} only takes 'constime'")
+        if "constime" in spec:
+            _number(spec["constime"], f"{name}.constime", 0.1, 600)
+
+
+def _validate_policy(policy):
+    # {building type: [pct_small_max, size1, pct_large_min, size2]}
+    _object(policy, "unit_size_policy")
+    for btype, rule in policy.items():
+        _numbers(rule, f"unit_size_policy.{btype}", 4, minimum=0, nullable=True)
+        for i in (0, 2):
+            _number(rule[i], f"unit_size_policy.{btype}[{i}]", 0, 100)
+
+
+def _validate_phases(phases):
+    # [{'name', 'pre_con_time' (years), 'after': [phase names]}]
+    if not isinstance(phases, list):
+        raise RequestError(422, "phases must be a list or null")
+    names = set()
+    for i, phase in enumerate(phases):
+        _object(phase, f"phases[{i}]")
+        if set(phase) - {"name", "pre_con_time", "after"}:
+            raise RequestError(422, f"phases[{i}] has unknown keys: {sorted(set(phase) - {'name', 'pre_con_time', 'after'})}")
+        if not isinstance(phase.get("name"), str) or phase["name"] in names:
+            raise RequestError(422, f"phases[{i}] needs a unique string 'name'")
+        names.add(phase["name"])
+        _number(phase.get("pre_con_time", 0), f"phases[{i}].pre_con_time", 0, 100)
+        after = phase.get("after", [])
+        if not isinstance(after, list) or not all(isinstance(a, str) for a in after):
+            raise RequestError(422, f"phases[{i}].after must be a list of phase names")
+    for i, phase in enumerate(phases):
+        unknown = set(phase.get("after", [])) - names
+        if unknown:
+            raise RequestError(422, f"phases[{i}].after has unknown phases: {sorted(unknown)}")
+    return names
+
+
+def _validate_impacts(overrides):
+    # {kernel: {coefficient: number or {building type: number}}}
+    _object(overrides, "impacts")
+    for name, coefficients in overrides.items():
+        if name not in impacts.KERNELS:
+            raise RequestError(422, f"impacts.{name} is not an impact kernel: {sorted(impacts.KERNELS)}")
+        _object(coefficients, f"impacts.{name}")
+        defaults = impacts.KERNELS[name]["coefficients"]
+        for key, value in coefficients.items():
+            if key not in defaults:
+                raise RequestError(422, f"impacts.{name}.{key} is not a coefficient: {sorted(defaults)}")
+            if isinstance(defaults[key], dict):
+                for btype, v in _object(value, f"impacts.{name}.{key}").items():
+                    _number(v, f"impacts.{name}.{key}.{btype}")
+            else:
+                _number(value, f"impacts.{name}.{key}")
+
+
+def validate_args(args):
+    """
+    Checks a main_sim args dict (see sim.main_sim for the keys).
+    Unknown keys are rejected so typos do not silently fall back to defaults.
+    """
+    if not isinstance(args, dict):
+        raise RequestError(422, "args must be an object")
+
+    known = {
+        "buildings", "pre_con_time", "construction_times", "num_companies",
+        "unit_size_policy", "household_shares_estimates", "avg_family_size",
+        "apt_efficiency", "engine", "base_year", "phases", "impacts",
+    }
+    unknown = set(args) - known
+    if unknown:
+        raise RequestError(422, f"unknown args: {sorted(unknown)}")
+
+    phases = _validate_phases(args["phases"]) if args.get("phases") is not None else set()
+
+    buildings = args.get("buildings", [])
+    if not isinstance(buildings, list):
+        raise RequestError(422, "buildings must be a list")
+    for i, b in enumerate(buildings):
+        if not isinstance(b, dict) or not isinstance(b.get("type"), str):
+            raise RequestError(422, f"buildings[{i}] needs a string 'type'")
+        if set(b) - {"type", "gfa", "count", "phase"}:
+            raise RequestError(422, f"buildings[{i}] has unknown keys: {sorted(set(b) - {'type', 'gfa', 'count', 'phase'})}")
+        if b.get("phase") is not None and b["phase"] not in phases:
+            raise RequestError(422, f"buildings[{i}].phase is not one of the phases")
+        _number(b.get("gfa"), f"buildings[{i}].gfa", minimum=1)
+        count = b.get("count", 1)
+        if isinstance(count, bool) or not isinstance(count, int) or count < 0:
+            raise RequestError(422, f"buildings[{i}].count must be a non-negative integer")
+
+    for key, lo, hi in (
+        ("pre_con_time", 0, 100),
+        ("num_companies", 1, 1000),
+        ("avg_family_size", 0, 20),
+        ("apt_efficiency", 0.1, 1),
+        ("base_year", 1900, 2500),
+    ):
+        if args.get(key) is not None:
+            _number(args[key], key, lo, hi)
+
+    for key, validate in (
+        ("construction_times", _validate_construction_times),
+        ("unit_size_policy", _validate_policy),
+        ("household_shares_estimates", _validate_shares),
+        ("impacts", _validate_impacts),
+    ):
+        if args.get(key) is not None:
+            validate(args[key])
+
+    if args.get("engine", "listsched") not in sim.ENGINES:
+        raise RequestError(422, f"engine must be one of {list(sim.ENGINES)}")
+
+    return args
+
+
+def validate_simulate(payload):
+    """
+    POST /simulate
+      {"args": {...main_sim args}, "aggregate": false, "profile": false}
+    """
+    if not isinstance(payload, dict):
+        raise RequestError(422, "request body must be an object")
+    return {
+        "args": validate_args(payload.get("args", {})),
+        "aggregate": bool(payload.get("aggregate", False)),
+        "profile": bool(payload.get("profile", PROFILE)),
+    }
+
+
+def validate_batch(payload, max_runs=MAX_BATCH):
+    """
+    POST /simulate/batch
+      {"runs": [{"args": {...}, "aggregate": false, "profile": false}, ...]}
+    max_runs: batch size limit (the service passes its admission capacity)
+    """
+    if not isinstance(payload, dict) or not isinstance(payload.get("runs"), list):
+        raise RequestError(422, "request body must be an object with a 'runs' list")
+    if not 0 < len(payload["runs"]) <= max_runs:
+        raise RequestError(422, f"runs must have 1..{max_runs} items")
+    return [validate_simulate(run) for run in payload["runs"]]
+
+
+# -------- worker side -------
+
+def run_simulation(request):
+    """Executed in the worker pool; returns the JSON-ready main_sim response."""
+    args = dict(request["args"])
+    args.setdefault("engine", "listsched")
+    response = sim.main_sim(
+        args, output="records", aggregate=request["aggregate"], profile=request["profile"]
+    )
+    response.pop("recomputed", None)
+    response["hash"] = sim.args_hash(args)   # run id for clients; main_sim only hashes with cache on
+    return response
+
+
+# -------- service -------
+
+class SimulationService:
+    """
+    ASGI app. CPU-bound runs go to a bounded executor (processes by default);
+    at most max_workers + max_queue runs are admitted at once, the rest get 429
+    (batches that could never fit get 422). A run holds its slot until the
+    executor has actually finished it, so runs outliving a timed-out request
+    still count. Each request is limited to timeout seconds (504).
+    GET /metrics serves request counters and profiled stage totals as Prometheus text.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS, max_queue=MAX_QUEUE, timeout=REQUEST_TIMEOUT,
+                 processes=True):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.processes = processes
+        self.pending = 0
+        self._lock = threading.Lock()   # pending is released from executor threads
+        self.metrics = profiling.MetricsRegistry()
+        self._executor = None
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            pool = (concurrent.futures.ProcessPoolExecutor if self.processes
+                    else concurrent.futures.ThreadPoolExecutor)
+            self._executor = pool(max_workers=self.max_workers)
+        return self._executor
+
+    @property
+    def capacity(self):
+        return self.max_workers + self.max_queue
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _release(self, future):
+        # done-callback of an executor future: runs on completion or cancellation
+        with self._lock:
+            self.pending -= 1
+
+    async def _submit(self, requests):
+        with self._lock:
+            if self.pending + len(requests) > self.capacity:
+                raise RequestError(429, "simulation queue is full, retry later")
+            self.pending += len(requests)
+
+        futures = []
+        try:
+            for request in requests:
+                future = self.executor.submit(run_simulation, request)
+                future.add_done_callback(self._release)
+                futures.append(future)
+        finally:
+            with self._lock:
+                self.pending -= len(requests) - len(futures)   # never submitted
+
+        try:
+            results = await asyncio.wait_for(
+                asyncio.gather(*(asyncio.wrap_future(f) for f in futures)), self.timeout
+            )
+            for result in results:
+                if "metrics" in result:
+                    self.metrics.observe(result["metrics"])
+            return results
+        except asyncio.TimeoutError:
+            raise RequestError(504, f"simulation exceeded {self.timeout} s")
+        except ValueError as e:
+            raise RequestError(422, str(e))
+        except Exception as e:   # worker crash or a bug: still a JSON response
+            raise RequestError(500, f"simulation failed: {type(e).__name__}: {e}")
+        finally:
+            # drops queued runs; running ones release their slot when they end
+            for future in futures:
+                future.cancel()
+
+    async def handle(self, method, path, payload):
+        if path == "/health":
+            if method != "GET":
+                raise RequestError(405, "method not allowed")
+            return {"status": "ok", "pending": self.pending, "workers": self.max_workers}
+
+        if path == "/metrics":
+            if method != "GET":
+                raise RequestError(405, "method not allowed")
+            return PlainText(self.metrics.to_prometheus()
+                             + f"# TYPE projector_pending gauge\nprojector_pending {self.pending}\n")
+
+        if path in ("/simulate", "/simulate/batch"):
+            if method != "POST":
+                raise RequestError(405, "method not allowed")
+            if path == "/simulate":
+                (result,) = await self._submit([validate_simulate(payload)])
+                return result
+            return {"results": await self._submit(validate_batch(payload, min(MAX_BATCH, self.capacity)))}
+
+        raise RequestError(404, "not found")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    self.shutdown()
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+
+        t = time.perf_counter()
+        try:
+            payload = json.loads(body) if body else None
+        except ValueError:
+            status, result = 400, {"error": "invalid JSON"}
+        else:
+            try:
+                status, result = 200, await self.handle(scope["method"], scope["path"], payload)
+            except RequestError as e:
+                status, result = e.status, {"error": e.message}
+
+        if scope["path"] != "/metrics":
+            self.metrics.inc("requests_total", path=scope["path"], status=status)
+            self.metrics.inc("request_seconds_total", time.perf_counter() - t, path=scope["path"])
+
+        if isinstance(result, PlainText):
+            data, content_type = result.encode("utf-8"), b"text/plain; version=0.0.4"
+        else:
+            data, content_type = json.dumps(result).encode("utf-8"), b"application/json"
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", content_type),
+                        (b"content-length", str(len(data)).encode())],
+        })
+        await send({"type": "http.response.body", "body": data})
+
+
+class LocalClient:
+    """
+    In-process client for the ASGI app (no sockets), e.g. for tests:
+        status, data = LocalClient(SimulationService(processes=False)).post("/simulate", {...})
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def request(self, method, path, payload=None):
+        body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        scope = {"type": "http", "method": method, "path": path, "headers": []}
+        sent = []
+
+        async def receive():
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send(message):
+            sent.append(message)
+
+        await self.app(scope, receive, send)
+        status = sent[0]["status"]
+        data = b"".join(m.get("body", b"") for m in sent[1:])
+        if dict(sent[0]["headers"])[b"content-type"] == b"application/json":
+            return status, json.loads(data)
+        return status, data.decode("utf-8")
+
+    def get(self, path):
+        return asyncio.run(self.request("GET", path))
+
+    def post(self, path, payload):
+        return asyncio.run(self.request("POST", path, payload))
+
+
+app = SimulationService()
+
+
+if __name__ == "__main__":
+    import argparse
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Zoning projector simulation API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    opts = parser.parse_args()
+    uvicorn.run("service:app", host=opts.host, port=opts.port)
@@ -1,761 +1,1552 @@
 #coded in API-ready format..
-import streamlit as st
-import pandas as pd
-import simpy
+# UI-free simulation core: the Streamlit widgets live in widgets.py and the
+# charts in plots.py; simpy and pandas are imported only when used
 import numpy as np
 import datetime
-import uuid
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+import heapq
+import importlib
+import itertools
+from result_cache import LRUCache
+from pipeline import Pipeline, Stage, stable_hash
+import building_types
+import impacts
+import profiling
 
+DAYS_PER_YEAR = 365
+DAYS_PER_MONTH = 30
 
-def main_sim(args):
+# construction engines: 'simpy' is the reference event loop, 'listsched' the closed-form equivalent
+ENGINES = ("simpy", "listsched")
+
+# Default construction times in months (from the building type registry)
+DEFAULT_CONSTRUCTION_TIMES = {
+    name: {"constime": spec["constime"]} for name, spec in building_types.TYPES.items()
+}
+
+
+# shared across sessions: the module is imported once per server process
+# holds {stage name: result} per args hash
+RESULT_CACHE = LRUCache(
+    maxsize=128, max_bytes=256 * 2**20, ttl=3600,
+    sizeof=lambda results: sum(r.nbytes for r in results.values()),
+)
+
+
+def main_sim(args, engine=None, output="records", cache=False, aggregate=False, profile=False):
     """
     Orchestrates:
-      1) project-level construction timing (SimPy)
+      1) project-level construction timing (SimPy or list scheduling)
       2) unit-size allocation & population estimation
+      3) aggregation into a (year, type) YearlyCube
+      4) impact indicators of the cube (see impacts.KERNELS)
 
     Expected keys in args:
-      - buildings: list of {type, gfa} dicts from conceptor()
+      - buildings: list of {type, gfa, count} project groups from conceptor()
+        (count is optional, default 1)
       - pre_con_time: infra lead time (years)
+      - phases: optional list of {name, pre_con_time, after} infrastructure
+        phases (see phase_schedule); buildings then take an optional 'phase'
       - construction_times: optional per-type durations (months)
       - num_companies: parallel construction capacity
       - unit_size_policy: {'apartment-condo': [pct_small_max, size1, pct_large_min, size2]} or None
       - household_shares_estimates: dict with 'small','medium','large','family_houses'
       - avg_family_size: numeric
       - apt_efficiency: apartment-condo efficiency (0.7 - 0.9 typically)
+      - engine: optional construction engine, 'simpy' (default) or 'listsched'
+      - base_year: optional start year (default: current year); fix it for reproducible runs
+      - impacts: optional {kernel name: coefficient overrides} of the impact kernels
+
+    engine kwarg overrides args['engine'].
+    output: 'records' returns the body as a list of dicts (JSON-ready),
+            'table' as a ProjectTable.
+    cache: reuse results of identical normalized args from RESULT_CACHE, and
+           per-stage results from SIM_PIPELINE (cached tables are read-only).
+           Args are only hashed with cache on.
+
+    aggregate: also return the YearlyCube as 'cube' and the impact indicators as
+               'impacts', a YearlyCube with one metric per kernel (dicts for output='records').
+
+    profile: record per-stage wall time, tracemalloc allocations, row counts and
+             SimPy event counts into 'metrics' (see profiling.to_prometheus).
+
+    Response: {'body': ..., 'hash': args_hash of the normalized args (None without cache),
+               'recomputed': names of the stages that actually ran[, 'cube': ...][, 'metrics': ...]
+               [, 'critical_path': ... (with phases, see critical_path)]}
+    """
+
+    profiler = profiling.Profiler() if profile else profiling.NULL_PROFILER
+
+    with profiling.activate(profiler):
+        try:
+            with profiler.stage("normalize"):
+                params = normalize_args(args, engine=engine)
+                # params are normalized already: same as args_hash(params)
+                key = stable_hash(params) if cache else None
+
+            results = RESULT_CACHE.get(key) if cache else None
+            recomputed = []
+
+            if results is None:
+                results, recomputed = SIM_PIPELINE.run(params, memo=cache)
+                if cache:
+                    RESULT_CACHE.put(key, results)
+
+            sim_data = results["allocation"]
+            cube = results["aggregation"]
+            indicators = results["impacts"]
+            path = critical_path(params, results["construction"]) if params["phases"] else None
+            if output == "records":
+                with profiler.stage("output"):
+                    sim_data = sim_data.to_records()
+                    if aggregate:
+                        cube = cube.to_dict()
+                        indicators = indicators.to_dict()
+                profiler.record("output", rows=len(sim_data))
+        finally:
+            profiler.close()
+
+    response = {"body": sim_data, "hash": key, "recomputed": recomputed}
+    if aggregate:
+        response["cube"] = cube
+        response["impacts"] = indicators
+    if path is not None:
+        response["critical_path"] = path
+    if profile:
+        response["metrics"] = profiler.as_dict()
+    return response
+
+
+def main_sim_iter(args, output="records"):
+    """
+    Streaming main_sim: yields {'year': ..., 'body': ...} per completion year,
+    in year order, as the schedule advances.
+
+    Uses the list-scheduling engine lazily (iter_schedule) and allocates each
+    year on its own, so memory is bounded by one year's output plus one
+    in-flight project per worker. The concatenated bodies equal main_sim's.
+    output: 'records' or 'table', as in main_sim.
+    """
+    params = normalize_args(args)
+    buildings = _project_groups(params["buildings"])
+    group_gfa = buildings["gfa"].astype(np.float64)
+    group_counts = buildings["count"].astype(np.int64)
+    group_start = np.cumsum(group_counts) - group_counts
+    start_year = params["base_year"] + params["pre_con_time"]
+    releases = _group_releases(params["buildings"], params["phases"])
+    queues = _type_queues(buildings, params["construction_times"], params["num_companies"], releases)
+    group_days = _group_durations(len(buildings), queues)
+
+    streams = []
+    for code, groups, durations, worker_count in queues:
+        counts = group_counts[groups]
+        streams.append({
+            "code": code,
+            "groups": groups,
+            "counts": counts,
+            "chunks": iter_schedule(durations, worker_count, counts=counts, releases=releases[groups]),
+            "next": None,     # pulled chunk not yet buffered
+            "pos": 0,         # queue position of the next chunk
+            "buffer": [],     # (positions, finish_days, worker_ids) started, not yet emitted
+        })
+
+    year = start_year
+    while streams:
+        # projects finishing before `boundary` complete in `year` or earlier
+        boundary = (year - start_year + 1) * DAYS_PER_YEAR
+        batches = []
+
+        for s in streams:
+            while True:
+                if s["next"] is None:
+                    s["next"] = next(s["chunks"], None)
+                if s["next"] is None or s["next"][0] >= boundary:
+                    break
+                _, finish_days, worker_ids = s["next"]
+                positions = np.arange(s["pos"], s["pos"] + len(finish_days))
+                s["buffer"].append((positions, finish_days, worker_ids))
+                s["pos"] += len(finish_days)
+                s["next"] = None
+
+            if not s["buffer"]:
+                continue
+            positions, finish_days, worker_ids = (np.concatenate(col) for col in zip(*s["buffer"]))
+            done = finish_days < boundary
+            s["buffer"] = [(positions[~done], finish_days[~done], worker_ids[~done])] if (~done).any() else []
+
+            if done.any():
+                job_group, job_ids = _job_ids(positions[done], s["groups"], s["counts"], group_start)
+                con_days = params["pre_con_time"] * DAYS_PER_YEAR + finish_days[done].astype(np.int64)
+                batches.append(_batch_jobs(s["code"], job_group, job_ids, con_days, worker_ids[done], group_gfa,
+                                           group_days, params["base_year"]))
+
+        streams = [s for s in streams if s["buffer"] or s["next"] is not None]
+
+        if batches or streams:
+            if not batches:
+                # year without completions (for plotting continuity)
+                batches.append(_filler_rows(np.array([year]), buildings.code("none"), params["base_year"]))
+
+            sim_data = _allocation_stage(params, _batch_table(batches, buildings.types))
+            if output == "records":
+                sim_data = sim_data.to_records()
+            yield {"year": year, "body": sim_data}
+
+        year += 1
+
+
+# axes that broadcast inside one allocate_units() call
+GRID_POLICY_AXES = ("pct_small_max", "pct_large_min")
+
+
+def main_sim_grid(base_args, axes):
     """
+    Evaluates main_sim over the Cartesian grid of axes in one pass.
 
-    buildings_data = args.get("buildings", [])
-    pre_con_time = int(args.get("pre_con_time", 2))
-    construction_times = args.get("construction_times", None)
-    num_companies = int(args.get("num_companies", 1))
+    Input:
+      base_args: main_sim args shared by all scenarios
+      axes: {name: values}; a name is any main_sim arg (num_companies,
+            pre_con_time, apt_efficiency, avg_family_size, unit_size_policy, ...)
+            or 'pct_small_max' / 'pct_large_min' of the apartment-condo policy
+    Output:
+      ScenarioGrid (scenario x year x type x metric)
 
-    unit_size_policy = args.get("unit_size_policy", None)
-    household_shares_estimates = args.get("household_shares_estimates", None)
-    avg_family_size = float(args.get("avg_family_size", 3.5))
-    apt_efficiency = float(args.get("apt_efficiency", 0.8))
+    Scenarios with the same buildings, phases, construction_times and num_companies
+    share one schedule (pre_con_time and base_year only shift it); scenarios
+    with the same buildings and household shares share one allocate_units()
+    call broadcast over their efficiency, family size and policy percentages.
+    """
+    axes = {name: list(values) for name, values in axes.items()}
+    base = normalize_args(base_args, engine="listsched")
 
-    # 1) simulate construction timing
-    constructed_buildings = construction(
-        buildings_data,
-        pre_con_time=pre_con_time,
-        construction_times=construction_times,
-        num_companies=num_companies,
+    # canonical axis values, then one params dict per scenario
+    overrides = {
+        name: [v if name in GRID_POLICY_AXES else normalize_args({name: v})[name] for v in values]
+        for name, values in axes.items()
+    }
+    scenarios, positions = [], []
+    for combo in itertools.product(*(range(len(v)) for v in overrides.values())):
+        chosen = {k: overrides[k][j] for k, j in zip(overrides, combo)}
+        params = {**base, **{k: v for k, v in chosen.items() if k not in GRID_POLICY_AXES}}
+        policy = (params["unit_size_policy"] or {}).get("apartment-condo") or [75, None, 10, None]
+        params["pct_small_max"] = float(chosen.get("pct_small_max", policy[0]))
+        params["pct_large_min"] = float(chosen.get("pct_large_min", policy[2]))
+        scenarios.append(params)
+        positions.append(dict(zip(overrides, combo)))
+    n = len(scenarios)
+
+    def group_by(*keys):
+        # scenarios with equal values of keys; axis values compare by position
+        groups = {}
+        for i, position in enumerate(positions):
+            groups.setdefault(tuple(position.get(k, -1) for k in keys), []).append(i)
+        return [np.array(idx) for idx in groups.values()]
+
+    schedules = {}
+    for idx in group_by("buildings", "phases", "construction_times", "num_companies"):
+        points = _schedule_points(scenarios[idx[0]])
+        for i in idx.tolist():
+            schedules[i] = points
+
+    types = list(dict.fromkeys(t for points in schedules.values() for t in points["types"]))
+    types.sort(key=lambda t: BUILDING_TYPES.index(t) if t in BUILDING_TYPES else len(BUILDING_TYPES))
+
+    start = np.array([p["base_year"] + p["pre_con_time"] for p in scenarios], dtype=np.int64)
+    end = np.array([
+        start[i] + (int(schedules[i]["day"].max()) // DAYS_PER_YEAR if len(schedules[i]["day"]) else -1)
+        for i in range(n)
+    ])
+    first_year = int(start.min()) if n else 0
+    n_years = int(end.max()) - first_year + 1 if n else 0
+    n_types = len(types)
+
+    values = np.zeros((n, n_years, n_types, len(CUBE_METRICS)))
+    feasible = np.ones(n, dtype=bool)
+
+    for idx in group_by("buildings", "phases", "household_shares_estimates", "construction_times", "num_companies"):
+        points = schedules[int(idx[0])]
+        if len(points["day"]) == 0:
+            continue
+
+        def column(key):
+            return np.array([scenarios[i][key] for i in idx.tolist()], dtype=np.float64)[:, None]
+
+        units = allocate_units(
+            points["group_types"],
+            points["group_gfa"],
+            household_shares=scenarios[idx[0]]["household_shares_estimates"],
+            policy={"apartment-condo": [column("pct_small_max"), None, column("pct_large_min"), None]},
+            avg_family_size=column("avg_family_size"),
+            apt_efficiency=column("apt_efficiency"),
+            strict=False,
+        )
+        names, codes = building_types.type_codes(points["group_types"])
+        apartments = building_types.compile_types(names)["apartment"][codes]
+        ok = ~(apartments & (np.broadcast_to(units["medium"], (len(idx), len(apartments))) < 0)).any(axis=1)
+        feasible[idx] = ok
+
+        # completion (year, type) cell per (scenario, point)
+        type_idx = np.array([types.index(t) for t in points["types"]])[points["type"]]
+        rows = (start[idx] - first_year)[:, None] + points["day"] // DAYS_PER_YEAR
+        cell = ((np.arange(len(idx))[:, None] * n_years + rows) * n_types + type_idx).ravel()
+
+        per_project = {
+            "volume": points["group_gfa"],
+            "units": units["small"] + units["medium"] + units["large"],
+            "families": units["families"],
+            "singles": units["singles"],
+            "other": units["other"],
+        }
+        for k, m in enumerate(CUBE_METRICS):
+            weights = np.broadcast_to(per_project[m], (len(idx), len(points["group_gfa"])))[:, points["group"]]
+            values[idx, :, :, k] = np.bincount(
+                cell, weights=(weights * points["count"]).ravel(), minlength=len(idx) * n_years * n_types
+            ).reshape(len(idx), n_years, n_types)
+
+    values[~feasible, :, :, 1:] = np.nan   # all but volume
+    return ScenarioGrid(axes, np.arange(first_year, first_year + n_years), types, values, feasible)
+
+
+# 1) simulate construction timing
+def _construction_stage(params):
+    return construction(
+        params["buildings"],
+        pre_con_time=params["pre_con_time"],
+        phases=params["phases"],
+        construction_times=params["construction_times"],
+        num_companies=params["num_companies"],
+        engine=params["engine"],
+        base_year=params["base_year"],
     )
 
-    # 2) allocate units & population
-    sim_data = apply_unit_size_policy(
+
+# 2) allocate units & population
+def _allocation_stage(params, constructed_buildings):
+    return apply_unit_size_policy(
         constructed_buildings,
-        household_shares=household_shares_estimates,
-        policy=unit_size_policy,
-        avg_family_size=avg_family_size,
-        apt_efficiency=apt_efficiency,
+        household_shares=params["household_shares_estimates"],
+        policy=params["unit_size_policy"],
+        avg_family_size=params["avg_family_size"],
+        apt_efficiency=params["apt_efficiency"],
+    )
+
+
+# 4) impact kernels, fused over the aggregated cube
+def _impact_stage(params, cube):
+    names, values = impacts.evaluate(cube.values, cube.types, cube.metrics, overrides=params["impacts"])
+    return YearlyCube(cube.years, cube.types, values, metrics=names)
+
+
+def _freeze(result):
+    if isinstance(result, ProjectTable):
+        return result.freeze()
+    result.values.flags.writeable = False
+    return result
+
+
+# main_sim stages, each memoized (with cache=True) on the args it reads
+SIM_PIPELINE = Pipeline([
+    Stage("construction", _construction_stage,
+          reads=("buildings", "pre_con_time", "phases", "construction_times", "num_companies", "engine", "base_year")),
+    Stage("allocation", _allocation_stage,
+          reads=("household_shares_estimates", "unit_size_policy", "avg_family_size", "apt_efficiency"),
+          after=("construction",)),
+    Stage("aggregation", lambda params, sim_data: aggregate(sim_data),
+          reads=(), after=("allocation",)),
+    Stage("impacts", _impact_stage, reads=("impacts",), after=("aggregation",)),
+], freeze=_freeze)
+
+
+def normalize_args(args, engine=None):
+    """
+    Canonical main_sim args: defaults filled in, numbers as floats/ints,
+    consecutive identical projects merged into (type, gfa, count) groups.
+    Equivalent inputs normalize to the same dict (and args_hash).
+    """
+    buildings = args.get("buildings", [])
+    if isinstance(buildings, ProjectTable):
+        buildings = ProjectTable({
+            "type": buildings["type"],
+            "gfa": buildings["gfa"],
+            "count": buildings["count"] if "count" in buildings else np.ones(len(buildings)),
+        }, types=buildings.types).to_records()
+
+    groups = []
+    for b in buildings:
+        btype, gfa, count = b["type"], float(b["gfa"]), int(b.get("count", 1))
+        phase = b.get("phase")
+        if count <= 0:
+            continue
+        if groups and groups[-1]["type"] == btype and groups[-1]["gfa"] == gfa and groups[-1].get("phase") == phase:
+            groups[-1]["count"] += count
+        else:
+            groups.append({"type": btype, "gfa": gfa, "count": count})
+            if phase is not None:
+                groups[-1]["phase"] = str(phase)
+
+    phases = [
+        {"name": str(p["name"]), "pre_con_time": float(p.get("pre_con_time", 0)),
+         "after": sorted(str(a) for a in p.get("after", ()))}
+        for p in args.get("phases", None) or []
+    ]
+
+    base_year = args.get("base_year", None)
+    if base_year is None:
+        base_year = datetime.datetime.now().year
+
+    return {
+        "buildings": groups,
+        "pre_con_time": int(args.get("pre_con_time", 2)),
+        "phases": phases or None,
+        "construction_times": _canonical(args.get("construction_times", None) or DEFAULT_CONSTRUCTION_TIMES),
+        "num_companies": int(args.get("num_companies", 1)),
+        "unit_size_policy": _canonical(args.get("unit_size_policy", None)),
+        "household_shares_estimates": _canonical(args.get("household_shares_estimates", None) or DEFAULT_HOUSEHOLD_SHARES),
+        "avg_family_size": float(args.get("avg_family_size", 3.5)),
+        "apt_efficiency": float(args.get("apt_efficiency", 0.8)),
+        "engine": engine or args.get("engine", "simpy"),
+        "base_year": int(base_year),
+        "impacts": _canonical(args.get("impacts", None)),
+    }
+
+
+def _canonical(value):
+    # nested dicts/lists with plain float numbers, json-stable
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, (bool, np.bool_)) or value is None or isinstance(value, str):
+        return value
+    return float(value)
+
+
+def args_hash(args):
+    """sha256 of the normalized args as canonical JSON."""
+    return stable_hash(normalize_args(args))
+
+
+
+# -------- project table -------
+
+# type codes: index into this tuple ('none' marks zero-volume filler rows,
+# then the building type registry in registration order)
+BUILDING_TYPES = ("none", *building_types.TYPES)
+
+
+class ProjectTable:
+    """
+    Compact struct-of-arrays container for projects or batches of identical projects.
+
+    Columns are equal-length NumPy arrays; 'type' holds int8 codes into `types`
+    (BUILDING_TYPES first, unknown types appended). Rows only become dicts in
+    to_records(), at the API edge.
+    """
+
+    __slots__ = ("types", "columns")
+
+    DTYPES = {
+        "project_id": np.int64,
+        "type": np.int8,
+        "gfa": np.float32,
+        "volume": np.float32,
+        "count": np.int32,
+        "con_year": np.int32,
+        "con_day": np.int32,
+        "con_interval": np.int32,
+        "company": np.int32,
+        "small": np.int32,
+        "medium": np.int32,
+        "large": np.int32,
+        "avg_unit_size": np.int32,
+        "families": np.int32,
+        "singles": np.int32,
+        "other": np.int32,
+    }
+
+    def __init__(self, columns, types=BUILDING_TYPES):
+        self.types = tuple(types)
+        self.columns = {
+            key: np.asarray(values, dtype=self.DTYPES.get(key))
+            for key, values in columns.items()
+        }
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()), ()))
+
+    def __getitem__(self, key):
+        return self.columns[key]
+
+    def __contains__(self, key):
+        return key in self.columns
+
+    @property
+    def nbytes(self):
+        return sum(values.nbytes for values in self.columns.values())
+
+    def code(self, label):
+        return self.types.index(label)
+
+    def labels(self):
+        """Building type labels per row."""
+        return np.array(self.types, dtype=object)[self.columns["type"]]
+
+    def freeze(self):
+        """Make the columns read-only (for shared, cached tables)."""
+        for values in self.columns.values():
+            values.flags.writeable = False
+        return self
+
+    def with_columns(self, **columns):
+        return ProjectTable({**self.columns, **columns}, types=self.types)
+
+    def take(self, idx):
+        return ProjectTable(
+            {key: values[idx] for key, values in self.columns.items()}, types=self.types
+        )
+
+    @classmethod
+    def from_records(cls, rows, keys=None, defaults=None):
+        """Build a table from dicts; missing keys are taken from defaults."""
+        defaults = defaults or {}
+        if keys is None:
+            keys = list(dict.fromkeys([*(k for row in rows[:1] for k in row), *defaults]))
+        types = list(BUILDING_TYPES)
+        columns = {key: [] for key in keys}
+        for row in rows:
+            for key in keys:
+                value = row.get(key, defaults.get(key))
+                if key == "type":
+                    if value not in types:
+                        types.append(value)
+                    value = types.index(value)
+                columns[key].append(value)
+        return cls(columns, types=types)
+
+    def to_records(self):
+        """Rows as dicts; filler rows get None ids and company."""
+        columns = {key: values.tolist() for key, values in self.columns.items()}
+        if "type" in columns:
+            columns["type"] = self.labels().tolist()
+        if "project_id" in columns:
+            columns["project_id"] = [None if i < 0 else i for i in columns["project_id"]]
+        if "company" in columns:
+            columns["company"] = [c or None for c in columns["company"]]
+        keys = list(columns)
+        return [dict(zip(keys, row)) for row in zip(*columns.values())]
+
+    def to_frame(self):
+        import pandas as pd
+        df = pd.DataFrame(self.columns)
+        if "type" in df:
+            df["type"] = self.labels()
+        return df
+
+
+
+# -------- yearly cube -------
+
+CUBE_METRICS = ("volume", "units", "families", "singles", "other")
+# periods per year; a period is that fraction of the 365-day simulation year
+RESOLUTIONS = {"year": 1, "quarter": 4, "month": 12}
+
+
+class YearlyCube:
+    """
+    Dense (year, building type, metric) totals of a simulation.
+
+    values[i, j, k] is the total of CUBE_METRICS[k] for projects of types[j]
+    completed in years[i]; every year between the first and last is present.
+    Zero-volume filler rows are not counted.
+
+    With a 'quarter' or 'month' resolution (see aggregate) the rows are
+    periods of those years instead, and years holds period keys
+    year * periods_per_year + period index.
+    """
+
+    __slots__ = ("years", "types", "metrics", "values", "resolution")
+
+    def __init__(self, years, types, values, metrics=CUBE_METRICS, resolution="year"):
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution: {resolution}")
+        self.years = np.asarray(years, dtype=np.int32)
+        self.types = tuple(types)
+        self.metrics = tuple(metrics)
+        self.values = np.asarray(values, dtype=np.float64)
+        self.resolution = resolution
+
+    def __len__(self):
+        return len(self.years)
+
+    @property
+    def nbytes(self):
+        return self.years.nbytes + self.values.nbytes
+
+    def metric(self, name):
+        """(year, type) array of one metric."""
+        return self.values[:, :, self.metrics.index(name)]
+
+    def totals(self, name):
+        """Yearly totals of one metric over all types."""
+        return self.metric(name).sum(axis=1)
+
+    def cumulative(self, name):
+        return np.cumsum(self.totals(name))
+
+    def active_years(self):
+        """Years (period keys) with completed volume."""
+        return self.years[self.totals("volume") > 0]
+
+    @property
+    def periods_per_year(self):
+        return RESOLUTIONS[self.resolution]
+
+    def period_years(self):
+        """Calendar year of each row."""
+        return self.years // self.periods_per_year
+
+    def period_labels(self):
+        """Row labels: '2030', '2030Q1' or '2030-01'."""
+        year, index = np.divmod(self.years.astype(np.int64), self.periods_per_year)
+        if self.resolution == "quarter":
+            return [f"{y}Q{i + 1}" for y, i in zip(year.tolist(), index.tolist())]
+        if self.resolution == "month":
+            return [f"{y}-{i + 1:02d}" for y, i in zip(year.tolist(), index.tolist())]
+        return [str(y) for y in year.tolist()]
+
+    def to_dict(self):
+        return {
+            "years": self.years.tolist(),
+            "types": list(self.types),
+            "metrics": list(self.metrics),
+            "values": self.values.tolist(),
+            "resolution": self.resolution,
+        }
+
+    def to_frame(self):
+        """Long format: one row per (year, type), or (period, type) with a period column."""
+        import pandas as pd
+        n_years, n_types = len(self.years), len(self.types)
+        df = pd.DataFrame(
+            self.values.reshape(n_years * n_types, len(self.metrics)),
+            columns=self.metrics,
+        )
+        df.insert(0, "type", np.tile(np.array(self.types, dtype=object), n_years))
+        if self.resolution != "year":
+            df.insert(0, "period", np.repeat(np.array(self.period_labels(), dtype=object), n_types))
+        df.insert(0, "con_year", np.repeat(self.period_years(), n_types))
+        return df
+
+
+def aggregate(table, resolution="year"):
+    """
+    Build the YearlyCube of an allocated ProjectTable with one bincount per metric.
+
+    resolution: 'year', 'quarter' or 'month'. Sub-annual cubes split each
+    batch's completions (con_day + i * con_interval) over the periods of its
+    year arithmetically, so any resolution comes from the same simulated table.
+    """
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Unknown resolution: {resolution}")
+    periods = RESOLUTIONS[resolution]
+    years = table["con_year"]
+    if len(years) == 0:
+        return YearlyCube([], [], np.zeros((0, 0, len(CUBE_METRICS))), resolution=resolution)
+
+    first_year = int(years.min())
+    n_years = (int(years.max()) - first_year + 1) * periods
+
+    # types with real projects, in type code order
+    real = table["type"] != table.code("none")
+    codes = np.unique(table["type"][real])
+    type_idx = np.searchsorted(codes, table["type"][real])
+    if periods == 1:
+        count = table["count"][real].astype(np.float64)[:, None]
+    else:
+        count = _period_counts(table["con_day"][real], table["con_interval"][real], table["count"][real], periods)
+    rows = (years[real][:, None].astype(np.int64) - first_year) * periods + np.arange(periods)
+    cell = (rows * len(codes) + type_idx[:, None]).ravel()
+
+    per_project = {
+        "volume": table["volume"][real],
+        "units": (table["small"][real].astype(np.int64) + table["medium"][real] + table["large"][real]),
+        "families": table["families"][real],
+        "singles": table["singles"][real],
+        "other": table["other"][real],
+    }
+    values = np.stack([
+        np.bincount(cell, weights=(per_project[m][:, None] * count).ravel(), minlength=n_years * len(codes))
+        for m in CUBE_METRICS
+    ], axis=-1).reshape(n_years, len(codes), len(CUBE_METRICS))
+
+    return YearlyCube(
+        first_year * periods + np.arange(n_years),
+        [table.types[c] for c in codes.tolist()],
+        values,
+        resolution=resolution,
     )
 
-    return {"body": sim_data}
+
+def _period_counts(con_day, con_interval, count, periods):
+    """
+    (batch, period) completions of year batches: completions before each
+    period boundary of the batch's year, differenced.
+    """
+    day = con_day.astype(np.int64) % DAYS_PER_YEAR
+    interval = np.maximum(con_interval.astype(np.int64), 1)
+    bounds = -(-np.arange(periods + 1) * DAYS_PER_YEAR // periods)   # first day of each period, year end
+    before = -((day[:, None] - bounds) // interval[:, None])           # ceil((bound - day) / interval)
+    before = np.clip(before, 0, count.astype(np.int64)[:, None])
+    return np.diff(before, axis=1).astype(np.float64)
+
+
+class ScenarioGrid:
+    """
+    Labeled (scenario, year, building type, metric) totals of a parameter grid.
+
+    scenarios[i] holds the axis values of scenario i (Cartesian order, last
+    axis fastest); values[i] is that scenario's YearlyCube values on the
+    shared years axis. Allocation metrics of infeasible scenarios are NaN.
+    """
+
+    dims = ("scenario", "year", "type", "metric")
+    __slots__ = ("axes", "scenarios", "years", "types", "metrics", "values", "feasible")
+
+    def __init__(self, axes, years, types, values, feasible, metrics=CUBE_METRICS):
+        self.axes = {name: list(v) for name, v in axes.items()}
+        self.scenarios = [dict(zip(self.axes, combo)) for combo in itertools.product(*self.axes.values())]
+        self.years = np.asarray(years, dtype=np.int32)
+        self.types = tuple(types)
+        self.metrics = tuple(metrics)
+        self.values = np.asarray(values, dtype=np.float64)
+        self.feasible = np.asarray(feasible, dtype=bool)
+
+    def __len__(self):
+        return len(self.scenarios)
+
+    @property
+    def shape(self):
+        """Grid shape: one length per axis, then (year, type, metric)."""
+        return tuple(len(v) for v in self.axes.values()) + self.values.shape[1:]
+
+    def as_grid(self):
+        """values with the scenario dimension unfolded into the axes."""
+        return self.values.reshape(self.shape)
+
+    def metric(self, name):
+        """(scenario, year, type) array of one metric."""
+        return self.values[..., self.metrics.index(name)]
+
+    def cube(self, i):
+        """YearlyCube of scenario i."""
+        return YearlyCube(self.years, self.types, self.values[i], self.metrics)
+
+    def to_dict(self):
+        return {
+            "dims": list(self.dims),
+            "axes": self.axes,
+            "years": self.years.tolist(),
+            "types": list(self.types),
+            "metrics": list(self.metrics),
+            "feasible": self.feasible.tolist(),
+            "values": self.values.tolist(),
+        }
+
+    def to_frame(self, start=0, stop=None):
+        """Long format: one row per (scenario, year, type) with the axis values as columns."""
+        import pandas as pd
+        stop = len(self) if stop is None else min(stop, len(self))
+        n, (n_years, n_types) = stop - start, self.values.shape[1:3]
+        df = pd.DataFrame(self.values[start:stop].reshape(-1, len(self.metrics)), columns=self.metrics)
+        df.insert(0, "type", np.tile(np.array(self.types, dtype=object), n * n_years))
+        df.insert(0, "con_year", np.tile(np.repeat(self.years, n_types), n))
+        scenarios = pd.DataFrame(self.scenarios[start:stop], columns=list(self.axes))
+        for name, column in reversed(list(scenarios.items())):
+            df.insert(0, name, np.repeat(column.to_numpy(), n_years * n_types))
+        df.insert(0, "scenario", np.repeat(np.arange(start, stop), n_years * n_types))
+        return df
+
+    def iter_frames(self, scenarios_per_frame=256):
+        """to_frame() in slices of scenarios (for export.write_stream)."""
+        for start in range(0, len(self), scenarios_per_frame):
+            yield self.to_frame(start, start + scenarios_per_frame)
 
 
 
 # -------- construction simpy -------
 
-def construction(buildings, pre_con_time=2, construction_times=None, num_companies=1):
+def construction(buildings, pre_con_time=2, construction_times=None, num_companies=1, engine="simpy",
+                 base_year=None, phases=None):
     """
     Deterministic construction simulation.
 
+    engine:
+      - 'simpy': one SimPy process per worker (reference)
+      - 'listsched': same FIFO schedule computed with list_schedule(), no event loop
+
+    base_year: first year of the timeline (default: current year)
+    phases: optional infrastructure phases (see phase_schedule); a project
+      of a phase starts no earlier than its phase's release, and each type
+      queue takes projects in release order. Without phases every project is
+      released at pre_con_time.
+
     Input:
-      buildings: list of dicts with keys:
+      buildings: ProjectTable or list of dicts with keys:
         - type: 'one-family-house', 'multi-family-house', 'apartment-condo', ...
-        - gfa: total GFA for that project
+        - gfa: GFA of one project
+        - count: optional number of identical projects (default 1)
+        - phase: optional phase name
     Output:
-      list of dicts with:
-        - project_id
+      ProjectTable, one row per batch of identical projects completed
+      by the same company in the same year:
+        - project_id (first project of the batch, numbered in input order)
         - con_year
-        - volume (GFA)
+        - con_day (first completion, days from the start of base_year)
+        - con_interval (days between the batch's completions: a company
+          builds identical projects back to back, so the i-th is completed
+          on con_day + i * con_interval)
+        - volume (GFA of one project)
         - type
         - company
+        - count
     """
 
-    # Default construction times in months
-    if construction_times is None:
-        construction_times = {
-            "one-family-house":   {"constime": 10},
-            "multi-family-house": {"constime": 12},
-            "apartment-condo":    {"constime": 24},
-        }
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown construction engine: {engine}")
 
-    env = simpy.Environment()
-    DAYS_PER_YEAR = 365
-    DAYS_PER_MONTH = 30
+    releases = _group_releases(buildings, phases)
+    buildings = _project_groups(buildings)
+    group_gfa = buildings["gfa"].astype(np.float64)
+    group_counts = buildings["count"].astype(np.int64)
+    group_start = np.cumsum(group_counts) - group_counts   # first project id per group
 
-    # queue projects by type
-    building_queues = {}
-    for b in buildings:
-        btype = b["type"]
-        gfa = b["gfa"]
-        if btype not in building_queues:
-            building_queues[btype] = []
-        building_queues[btype].append({
-            "project_id": uuid.uuid4().hex,
-            "type": btype,
-            "gfa": gfa,
-        })
+    year_now = base_year if base_year is not None else datetime.datetime.now().year
+    queues = _type_queues(buildings, construction_times, num_companies, releases)
+    group_days = _group_durations(len(buildings), queues)
 
-    completed = []
+    # completions per type as (job index, finish day, worker id)
+    finished = {}
 
-    def worker(env, queue, building_type, base_constime, worker_id, typical_gfa):
+    def worker(env, queue, building_type, worker_id):
         while queue:
-            proj = queue.pop(0)
-            gfa = proj["gfa"]
+            job, duration, release = queue.pop(0)
+            if release > env.now:
+                yield env.timeout(release - env.now)
+            yield env.timeout(duration)
+            finished[building_type].append((job, env.now, worker_id))
 
-            if typical_gfa and typical_gfa > 0:
-                months = base_constime * (gfa / typical_gfa)
-            else:
-                months = base_constime
+    env = None
+    if engine == "simpy":
+        import simpy   # reference engine only
+        env = simpy.Environment()
 
-            duration_days = int(max(1, months) * DAYS_PER_MONTH)
-            yield env.timeout(duration_days)
+    # spawn workers per type
+    for code, groups, durations, worker_count in queues:
+        counts = group_counts[groups]
+
+        if engine == "simpy":
+            # reference path: one queue entry per project
+            queue = [
+                (job, duration, release) for job, (duration, release) in
+                enumerate(zip(np.repeat(durations, counts).tolist(), np.repeat(releases[groups], counts).tolist()))
+            ]
+            finished[code] = []
+            for worker_id in range(1, worker_count + 1):
+                env.process(worker(env, queue, code, worker_id))
+            continue
 
-            years_passed = env.now // DAYS_PER_YEAR
-            completion_year = (
-                datetime.datetime.now().year
-                + int(pre_con_time)
-                + int(years_passed)
-            )
+        finished[code] = list_schedule(durations, worker_count, counts=counts, releases=releases[groups])
+
+    profiler = profiling.current()
+    if env is not None:
+        if profiler.enabled:
+            # step the loop ourselves to count events
+            events = 0
+            while env.peek() != float("inf"):
+                env.step()
+                events += 1
+            profiler.record("construction", simpy_events=events)
+        else:
+            env.run()
+    profiler.record("construction", projects=int(group_counts.sum()))
+
+    # batch identical projects completed by the same company in the same year
+    batches = []
+    for code, groups, _, _ in queues:
+        counts = group_counts[groups]
+        if engine == "simpy":
+            jobs = np.array(sorted(finished[code]), dtype=np.int64).reshape(-1, 3)
+            finish_days, worker_ids = jobs[:, 1], jobs[:, 2]
+        else:
+            finish_days, worker_ids = finished[code]
 
-            completed.append({
-                "project_id": proj["project_id"],
-                "con_year": int(completion_year),
-                "volume": gfa,
-                "type": building_type,
-                "company": worker_id,
-            })
+        job_group, job_ids = _job_ids(np.arange(len(finish_days)), groups, counts, group_start)
+        con_days = int(pre_con_time) * DAYS_PER_YEAR + np.asarray(finish_days, dtype=np.int64)
+        batches.append(_batch_jobs(code, job_group, job_ids, con_days, worker_ids, group_gfa, group_days, year_now))
 
-    # spawn workers per type
-    for btype, queue in building_queues.items():
-        base_constime = construction_times.get(btype, {}).get("constime", 12)
-        gfa_values = [p["gfa"] for p in queue]
-        typical_gfa = int(np.mean(gfa_values)) if gfa_values else None
-
-        multiplier_map = {
-            "apartment-condo":    1,
-            "multi-family-house": 2,
-            "one-family-house":   4,
-        }
-        mult = multiplier_map.get(btype, 1)
-        worker_count = max(1, int(num_companies * mult))
+    # fill missing years with zero-volume dummy entries (for plotting continuity)
+    if batches:
+        start_year = year_now + int(pre_con_time)
+        max_year = max(int(b["con_year"].max()) for b in batches)
+        all_years = np.arange(start_year, max_year + 1)
+        missing = np.setdiff1d(all_years, np.concatenate([b["con_year"] for b in batches]))
+        batches.append(_filler_rows(missing, buildings.code("none"), year_now))
 
-        for worker_id in range(1, worker_count + 1):
-            env.process(
-                worker(env, queue, btype, base_constime, worker_id, typical_gfa)
-            )
+    return _batch_table(batches, buildings.types)
 
-    env.run()
 
-    # fill missing years with zero-volume dummy entries (for plotting continuity)
-    if completed:
-        start_year = datetime.datetime.now().year + int(pre_con_time)
-        max_year = max(c["con_year"] for c in completed)
-        all_years = range(start_year, max_year + 1)
-        years_present = set(c["con_year"] for c in completed)
+# -------- infrastructure phases -------
 
-        for y in all_years:
-            if y not in years_present:
-                completed.append({
-                    "project_id": None,
-                    "con_year": y,
-                    "volume": 0,
-                    "type": "none",
-                    "company": None,
-                })
+def phase_schedule(phases):
+    """
+    Event-driven schedule of infrastructure phases.
 
-    completed.sort(key=lambda x: (x["con_year"], x["project_id"] or ""))
+    Each phase has an infrastructure package of pre_con_time years that starts
+    once the packages of all phases in its 'after' list are finished; the
+    phase's projects are released when its own package is finished. Packages
+    finish in heap order of their finish day and release their dependants,
+    so the schedule is O((phases + dependencies) log phases).
+    Days count from the end of the plan-level pre_con_time.
 
-    return completed
+    Input:
+      phases: list of {'name', 'pre_con_time' (years), 'after': [phase names]}
+    Output:
+      dict with
+        - names: phase names in input order
+        - start / finish: package days per phase
+        - gate: per phase, the dependency that finished last (-1 for none)
+        - order: phase indices in finish order
+    Raises ValueError on duplicate or unknown names and dependency cycles.
+    """
+    names = [str(p["name"]) for p in phases]
+    index = {name: i for i, name in enumerate(names)}
+    if len(index) < len(names):
+        raise ValueError("Duplicate phase names")
+
+    n = len(names)
+    duration = [int(round(float(p.get("pre_con_time", 0)) * DAYS_PER_YEAR)) for p in phases]
+    dependants = [[] for _ in range(n)]
+    pending = [0] * n
+    for i, p in enumerate(phases):
+        for name in p.get("after", ()):
+            if name not in index:
+                raise ValueError(f"Unknown phase dependency: {name}")
+            dependants[index[name]].append(i)
+            pending[i] += 1
+
+    start, gate = [0] * n, [-1] * n
+    events = [(duration[i], i) for i in range(n) if pending[i] == 0]
+    heapq.heapify(events)
+    order = []
+    while events:
+        finish, i = heapq.heappop(events)
+        order.append(i)
+        for j in dependants[i]:
+            # finish order: the last dependency to finish gates the phase
+            start[j], gate[j] = finish, i
+            pending[j] -= 1
+            if pending[j] == 0:
+                heapq.heappush(events, (finish + duration[j], j))
+
+    if len(order) < n:
+        raise ValueError("Phase dependencies contain a cycle")
+    start = np.array(start, dtype=np.int64)
+    return {
+        "names": names,
+        "start": start,
+        "finish": start + np.array(duration, dtype=np.int64),
+        "gate": np.array(gate, dtype=np.int64),
+        "order": np.array(order, dtype=np.int64),
+    }
 
 
+def _group_releases(buildings, phases):
+    # release day per building group: its phase's finish, 0 without a phase
+    if isinstance(buildings, ProjectTable) or not phases:
+        return np.zeros(len(buildings), dtype=np.int64)
+    plan = phase_schedule(phases)
+    finish = dict(zip(plan["names"], plan["finish"].tolist()))
+    releases = []
+    for b in buildings:
+        phase = b.get("phase")
+        if phase is not None and str(phase) not in finish:
+            raise ValueError(f"Unknown phase: {phase}")
+        releases.append(0 if phase is None else finish[str(phase)])
+    return np.array(releases, dtype=np.int64)
 
 
-# -------- units & households -------
-def apply_unit_size_policy(
-    buildings,
-    household_shares=None,
-    policy=None,
-    avg_family_size=3.5,
-    apt_efficiency=0.8   # user-defined efficiency for apartment-condos
-):
+def critical_path(params, table):
     """
-    Final version with:
-      - dynamic baseline mix
-      - deterministic unit allocation
-      - GFA → net GFA using efficiency factors
-      - per-building-type efficiencies:
-           * one-family-house  = 0.80 (fixed)
-           * multi-family-house = 0.80 (fixed)
-           * apartment-condo    = apt_efficiency (user controlled)
+    Phase chain behind the last completion of a phased plan.
+
+    The project completing last is released by its phase; following each
+    phase's gate (the dependency finishing last) back gives the chain of
+    infrastructure packages that determines the plan's end.
+
+    Input:
+      params: normalized main_sim args with phases
+      table: construction() ProjectTable of params
+    Output:
+      dict with phases (names, first to last; empty if the last project has
+      no phase), release_day and completion_day (days from the start of
+      base_year) and construction_days between them
     """
+    offset = params["pre_con_time"] * DAYS_PER_YEAR
+    real = np.flatnonzero(table["project_id"] >= 0)
+    if len(real) == 0:
+        return {"phases": [], "release_day": offset, "completion_day": offset, "construction_days": 0}
+
+    last_day = table["con_day"][real].astype(np.int64) + (table["count"][real] - 1) * table["con_interval"][real]
+    last = real[int(np.argmax(last_day))]
+
+    counts = np.array([b["count"] for b in params["buildings"]], dtype=np.int64)
+    group = int(np.searchsorted(np.cumsum(counts), table["project_id"][last], side="right"))
+    phase = params["buildings"][group].get("phase")
+
+    chain, release = [], 0
+    if phase is not None:
+        plan = phase_schedule(params["phases"])
+        i = plan["names"].index(phase)
+        release = int(plan["finish"][i])
+        while i >= 0:
+            chain.append(plan["names"][i])
+            i = int(plan["gate"][i])
+    completion = int(last_day.max())
+    return {
+        "phases": chain[::-1],
+        "release_day": offset + release,
+        "completion_day": completion,
+        "construction_days": completion - offset - release,
+    }
 
-    # --- Default household distribution ---
-    if household_shares is None:
-        household_shares = {
-            "small":  {"range": (20,40),  "distribution": [0,90,10]},
-            "medium": {"range": (40,70),  "distribution": [20,60,20]},
-            "large":  {"range": (70,120), "distribution": [90,0,10]},
-            "family_houses": {"range": (100,200), "distribution": [95,0,5]}
-        }
 
-    # Helper: centroid of range
-    def centroid(rng):
-        return (rng[0] + rng[1]) / 2
+def _project_groups(buildings):
+    # (type, gfa, count) ProjectTable from a table or dicts
+    if not isinstance(buildings, ProjectTable):
+        buildings = ProjectTable.from_records(
+            buildings, keys=("type", "gfa", "count"), defaults={"count": 1}
+        )
+    if "count" not in buildings:
+        buildings = buildings.with_columns(count=np.ones(len(buildings)))
+    return buildings.with_columns(count=np.maximum(buildings["count"], 0))
 
-    # --- Dynamic market baseline ---
-    def dynamic_baseline_mix(gfa):
-        small_low, medium_low, large_low = 0.30, 0.35, 0.35
-        small_high, medium_high, large_high = 0.75, 0.15, 0.10
 
-        gfa_min, gfa_max = 3000, 4500
+def _type_queues(buildings, construction_times=None, num_companies=1, releases=None):
+    """
+    Per building type, in input order:
+      (type code, group indices, durations in days, worker count)
+    Durations scale the type's base time by gfa / count-weighted typical gfa;
+    base times and company capacity multipliers come from the building type
+    registry, construction_times overriding the base times.
+    releases: optional release day per group; groups are then queued in
+    release order (input order among equal releases).
+    """
+    if construction_times is None:
+        construction_times = DEFAULT_CONSTRUCTION_TIMES
+    table = building_types.compile_types(buildings.types)
 
-        if gfa <= gfa_min:
-            return small_low, medium_low, large_low
-        if gfa >= gfa_max:
-            return small_high, medium_high, large_high
+    def duration_days(gfa, base_constime, typical_gfa):
+        if typical_gfa and typical_gfa > 0:
+            months = base_constime * (gfa / typical_gfa)
+        else:
+            months = base_constime
+        return int(max(1, months) * DAYS_PER_MONTH)
 
-        # interpolate
-        t = (gfa - gfa_min) / (gfa_max - gfa_min)
-        bs = small_low  + t * (small_high  - small_low)
-        bm = medium_low + t * (medium_high - medium_low)
-        bl = large_low  + t * (large_high  - large_low)
-        return bs, bm, bl
+    type_codes = buildings["type"]
+    group_gfa = buildings["gfa"].astype(np.float64)
+    group_counts = buildings["count"].astype(np.int64)
 
-    updated = []
+    queues = []
+    for code in dict.fromkeys(type_codes.tolist()):
+        groups = np.flatnonzero((type_codes == code) & (group_counts > 0))
+        if len(groups) == 0:
+            continue
+        if releases is not None:
+            groups = groups[np.argsort(releases[groups], kind="stable")]
 
-    # =====================================================================
-    #                         PROCESS EACH PROJECT
-    # =====================================================================
-    for b in buildings:
+        btype = buildings.types[code]
+        base_constime = construction_times.get(btype, {}).get("constime", table["constime"][code])
+        typical_gfa = int(np.average(group_gfa[groups], weights=group_counts[groups]))
 
-        btype = b["type"]
-        gfa   = b["volume"]
-
-        # -------------------------------------------------------
-        # 1) BUILDING-TYPE SPECIFIC EFFICIENCY
-        # -------------------------------------------------------
-        if btype == "one-family-house":
-            efficiency_factor = 0.80
-        elif btype == "multi-family-house":
-            efficiency_factor = 0.80
-        elif btype == "apartment-condo":
-            efficiency_factor = float(apt_efficiency)
-        else:
-            efficiency_factor = 0.80  # fallback
+        worker_count = max(1, int(num_companies * table["capacity"][code]))
 
-        # convert GFA → net floor area for units
-        net_gfa = gfa * efficiency_factor
+        durations = [duration_days(gfa, base_constime, typical_gfa) for gfa in group_gfa[groups].tolist()]
+        queues.append((code, groups, durations, worker_count))
 
-        out = b.copy()
+    return queues
 
-        # -------------------------------------------------------
-        # 2) ONE-FAMILY HOUSE — fixed logic (always 1 unit)
-        # -------------------------------------------------------
-        if btype == "one-family-house":
-            out["small"] = 0
-            out["medium"] = 0
-            out["large"] = 1
 
-            fh_f, fh_s, fh_o = household_shares["family_houses"]["distribution"]
-            out["families"] = int(round((fh_f/100) * avg_family_size))
-            out["singles"]  = int(round(fh_s/100))
-            out["other"]    = int(round((fh_o/100) * 2))
+def _group_durations(n_groups, queues):
+    # construction duration (days) per project group
+    days = np.zeros(n_groups, dtype=np.int64)
+    for _, groups, durations, _ in queues:
+        days[groups] = durations
+    return days
 
-            out["avg_unit_size"] = round(net_gfa / 1)
-            updated.append(out)
-            continue
 
-        # -------------------------------------------------------
-        # 3) MULTI-FAMILY HOUSE (semi-detached / rowhouses)
-        # -------------------------------------------------------
-        if btype == "multi-family-house":
+def _job_ids(positions, groups, counts, group_start):
+    # queue positions of one type -> (group index, project id)
+    ends = np.cumsum(counts)
+    g = np.searchsorted(ends, positions, side="right")
+    return groups[g], group_start[groups[g]] + positions - (ends - counts)[g]
 
-            total_units = max(1, round(net_gfa / 90))  # larger unit sizes
 
-            L = int(0.30 * total_units)
-            M = total_units - L
-            S = 0
+def _batch_jobs(code, job_group, job_ids, con_days, worker_ids, group_gfa, group_days, base_year):
+    # identical projects completed by the same company in the same year -> one row;
+    # jobs come in queue order, so the first of a batch is its earliest completion
+    con_years = base_year + con_days // DAYS_PER_YEAR
+    keys, first, batch_counts = np.unique(
+        np.stack([job_group, con_years, worker_ids], axis=1),
+        axis=0, return_index=True, return_counts=True,
+    )
+    return {
+        "project_id": job_ids[first],
+        "con_year": keys[:, 1],
+        "con_day": con_days[first],
+        "con_interval": group_days[keys[:, 0]],
+        "volume": group_gfa[keys[:, 0]],
+        "type": np.full(len(keys), code),
+        "company": keys[:, 2],
+        "count": batch_counts,
+    }
 
-            out["small"]  = S
-            out["medium"] = M
-            out["large"]  = L
-            out["avg_unit_size"] = round(net_gfa / total_units)
 
-            fh_f, fh_s, fh_o = household_shares["family_houses"]["distribution"]
-            out["families"] = int(round(total_units * fh_f * avg_family_size / 100))
-            out["singles"]  = int(round(total_units * fh_s / 100))
-            out["other"]    = int(round(total_units * fh_o * 2 / 100))
+def _filler_rows(years, code, base_year):
+    return {
+        "project_id": np.full(len(years), -1),
+        "con_year": years,
+        "con_day": (years - base_year) * DAYS_PER_YEAR,
+        "con_interval": np.full(len(years), DAYS_PER_YEAR),
+        "volume": np.zeros(len(years)),
+        "type": np.full(len(years), code),
+        "company": np.zeros(len(years)),
+        "count": np.ones(len(years)),
+    }
 
-            updated.append(out)
-            continue
 
-        # -------------------------------------------------------
-        # 4) APARTMENT-CONDOS (main case, with policy)
-        # -------------------------------------------------------
+def _batch_table(batches, types):
+    # concatenated batches sorted by (con_year, project_id)
+    keys = ("project_id", "con_year", "con_day", "con_interval", "volume", "type", "company", "count")
+    table = ProjectTable(
+        {key: np.concatenate([b[key] for b in batches]) if batches else [] for key in keys},
+        types=types,
+    )
+    return table.take(np.lexsort((table["project_id"], table["con_year"])))
 
-        # 4.1 Market baseline
-        bs, bm, bl = dynamic_baseline_mix(net_gfa)
 
-        # 4.2 Average sizes (centroids)
-        s_avg = centroid(household_shares["small"]["range"])
-        m_avg = centroid(household_shares["medium"]["range"])
-        l_avg = centroid(household_shares["large"]["range"])
+def _round_robin_state(start, order, count, d, seq):
+    # worker state after `count` jobs of duration d dealt round robin from `start`
+    worker_count = len(order)
+    rounds = (count - np.arange(worker_count) + worker_count - 1) // worker_count
+    state = []
+    for p in np.lexsort((np.arange(worker_count), rounds)).tolist():
+        seq += 1
+        state.append((start + int(rounds[p]) * d, seq, int(order[p])))
+    return state, seq
 
-        # 4.3 Expected average unit size
-        expected_unit_size = (
-            bs * s_avg +
-            bm * m_avg +
-            bl * l_avg
-        )
-        expected_unit_size = max(20, expected_unit_size)
-
-        # 4.4 Total units from net_gfa
-        total_units = max(1, round(net_gfa / expected_unit_size))
-
-        # 4.5 Policy (if enabled)
-        if policy is None or "apartment-condo" not in policy:
-            c = {
-                "pct_small_max": 75,
-                "size_small_max": s_avg,
-                "pct_large_min": 10,
-                "size_large_min": l_avg
-            }
-        else:
-            pct1, size1, pct2, size2 = policy["apartment-condo"]
-            c = {
-                "pct_small_max": pct1,
-                "size_small_max": size1,
-                "pct_large_min": pct2,
-                "size_large_min": size2
-            }
-
-        # 4.6 Baseline unit counts before constraints
-        baseline_small  = int(bs * total_units)
-        baseline_large  = int(bl * total_units)
-        baseline_medium = total_units - baseline_small - baseline_large
-
-        # 4.7 Apply constraints
-        S = min(baseline_small, int(c["pct_small_max"] / 100 * total_units))
-        L = max(baseline_large, int(c["pct_large_min"] / 100 * total_units))
-        M = total_units - S - L
-
-        if M < 0:
-            raise ValueError("Policy impossible: S + L > total_units")
-
-        out["small"] = S
-        out["medium"] = M
-        out["large"] = L
-        out["avg_unit_size"] = round(net_gfa / total_units)
-
-        # 4.8 Households (deterministic)
-        s_f,s_s,s_o = household_shares["small"]["distribution"]
-        m_f,m_s,m_o = household_shares["medium"]["distribution"]
-        l_f,l_s,l_o = household_shares["large"]["distribution"]
-
-        fam = (S*s_f/100 + M*m_f/100 + L*l_f/100) * avg_family_size
-        sng = (S*s_s/100 + M*m_s/100 + L*l_s/100)
-        oth = (S*s_o/100 + M*m_o/100 + L*l_o/100) * 2
-
-        out["families"] = int(round(fam))
-        out["singles"]  = int(round(sng))
-        out["other"]    = int(round(oth))
-
-        updated.append(out)
-
-    return updated
-
-
-
-
-
-# --------- conceptor ------------
-def conceptor(lin=1):
-
-    #LOCAT
-    one_family_house_vol_title = ['Pientalojen kokonaismitoitus','One-family-house volume']
-    multi_family_house_vol_title = ['Rivitalojen kokonaismitoitus','Multi-family-house volume']
-    apartment_building_vol_title = ['Kerrostalojen kokonaismitoitus','Apartment building volume']
-    one_family_house_pro_title = ['Pientalojen hankekoko','One-family-house project size']
-    multi_family_house_pro_title = ['Rivitalojen hankekoko','Multi-family-house project size']
-    apartment_building_pro_title = ['Kerrostalojen hankekoko','Apartment building project size']
-    num_of_con_companies_title = ["Samanaikainen tuotanto","Paraller construction"]
-    pre_con_and_sim_time_title = ['Esirakentamisaika','Pre-construction time']
-    unit_size_policy_selection = ['Käytä asuntokoon ohjauspolitiikkaa','Apply unit size policy']
-
-    #helps
-    vol_help = ['Kokonaismitoitus ja hankekoko kerrosalaneliömetreissä (kem²)','Total volume and project size as Gross Floor Area square meters (GFAm²)']
-    num_of_con_companies_help = ["Samanaikaisesti toteutuvien hakkeiden lukumäärä vuodessa",
-                                "Number of parallel on-going implementation projects yearly"]
-    pre_con_and_sim_time_help = ['Aseta infrastruktuurin esirakentamisaika',
-                                'Set pre-construction time for infrastructure']
-
-    basic_conceptor_title = ["Perusasetukset","Basic settings"]
-    enh_conceptor_title = ["Lisäasetukset","Advanced settings"]
-
-    # defaults
-    step=1000
-    one_family_default_volume = 5000
-    multi_family_default_volume = 10000
-    apartment_default_volume = 40000
-    max_volume = 100000
-
-    with st.expander(basic_conceptor_title[lin],expanded=True):
-        s1,s2 = st.columns(2)    
-        one_family_house_vol = s1.slider(one_family_house_vol_title[lin], 0, max_volume, one_family_default_volume, step=step, help=vol_help[lin])
-        one_family_house_pro = s2.slider(one_family_house_pro_title[lin], 50, 200, 120, step=10)
-        multi_family_house_vol = s1.slider(multi_family_house_vol_title[lin], 0, max_volume, multi_family_default_volume, step=step)
-        multi_family_house_pro = s2.slider(multi_family_house_pro_title[lin], 200, 2000, 900, step=100)
-        apartment_condo_vol = s1.slider(apartment_building_vol_title[lin], 0, max_volume, apartment_default_volume, step=step*5)
-        apartment_condo_pro = s2.slider(apartment_building_pro_title[lin], 2000, 9000, 5000, step=1000)
-        num_comp = s1.slider(num_of_con_companies_title[lin], 1, 5, 3, step=1,
-                                help=num_of_con_companies_help[lin])
-        # `pre_con_sim_time` is pre-construction time (years) for enabling roads, utilities etc.
-        pre_con_sim_time = s2.slider(pre_con_and_sim_time_title[lin], 1, 9, 3, step=1,
-                                        help=pre_con_and_sim_time_help[lin])
-
-    with st.expander(enh_conceptor_title[lin],expanded=False):
-
-        lang = "FIN" if lin==0 else "ENG"
-
-        TITLE_TRANSLATIONS = {
-            "size_range": {
-                "FIN": "Kokohaarukka",
-                "ENG": "Size range"
-            },
-            "families": {
-                "FIN": "Perheet (%)",
-                "ENG": "Families (%)"
-            },
-            "singles": {
-                "FIN": "Sinkut (%)",
-                "ENG": "Singles (%)"
-            },
-            "others": {
-                "FIN": "Muut (%)",
-                "ENG": "Other households (%)"
-            },
-            "small_apartments": {
-                "FIN": "Pienet asunnot",
-                "ENG": "Small apartments"
-            },
-            "medium_apartments": {
-                "FIN": "Keskikokoiset asunnot",
-                "ENG": "Medium apartments"
-            },
-            "large_apartments": {
-                "FIN": "Isot asunnot",
-                "ENG": "Large apartments"
-            },
-            "family_houses": {
-                "FIN": "Omakotitalot",
-                "ENG": "Family houses"
-            }
-        }
 
-        def t(key: str, lang: str = "FIN") -> str:
-            return TITLE_TRANSLATIONS.get(key, {}).get(lang, key)
+def _schedule_steps(durations, counts, releases, worker_count, buffer=1024):
+    """
+    Core of list_schedule() / iter_schedule(), steps in assignment order:
+      (start, d, count, order): count projects of duration d dealt round robin
+        from day start to the workers in `order` (aligned workers)
+      (begins, finish_days, worker_ids): lists of consecutive projects taken
+        from the heap, up to `buffer` per step
+    """
+    # heap of (free_day, event order, worker_id), or (release, event order,
+    # worker_id, finish_day) for a worker waiting to start its project
+    state = [(0, worker_id, worker_id) for worker_id in range(1, worker_count + 1)]
+    seq = worker_count
+    latest = 0    # latest day in state
+    waiting = 0   # waiting entries in state
+    begins, finish_days, worker_ids = [], [], []
+
+    for d, count, release in zip(durations, counts, releases):
+        start = state[0][0]
+
+        if not waiting and latest == start and (release <= start or count >= worker_count):
+            # aligned workers (all busy with this group if they wait for it): round robin in event order
+            if begins:
+                yield begins, finish_days, worker_ids
+                begins, finish_days, worker_ids = [], [], []
+            start = max(start, release)
+            state.sort()
+            order = np.array([entry[2] for entry in state], dtype=np.int64)
+            yield start, d, count, order
+            state, seq = _round_robin_state(start, order, count, d, seq)
+            latest = state[-1][0]
+            continue
 
+        for _ in range(count):
+            entry = heapq.heappop(state)
+            while len(entry) == 4:
+                # a waiting worker starts: its finish event is scheduled now
+                seq += 1
+                waiting -= 1
+                heapq.heappush(state, (entry[3], seq, entry[2]))
+                entry = heapq.heappop(state)
+
+            now, _, worker_id = entry
+            begin = max(now, release)
+            begins.append(begin)
+            finish_days.append(begin + d)
+            worker_ids.append(worker_id)
+            seq += 1
+            if begin > now:
+                waiting += 1
+                heapq.heappush(state, (begin, seq, worker_id, begin + d))
+            else:
+                heapq.heappush(state, (begin + d, seq, worker_id))
+            latest = max(latest, begin + d)
 
-        
-        house_hold_shares_estimates_default = {
-            "small_apartments": {"size_range": [20, 40], "distribution": [0, 90, 10]},
-            "medium_apartments": {"size_range": [40, 70], "distribution": [20, 60, 20]},
-            "large_apartments": {"size_range": [70, 120], "distribution": [90, 0, 10]},
-            "family_houses": {"size_range": [100, 200], "distribution": [95, 0, 5]}
-        }
+        if len(begins) >= buffer:
+            yield begins, finish_days, worker_ids
+            begins, finish_days, worker_ids = [], [], []
 
-        cols = st.columns(2)
-        updated_values = {}
+    if begins:
+        yield begins, finish_days, worker_ids
 
-        for idx, (apt_type, vals) in enumerate(house_hold_shares_estimates_default.items()):
-            
-            col = cols[idx % 2]
-            title = t(apt_type, lang)
 
-            # Display default size range as static text (non-editable)
-            smin, smax = vals["size_range"]
-            col.write(f"{title} — {t('size_range', lang)}: **{smin} - {smax} m²**")
+def _schedule_inputs(durations, counts, releases):
+    # plain int lists for _schedule_steps
+    durations = np.asarray(durations, dtype=np.int64)
+    counts = np.ones(len(durations), dtype=np.int64) if counts is None else np.asarray(counts, dtype=np.int64)
+    releases = np.zeros(len(durations), dtype=np.int64) if releases is None else np.asarray(releases, dtype=np.int64)
+    return durations.tolist(), counts.tolist(), releases.tolist()
 
-            dist = vals["distribution"]
 
-            # Families slider
-            families = col.slider(
-                f"{title} — {t('families', lang)}",
-                min_value=0, max_value=100,
-                value=dist[0], step=5
-            )
+def list_schedule(durations, worker_count, counts=None, releases=None):
+    """
+    FIFO list scheduling on identical workers, equivalent to the SimPy worker loop.
 
-            # Singles slider
-            max_singles = 100 - families
-            singles = col.slider(
-                f"{title} — {t('singles', lang)}",
-                min_value=0, max_value=max_singles,
-                value=min(dist[1], max_singles),
-                step=5
-            )
+    Workers 1..worker_count each take the next queued project whenever they are free;
+    ties are broken in the order the workers became free, as in SimPy's event queue.
+    A group of equal-duration projects starting on aligned workers is solved
+    arithmetically (round robin); anything else falls back to a heap.
 
-            # Automatically computed "others"
-            others = 100 - families - singles
-
-            # Show as label instead of slider
-            col.write(f"{t('others', lang)}: **{others}%**")
-
-            distribution = [families, singles, others]
-
-            dist_sum = sum(distribution)
-
-            if dist_sum > 100:
-                col.error(f"{title}: {dist_sum}% > 100%")
-
-            updated_values[apt_type] = {
-                "size_range": [smin, smax],
-                "distribution": [families, singles, others]
-            }
-
-        enh1, enh2 = st.columns(2)
-        #avg_family_size
-        avg_family_size_slider_text = ['Keskimääräinen perhekoko','Average family size']
-        avg_family_size = enh1.slider(avg_family_size_slider_text[lin], 2.0, 6.0, 3.5, step=0.1)
-        #apartment_efficiency_factor
-        apartment_efficiency_factor_slider_text = ['Kerrostalotuotannon tehokkuuskerroin','Apartment efficiency factor']
-        apartment_efficiency_factor = enh2.slider(apartment_efficiency_factor_slider_text[lin], 0.7, 0.9, 0.8, step=0.05,
-                                                help=['Kerrostalojen kerrosalan muuntosuhde huoneistoneliömetreiksi, joiden perusteella laskenta tehdään.',
-                                                      'Conversion factor from apartment buildings GFA to net residential floor area, based on which the calculation is made.'][lin])
-
-        # ---- update values ----
-        # Translate UI outputs into model-compatible household distribution structure
-        house_hold_shares_estimates = {
-            "small": {
-                "range": updated_values["small_apartments"]["size_range"],
-                "distribution": updated_values["small_apartments"]["distribution"],
-            },
-            "medium": {
-                "range": updated_values["medium_apartments"]["size_range"],
-                "distribution": updated_values["medium_apartments"]["distribution"],
-            },
-            "large": {
-                "range": updated_values["large_apartments"]["size_range"],
-                "distribution": updated_values["large_apartments"]["distribution"],
-            },
-            "family_houses": {
-                "range": updated_values["family_houses"]["size_range"],
-                "distribution": updated_values["family_houses"]["distribution"],
-            },
-        }
+    Input:
+      durations: project (or group) durations in days, in queue order
+      worker_count: number of parallel workers
+      counts: optional number of identical projects per duration
+      releases: optional non-decreasing day per duration before which its
+        projects cannot start; a worker taking one earlier waits for it
+    Output:
+      (finish_days, worker_ids) arrays, one entry per project in queue order
+    """
+    durations, counts, releases = _schedule_inputs(durations, counts, releases)
+    n = sum(counts)
+
+    finish_days = np.empty(n, dtype=np.int64)
+    worker_ids = np.empty(n, dtype=np.int64)
+    pos = 0
+    for step in _schedule_steps(durations, counts, releases, worker_count):
+        if len(step) == 3:
+            _, finishes, workers = step
+            finish_days[pos:pos + len(finishes)] = finishes
+            worker_ids[pos:pos + len(finishes)] = workers
+            pos += len(finishes)
+        else:
+            start, d, count, order = step
+            k = np.arange(count, dtype=np.int64)
+            finish_days[pos:pos + count] = start + (k // worker_count + 1) * d
+            worker_ids[pos:pos + count] = order[k % worker_count]
+            pos += count
 
-    # prepare building..
+    return finish_days, worker_ids
 
-    #volumes out as dict
-    total_gfa_volumes = {
-        'one-family-house': one_family_house_vol,
-        'multi-family-house': multi_family_house_vol,
-        'apartment-condo': apartment_condo_vol
-        }
-    project_sizes = {
-        'one-family-house': one_family_house_pro,
-        'multi-family-house': multi_family_house_pro,
-        'apartment-condo': apartment_condo_pro
-        }
-    
-
-    # --- subfunc to gen projects from volumes ---
-    def generate_projects(total_volumes: dict, project_sizes: dict):
-        buildings = []
-
-        for building_type, total_volume in total_volumes.items():
-            avg_project_size = project_sizes[building_type]
-            num_projects = total_volume // avg_project_size
-
-            for _ in range(num_projects):
-                buildings.append({
-                    'type': building_type,
-                    'gfa': avg_project_size
-                })
-        
-        return buildings
-    
-    # generate building projects from volumens
-    residential_buildings_dict = generate_projects(total_gfa_volumes,project_sizes)
-    
-    if residential_buildings_dict is not None and len(residential_buildings_dict) > 0:
-        use_unit_size_policy = st.checkbox(unit_size_policy_selection[lin])
-        if use_unit_size_policy:
-            my_unit_size_policy = unit_size_policy_maker(lin=lin)
+
+def iter_schedule(durations, worker_count, counts=None, releases=None):
+    """
+    Lazy list_schedule(): yields (start_day, finish_days, worker_ids) chunks of
+    consecutive queued projects in assignment order. Start days never decrease,
+    so a consumer knows every project finishing before day t once a chunk
+    starting at or after t has been seen.
+    """
+    for step in _schedule_steps(*_schedule_inputs(durations, counts, releases), worker_count):
+        if len(step) == 3:
+            for begin, finish_day, worker_id in zip(*step):
+                yield begin, np.array([finish_day], dtype=np.int64), np.array([worker_id], dtype=np.int64)
         else:
-            my_unit_size_policy = None
-    
-    return residential_buildings_dict, my_unit_size_policy, pre_con_sim_time, num_comp, house_hold_shares_estimates, avg_family_size, apartment_efficiency_factor
-
-def unit_size_policy_maker(lin=1):
-            
-    #LOCAT
-    policy_input_title = ['Politiikkamuotoilu','Policy statement']
-    policy_statements = [[["Asuntoja, jotka ovat **alle** (m2)...","..saa olla enintään (%)"],
-                        ["Asuntoja, jotka ovat **yli** (m2)...","..tulee olla vähintään (%)"]],
-                        [["Units which are **below** (m2)...","..may be at most (%)"],
-                        ["Units which are **above** (m2)...","..must be at least (%)"]]]
-
-    with st.container(border=True):
-        st.markdown(policy_input_title[lin])
-
-        col1, col2 = st.columns(2)
-
-        with col1:
-            with st.container(border=True):
-                size1 = st.slider(
-                    policy_statements[lin][0][0],
-                    20, 60, 30, step=5,
-                    )
-                pct1 = st.slider(
-                    policy_statements[lin][0][1],
-                    10, 80, 50, step=5
-                    )
-
-        with col2:
-            with st.container(border=True):
-                size2 = st.slider(
-                    policy_statements[lin][1][0],
-                    60, 120, 70, step=5
-                    )
-                pct2 = st.slider(
-                    policy_statements[lin][1][1],
-                    0, 100-pct1, int(round(((100-pct1)/2)/5)*5), step=5
-                    )
-
-    if pct1 + pct2 > 100:
-        st.stop()
-
-    my_policy_nums = [pct1, size1, pct2, size2]
-
-    my_unit_size_policy = {
-        'apartment-condo': [my_policy_nums[0], my_policy_nums[1], my_policy_nums[2], my_policy_nums[3]]
-    }
-    return my_unit_size_policy
-
-def simulation_plot(sim_df,init_df=None,lin=1):
-    #LOCAT
-    yaxis_title_left = ['Vuosiasuntotuotanto (kem²)','Residential production (GFA)']
-    yaxis_title_right = ['Asukasmäärän kasvu','Population increase']
-    xaxis_title = ['Vuosi','Year']
-    # translation of items
-    col_translations = {
-        'one-family-house':['Omakotitalot','One-family-house'],
-        'multi-family-house':['Rivi/paritalot','Multi-family-house'],
-        'apartment-condo':['Kerrostalot','Apartment-condo'],
-        'families':['Perheissä asuvat','Family population'],
-        'singles':['Yksin asuvat','Single population'],
-        'other':['Muut','Other population']
-    }
+            # one chunk per round
+            start, d, count, order = step
+            for r, k in enumerate(range(0, count, worker_count)):
+                m = min(worker_count, count - k)
+                yield start + r * d, np.full(m, start + (r + 1) * d, dtype=np.int64), order[:m]
 
-    #concat initial pop levels
-    if init_df is None:
-        init_year = sim_df['con_year'].min()
-        data = {
-            'con_year': [init_year-1],  # initial year
-            'families': [0],  # initial count of families
-            'singles': [0],   # initial count of singles
-            'other': [0]  # initial count of others
-        }
-        init_df = pd.DataFrame(data)
-    
-    df = pd.concat([init_df, sim_df]).reset_index(drop=True)
-
-    color_map = {
-        'one-family-house': 'burlywood',
-        'multi-family-house': 'peru',
-        'apartment-condo': 'sienna'
+
+def _schedule_points(params, memo=None):
+    """
+    Deterministic schedule collapsed to (group, finish day) points:
+      dict of arrays group, day, count, type (index into types), and
+      the per-group labels/gfa needed for allocation.
+    Depends on buildings, phases, construction_times and num_companies only;
+    completion year = base_year + pre_con_time + day // DAYS_PER_YEAR.
+    memo: optional dict reusing type schedules with identical
+    (durations, counts, worker count), e.g. across scaled project sizes.
+    """
+    releases = _group_releases(params["buildings"], params.get("phases"))
+    buildings = _project_groups(params["buildings"])
+    group_counts = buildings["count"].astype(np.int64)
+    queues = _type_queues(buildings, params["construction_times"], params["num_companies"], releases)
+
+    group, day, count, type_idx = [], [], [], []
+    for t, (_, groups, durations, worker_count) in enumerate(queues):
+        counts = group_counts[groups]
+        key = (tuple(durations), tuple(counts.tolist()), worker_count, tuple(releases[groups].tolist()))
+        if memo is None or key not in memo:
+            finish_days, _ = list_schedule(durations, worker_count, counts=counts, releases=releases[groups])
+            keys, n = np.unique(
+                np.stack([np.repeat(np.arange(len(groups)), counts), finish_days], axis=1),
+                axis=0, return_counts=True,
+            )
+            if memo is not None:
+                memo[key] = keys, n
+        else:
+            keys, n = memo[key]
+        group.append(groups[keys[:, 0]])
+        day.append(keys[:, 1])
+        count.append(n)
+        type_idx.append(np.full(len(keys), t))
+
+    def cat(parts):
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+    return {
+        "group": cat(group),
+        "day": cat(day),
+        "count": cat(count),
+        "type": cat(type_idx),
+        "types": [buildings.types[code] for code, _, _, _ in queues],
+        "group_types": buildings.labels(),
+        "group_gfa": buildings["gfa"].astype(np.float64),
     }
 
-    fig = make_subplots(specs=[[{"secondary_y": True}]])
 
-    building_types = df['type'].unique()
 
-    def get_histogram_bins(data):
-        start = data.min() - 0.5  # Start half a year before the first year
-        end = data.max() + 0.5    # End half a year after the last year
-        return dict(start=start, end=end, size=1)
 
-    for building_type in building_types:
-        # Ensure building_type is a key in col_translations
-        if building_type in col_translations:
-            translated_name = col_translations[building_type][lin]
-        else:
-            translated_name = 'nan'  # Fallback if building_type is not found
-
-        fig.add_trace(
-            go.Histogram(
-                name=translated_name,
-                legendgroup='histo',
-                x=df[df['type'] == building_type]['con_year'],
-                y=df[df['type'] == building_type]['volume'],
-                histfunc='sum',
-                autobinx=False,
-                xbins=get_histogram_bins(df[df['type'] == building_type]['con_year']),
-                cumulative_enabled=False,
-                marker=dict(color=color_map.get(building_type, 'brown'), opacity=0.9)
-            ), secondary_y=False
-        )
-    fig.update_layout(barmode='stack')
-
-    # ----------- POP LINES --------------
-
-    # Calculate cumulative sums separately
-    cumulative_data = {}
-    for column in ['families', 'singles', 'other']:
-        # Calculate cumulative sum, ensuring it only includes years with actual data
-        cumulative_data[column] = df[df['volume'] > 0][column].cumsum()
-
-    # Line plots for households
-    lines = [('other', 'dot'), ('singles', 'dash'), ('families', 'solid')]
-    for column, line_style in lines:
-        # Get the cumulative data for the column
-        column_cumulative_data = cumulative_data.get(column, [])
-
-        fig.add_trace(
-            go.Scatter(
-                x=df[df['volume'] > 0]['con_year'],
-                y=column_cumulative_data,
-                mode='lines',
-                name=col_translations[column][lin],
-                legendgroup='lines',
-                line=dict(color='black', width=1.0, dash=line_style),
-                hoverinfo=None
-            ), secondary_y=True
-        )
-    
-    # Update axes
-    year_now = datetime.datetime.now().year
-    end_year = max(year_now, df['con_year'].max())
-
-    # Create a range of years from the current year to the end year
-    years_range = list(range(year_now, end_year + 1))
-
-    # Update x-axis
-    fig.update_xaxes(tickvals=years_range, ticktext=years_range,
-                    range=[year_now - 0.5, end_year + 1.5],
-                    title=xaxis_title[lin])
-
-    #define first y-axis amx
-    y1_max_value = df['volume'].max() * 1.5
-
-    #define second y-axis max
-    y2_max_value = max(np.cumsum(df['families']).max(), np.cumsum(df['singles']).max(), np.cumsum(df['other']).max())
-    
-    fig.update_yaxes(showgrid=True, zeroline=False)
-    fig.update_yaxes(title=yaxis_title_left[lin]) #, secondary_y=False, range=[0, y1_max_value])
-    fig.update_yaxes(title=yaxis_title_right[lin], secondary_y=True, range=[0, y2_max_value])
-
-    # Legend and layout
-    fig.update_layout(
-        margin={"r": 10, "t": 10, "l": 10, "b": 10}, height=700,
-        legend=dict(yanchor="top",y=0.95,xanchor="left",x=0.01)
-        #legend=dict(yanchor="top", y=0.95, xanchor="right", x=0.90)
+
+# -------- units & households -------
+DEFAULT_HOUSEHOLD_SHARES = {
+    "small":  {"range": (20,40),  "distribution": [0,90,10]},
+    "medium": {"range": (40,70),  "distribution": [20,60,20]},
+    "large":  {"range": (70,120), "distribution": [90,0,10]},
+    "family_houses": {"range": (100,200), "distribution": [95,0,5]}
+}
+
+
+def apply_unit_size_policy(
+    buildings,
+    household_shares=None,
+    policy=None,
+    avg_family_size=3.5,
+    apt_efficiency=0.8   # user-defined efficiency for apartment-condos
+):
+    """
+    Adds small/medium/large, avg_unit_size, families, singles and other
+    columns to constructed buildings (ProjectTable or dicts with 'type'
+    and 'volume') using allocate_units().
+
+    Values are per project; identical (type, volume) rows share one allocation.
+    """
+    if not isinstance(buildings, ProjectTable):
+        buildings = ProjectTable.from_records(buildings)
+    if len(buildings) == 0:
+        return buildings
+
+    keys, row_idx = np.unique(
+        np.stack([buildings["type"].astype(np.float64), buildings["volume"].astype(np.float64)], axis=1),
+        axis=0, return_inverse=True,
     )
 
-    return fig
\ No newline at end of file
+    units = allocate_units(
+        keys[:, 0].astype(np.int64),
+        keys[:, 1],
+        types=buildings.types,
+        household_shares=household_shares,
+        policy=policy,
+        avg_family_size=avg_family_size,
+        apt_efficiency=apt_efficiency,
+    )
+
+    return buildings.with_columns(
+        **{key: values[row_idx.ravel()] for key, values in units.items()}
+    )
+
+
+def _baseline_mix(net_gfa):
+    """
+    Dynamic market baseline (small, medium, large shares) for apartment projects:
+    balanced up to 3000 m², small-unit heavy from 4500 m², linear in between.
+    """
+    small_low, medium_low, large_low = 0.30, 0.35, 0.35
+    small_high, medium_high, large_high = 0.75, 0.15, 0.10
+
+    gfa_min, gfa_max = 3000, 4500
+
+    # interpolate, then pin both ends to the exact baseline values
+    t = (net_gfa - gfa_min) / (gfa_max - gfa_min)
+    low = net_gfa <= gfa_min
+    high = net_gfa >= gfa_max
+
+    mix = []
+    for lo, hi in ((small_low, small_high), (medium_low, medium_high), (large_low, large_high)):
+        share = lo + t * (hi - lo)
+        mix.append(np.where(low, lo, np.where(high, hi, share)))
+    return mix
+
+
+def allocate_units(
+    btype,
+    volume,
+    household_shares=None,
+    policy=None,
+    avg_family_size=3.5,
+    apt_efficiency=0.8,
+    strict=True,
+    types=None
+):
+    """
+    Vectorized unit allocation & population estimation.
+
+    Input:
+      btype: array of building types, or of type codes into `types`
+      volume: array of GFA per building
+    Output:
+      dict of arrays: small, medium, large, avg_unit_size, families, singles, other
+
+    Logic (per building type from the building_types registry, compiled
+    into arrays and gathered by type code):
+      - GFA → net GFA using the type's efficiency factor
+        (None in the registry: apt_efficiency, user controlled)
+      - 'apartment' unit model: dynamic baseline mix, deterministic unit
+        allocation, unit size policy ('apartment-condo' key) if given
+      - 'fixed' unit model: units of the type's size (or one unit per
+        building), with fixed small and large shares
+      - households by unit size, or by the type's own distribution
+
+    Household distributions, avg_family_size, apt_efficiency and the policy
+    percentages may be arrays (e.g. shape (R, 1)); results then broadcast
+    to (R, n buildings).
+    strict: raise on an impossible policy; otherwise apartment rows with
+    medium < 0 mark it.
+    """
+
+    # --- Default household distribution ---
+    if household_shares is None:
+        household_shares = DEFAULT_HOUSEHOLD_SHARES
+
+    if types is None:
+        types, code = building_types.type_codes(btype)
+    else:
+        code = np.asarray(btype, dtype=np.int64)
+    table = building_types.compile_types(types)
+    gfa = np.asarray(volume, dtype=np.float64)
+
+    def by_type(values):
+        # per-type scalars or (R, 1) arrays -> (..., n types) array, gathered per row
+        eye = np.eye(len(values))
+        per_type = sum(np.asarray(v, dtype=np.float64) * eye[t] for t, v in enumerate(values))
+        return np.take(per_type, code, axis=-1)
+
+    apartments = table["apartment"][code]
+
+    # -------------------------------------------------------
+    # 1) BUILDING-TYPE SPECIFIC EFFICIENCY
+    # -------------------------------------------------------
+    efficiency = table["efficiency"]
+    efficiency_factor = by_type([apt_efficiency if np.isnan(e) else e for e in efficiency.tolist()])
+
+    # convert GFA → net floor area for units
+    net_gfa = gfa * efficiency_factor
+
+    # -------------------------------------------------------
+    # 2) FIXED UNIT MODELS (houses, rowhouses, senior and student housing)
+    # -------------------------------------------------------
+    unit_size = table["unit_size"][code]
+    sized = unit_size > 0
+    fixed_units = np.where(sized, np.maximum(1, np.round(net_gfa / np.where(sized, unit_size, 1))), 1).astype(np.int64)
+
+    # -------------------------------------------------------
+    # 3) APARTMENT MODEL (main case, with policy)
+    # -------------------------------------------------------
+
+    # 3.1 Market baseline
+    bs, bm, bl = _baseline_mix(net_gfa)
+
+    # 3.2 Average sizes (centroids)
+    s_avg = sum(household_shares["small"]["range"]) / 2
+    m_avg = sum(household_shares["medium"]["range"]) / 2
+    l_avg = sum(household_shares["large"]["range"]) / 2
+
+    # 3.3 Expected average unit size
+    expected_unit_size = np.maximum(20, bs * s_avg + bm * m_avg + bl * l_avg)
+
+    # 3.4 Total units from net_gfa
+    apt_units = np.maximum(1, np.round(net_gfa / expected_unit_size)).astype(np.int64)
+
+    # 3.5 Policy (if enabled)
+    if policy is None or "apartment-condo" not in policy:
+        pct_small_max, pct_large_min = 75, 10
+    else:
+        pct_small_max, _, pct_large_min, _ = policy["apartment-condo"]
+
+    # 3.6 Baseline unit counts before constraints
+    baseline_small = (bs * apt_units).astype(np.int64)
+    baseline_large = (bl * apt_units).astype(np.int64)
+
+    # 3.7 Apply constraints
+    apt_small = np.minimum(baseline_small, (pct_small_max / 100 * apt_units).astype(np.int64))
+    apt_large = np.maximum(baseline_large, (pct_large_min / 100 * apt_units).astype(np.int64))
+    apt_medium = apt_units - apt_small - apt_large
+
+    if strict and (apartments & (apt_medium < 0)).any():
+        raise ValueError("Policy impossible: S + L > total_units")
+
+    # -------------------------------------------------------
+    # 4) COMBINE per unit model
+    # -------------------------------------------------------
+    total_units = np.where(apartments, apt_units, fixed_units)
+    S = np.where(apartments, apt_small, (table["small"][code] * fixed_units).astype(np.int64))
+    L = np.where(apartments, apt_large, (table["large"][code] * fixed_units).astype(np.int64))
+    M = total_units - S - L
+
+    # Households (deterministic): by unit size ...
+    s_f, s_s, s_o = household_shares["small"]["distribution"]
+    m_f, m_s, m_o = household_shares["medium"]["distribution"]
+    l_f, l_s, l_o = household_shares["large"]["distribution"]
+
+    fam = (S*s_f/100 + M*m_f/100 + L*l_f/100) * avg_family_size
+    sng = (S*s_s/100 + M*m_s/100 + L*l_s/100)
+    oth = (S*s_o/100 + M*m_o/100 + L*l_o/100) * 2
+
+    # ... or by the type's own distribution
+    sources = table["households"]
+    by_size = np.array([h is None for h in sources], dtype=bool)[code]
+    distributions = [
+        [0, 0, 0] if h is None else household_shares[h]["distribution"] if isinstance(h, str) else h
+        for h in sources
+    ]
+    t_f, t_s, t_o = (by_type([d[i] for d in distributions]) for i in range(3))
+
+    families = np.where(by_size, np.round(fam), np.round(total_units * t_f * avg_family_size / 100))
+    singles = np.where(by_size, np.round(sng), np.round(total_units * t_s / 100))
+    other = np.where(by_size, np.round(oth), np.round(total_units * t_o * 2 / 100))
+
+    return {
+        "small": S,
+        "medium": M,
+        "large": L,
+        "avg_unit_size": np.round(net_gfa / total_units).astype(np.int64),
+        "families": families.astype(np.int64),
+        "singles": singles.astype(np.int64),
+        "other": other.astype(np.int64),
+    }
+
+
+# UI functions moved out of the core; still reachable as sim.<name>
+_UI_MODULES = {"conceptor": "widgets", "unit_size_policy_maker": "widgets", "simulation_plot": "plots"}
+
+
+def __getattr__(name):
+    if name in _UI_MODULES:
+        return getattr(importlib.import_module(_UI_MODULES[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
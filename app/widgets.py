@@ -0,0 +1,253 @@
+# Streamlit input widgets of the projector app
+import streamlit as st
+
+import building_types
+
+
+# --------- conceptor ------------
+def conceptor(lin=1):
+
+    #LOCAT (volume and project size titles per building type are in its registry)
+    num_of_con_companies_title = ["Samanaikainen tuotanto","Paraller construction"]
+    pre_con_and_sim_time_title = ['Esirakentamisaika','Pre-construction time']
+    unit_size_policy_selection = ['Käytä asuntokoon ohjauspolitiikkaa','Apply unit size policy']
+
+    #helps
+    vol_help = ['Kokonaismitoitus ja hankekoko kerrosalaneliömetreissä (kem²)','Total volume and project size as Gross Floor Area square meters (GFAm²)']
+    num_of_con_companies_help = ["Samanaikaisesti toteutuvien hakkeiden lukumäärä vuodessa",
+                                "Number of parallel on-going implementation projects yearly"]
+    pre_con_and_sim_time_help = ['Aseta infrastruktuurin esirakentamisaika',
+                                'Set pre-construction time for infrastructure']
+
+    basic_conceptor_title = ["Perusasetukset","Basic settings"]
+    enh_conceptor_title = ["Lisäasetukset","Advanced settings"]
+
+    # defaults (per building type: the registry's conceptor entry)
+    max_volume = 100000
+
+    total_gfa_volumes = {}
+    project_sizes = {}
+    with st.expander(basic_conceptor_title[lin],expanded=True):
+        s1,s2 = st.columns(2)    
+        for i, (building_type, spec) in enumerate(building_types.TYPES.items()):
+            ui = spec["conceptor"]
+            if ui is None:
+                continue
+            vol_title, pro_title = ui["titles"]
+            default_volume, volume_step = ui["volume"]
+            total_gfa_volumes[building_type] = s1.slider(vol_title[lin], 0, max_volume, default_volume, step=volume_step,
+                                                         help=vol_help[lin] if i == 0 else None)
+            project_sizes[building_type] = s2.slider(pro_title[lin], *ui["project"])
+        num_comp = s1.slider(num_of_con_companies_title[lin], 1, 5, 3, step=1,
+                                help=num_of_con_companies_help[lin])
+        # `pre_con_sim_time` is pre-construction time (years) for enabling roads, utilities etc.
+        pre_con_sim_time = s2.slider(pre_con_and_sim_time_title[lin], 1, 9, 3, step=1,
+                                        help=pre_con_and_sim_time_help[lin])
+
+    with st.expander(enh_conceptor_title[lin],expanded=False):
+
+        lang = "FIN" if lin==0 else "ENG"
+
+        TITLE_TRANSLATIONS = {
+            "size_range": {
+                "FIN": "Kokohaarukka",
+                "ENG": "Size range"
+            },
+            "families": {
+                "FIN": "Perheet (%)",
+                "ENG": "Families (%)"
+            },
+            "singles": {
+                "FIN": "Sinkut (%)",
+                "ENG": "Singles (%)"
+            },
+            "others": {
+                "FIN": "Muut (%)",
+                "ENG": "Other households (%)"
+            },
+            "small_apartments": {
+                "FIN": "Pienet asunnot",
+                "ENG": "Small apartments"
+            },
+            "medium_apartments": {
+                "FIN": "Keskikokoiset asunnot",
+                "ENG": "Medium apartments"
+            },
+            "large_apartments": {
+                "FIN": "Isot asunnot",
+                "ENG": "Large apartments"
+            },
+            "family_houses": {
+                "FIN": "Omakotitalot",
+                "ENG": "Family houses"
+            }
+        }
+
+        def t(key: str, lang: str = "FIN") -> str:
+            return TITLE_TRANSLATIONS.get(key, {}).get(lang, key)
+
+
+        
+        house_hold_shares_estimates_default = {
+            "small_apartments": {"size_range": [20, 40], "distribution": [0, 90, 10]},
+            "medium_apartments": {"size_range": [40, 70], "distribution": [20, 60, 20]},
+            "large_apartments": {"size_range": [70, 120], "distribution": [90, 0, 10]},
+            "family_houses": {"size_range": [100, 200], "distribution": [95, 0, 5]}
+        }
+
+        cols = st.columns(2)
+        updated_values = {}
+
+        for idx, (apt_type, vals) in enumerate(house_hold_shares_estimates_default.items()):
+            
+            col = cols[idx % 2]
+            title = t(apt_type, lang)
+
+            # Display default size range as static text (non-editable)
+            smin, smax = vals["size_range"]
+            col.write(f"{title} — {t('size_range', lang)}: **{smin} - {smax} m²**")
+
+            dist = vals["distribution"]
+
+            # Families slider
+            families = col.slider(
+                f"{title} — {t('families', lang)}",
+                min_value=0, max_value=100,
+                value=dist[0], step=5
+            )
+
+            # Singles slider
+            max_singles = 100 - families
+            singles = col.slider(
+                f"{title} — {t('singles', lang)}",
+                min_value=0, max_value=max_singles,
+                value=min(dist[1], max_singles),
+                step=5
+            )
+
+            # Automatically computed "others"
+            others = 100 - families - singles
+
+            # Show as label instead of slider
+            col.write(f"{t('others', lang)}: **{others}%**")
+
+            distribution = [families, singles, others]
+
+            dist_sum = sum(distribution)
+
+            if dist_sum > 100:
+                col.error(f"{title}: {dist_sum}% > 100%")
+
+            updated_values[apt_type] = {
+                "size_range": [smin, smax],
+                "distribution": [families, singles, others]
+            }
+
+        enh1, enh2 = st.columns(2)
+        #avg_family_size
+        avg_family_size_slider_text = ['Keskimääräinen perhekoko','Average family size']
+        avg_family_size = enh1.slider(avg_family_size_slider_text[lin], 2.0, 6.0, 3.5, step=0.1)
+        #apartment_efficiency_factor
+        apartment_efficiency_factor_slider_text = ['Kerrostalotuotannon tehokkuuskerroin','Apartment efficiency factor']
+        apartment_efficiency_factor = enh2.slider(apartment_efficiency_factor_slider_text[lin], 0.7, 0.9, 0.8, step=0.05,
+                                                help=['Kerrostalojen kerrosalan muuntosuhde huoneistoneliömetreiksi, joiden perusteella laskenta tehdään.',
+                                                      'Conversion factor from apartment buildings GFA to net residential floor area, based on which the calculation is made.'][lin])
+
+        # ---- update values ----
+        # Translate UI outputs into model-compatible household distribution structure
+        house_hold_shares_estimates = {
+            "small": {
+                "range": updated_values["small_apartments"]["size_range"],
+                "distribution": updated_values["small_apartments"]["distribution"],
+            },
+            "medium": {
+                "range": updated_values["medium_apartments"]["size_range"],
+                "distribution": updated_values["medium_apartments"]["distribution"],
+            },
+            "large": {
+                "range": updated_values["large_apartments"]["size_range"],
+                "distribution": updated_values["large_apartments"]["distribution"],
+            },
+            "family_houses": {
+                "range": updated_values["family_houses"]["size_range"],
+                "distribution": updated_values["family_houses"]["distribution"],
+            },
+        }
+
+    # prepare building..
+
+    # --- subfunc to gen project groups from volumes ---
+    def generate_projects(total_volumes: dict, project_sizes: dict):
+        buildings = []
+
+        for building_type, total_volume in total_volumes.items():
+            avg_project_size = project_sizes[building_type]
+            num_projects = total_volume // avg_project_size
+
+            # identical projects as one (type, gfa, count) group
+            if num_projects > 0:
+                buildings.append({
+                    'type': building_type,
+                    'gfa': avg_project_size,
+                    'count': num_projects
+                })
+        
+        return buildings
+    
+    # generate building projects from volumens
+    residential_buildings_dict = generate_projects(total_gfa_volumes,project_sizes)
+    
+    if residential_buildings_dict is not None and len(residential_buildings_dict) > 0:
+        use_unit_size_policy = st.checkbox(unit_size_policy_selection[lin])
+        if use_unit_size_policy:
+            my_unit_size_policy = unit_size_policy_maker(lin=lin)
+        else:
+            my_unit_size_policy = None
+    
+    return residential_buildings_dict, my_unit_size_policy, pre_con_sim_time, num_comp, house_hold_shares_estimates, avg_family_size, apartment_efficiency_factor
+
+def unit_size_policy_maker(lin=1):
+            
+    #LOCAT
+    policy_input_title = ['Politiikkamuotoilu','Policy statement']
+    policy_statements = [[["Asuntoja, jotka ovat **alle** (m2)...","..saa olla enintään (%)"],
+                        ["Asuntoja, jotka ovat **yli** (m2)...","..tulee olla vähintään (%)"]],
+                        [["Units which are **below** (m2)...","..may be at most (%)"],
+                        ["Units which are **above** (m2)...","..must be at least (%)"]]]
+
+    with st.container(border=True):
+        st.markdown(policy_input_title[lin])
+
+        col1, col2 = st.columns(2)
+
+        with col1:
+            with st.container(border=True):
+                size1 = st.slider(
+                    policy_statements[lin][0][0],
+                    20, 60, 30, step=5,
+                    )
+                pct1 = st.slider(
+                    policy_statements[lin][0][1],
+                    10, 80, 50, step=5
+                    )
+
+        with col2:
+            with st.container(border=True):
+                size2 = st.slider(
+                    policy_statements[lin][1][0],
+                    60, 120, 70, step=5
+                    )
+                pct2 = st.slider(
+                    policy_statements[lin][1][1],
+                    0, 100-pct1, int(round(((100-pct1)/2)/5)*5), step=5
+                    )
+
+    if pct1 + pct2 > 100:
+        st.stop()
+
+    my_policy_nums = [pct1, size1, pct2, size2]
+
+    my_unit_size_policy = {
+        'apartment-condo': [my_policy_nums[0], my_policy_nums[1], my_policy_nums[2], my_policy_nums[3]]
+    }
+    return my_unit_size_policy
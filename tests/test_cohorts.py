@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+import cohorts
+import sim
+
+ARGS = {"buildings": [{"type": "apartment-condo", "gfa": 4000, "count": 20}, {"type": "one-family-house", "gfa": 150, "count": 40},
+                      {"type": "multi-family-house", "gfa": 800, "count": 10}],
+        "pre_con_time": 2, "base_year": 2030}
+STATIC = {"tfr": 0, "mortality": (-50, 0)}   # no births, no deaths
+
+
+@pytest.fixture(scope="module")
+def table():
+    return sim.main_sim(ARGS, engine="listsched", output="table")["body"]
+
+
+def cumulative_inflow(cube, n_years):
+    return np.stack([
+        np.cumsum(np.bincount(cube.years - cube.years.min(), weights=cube.totals(h), minlength=n_years))
+        for h in cohorts.HOUSEHOLDS
+    ], axis=-1)
+
+
+@pytest.mark.parametrize("turnover", [0, 0.08])
+def test_households_are_conserved_without_births_and_deaths(table, turnover):
+    # movers are replaced, so only births and deaths change the head count
+    cube = sim.aggregate(table)
+    result = cohorts.cohort_projection(cube, rates={**STATIC, "turnover": turnover, "turnover_young": turnover})
+    assert np.allclose(result["population"].sum(axis=-1), cumulative_inflow(cube, len(result["years"])))
+
+
+def test_residents_age_one_year_per_year():
+    profiles = cohorts.age_profiles()
+    transition = cohorts.transition_matrices(profiles, {**STATIC, "turnover": 0, "turnover_young": 0})
+    inflow = np.zeros((3, len(cohorts.HOUSEHOLDS)))
+    inflow[0, 0] = 100
+    population = cohorts.evolve(inflow, transition, profiles)
+    assert np.allclose(population[2, 0, 2:], population[0, 0, :-2])
+    assert np.isclose(population[2, 0, -1], population[0, 0, -3:].sum())
+
+
+def test_sub_annual_cubes_project_like_the_yearly_cube(table):
+    yearly = cohorts.cohort_projection(sim.aggregate(table))
+    monthly = cohorts.cohort_projection(sim.aggregate(table, "month"))
+    assert np.array_equal(monthly["years"], yearly["years"])
+    assert np.allclose(monthly["population"], yearly["population"])
+
+
+def test_batched_evolve_equals_one_series_at_a_time():
+    profiles = cohorts.age_profiles()
+    transition = cohorts.transition_matrices(profiles)
+    inflow = np.random.default_rng(0).random((4, 20, len(cohorts.HOUSEHOLDS))) * 100
+    batched = cohorts.evolve(inflow, transition, profiles)
+    for i in range(len(inflow)):
+        assert np.allclose(batched[i], cohorts.evolve(inflow[i], transition, profiles))
+
+
+def test_band_totals(table):
+    result = cohorts.cohort_projection(sim.aggregate(table))
+    everyone = cohorts.band_totals(result, {"all": (0, 100)})["all"]
+    assert np.allclose(everyone, result["population"].sum(axis=(-1, -2)))
+    bands = cohorts.band_totals(result)
+    assert set(bands) == set(cohorts.AGE_BANDS)
+    assert (sum(bands.values()) <= everyone + 1e-9).all()
+
+
+def test_empty_cube():
+    empty = sim.YearlyCube([], [], np.zeros((0, 0, len(sim.CUBE_METRICS))))
+    assert cohorts.cohort_projection(empty)["population"].shape == (0, len(cohorts.HOUSEHOLDS), len(cohorts.AGES))
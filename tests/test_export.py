@@ -0,0 +1,58 @@
+import io
+
+import pandas as pd
+import pytest
+
+import export
+import sim
+
+ARGS = {"buildings": [{"type": "apartment-condo", "gfa": 4000, "count": 20},
+                      {"type": "one-family-house", "gfa": 150, "count": 40}],
+        "pre_con_time": 2, "num_companies": 2, "base_year": 2030}
+
+
+def read(data, fmt):
+    if fmt == "csv":
+        return pd.read_csv(io.BytesIO(data))
+    if fmt == "parquet":
+        return pd.read_parquet(io.BytesIO(data))
+    if fmt == "arrow":
+        import pyarrow as pa
+        return pa.ipc.open_file(pa.BufferReader(data)).read_pandas()
+    return pd.read_excel(io.BytesIO(data))
+
+
+def skip_unavailable(fmt):
+    if fmt not in export.available_formats():
+        pytest.skip(f"{fmt} dependency not installed")
+
+
+@pytest.mark.parametrize("fmt", list(export.FORMATS))
+def test_cube_round_trip(fmt):
+    skip_unavailable(fmt)
+    df = sim.main_sim(ARGS, engine="listsched", output="table", aggregate=True)["cube"].to_frame()
+    pd.testing.assert_frame_equal(read(export.to_bytes(df, fmt), fmt), df, check_dtype=False)
+
+
+@pytest.mark.parametrize("fmt", list(export.FORMATS))
+def test_streamed_years_equal_the_whole_table(fmt, tmp_path):
+    skip_unavailable(fmt)
+    frames = [chunk["body"].to_frame() for chunk in sim.main_sim_iter(ARGS, output="table")]
+    path = tmp_path / f"projection.{export.FORMATS[fmt]['extension']}"
+    rows = export.write_stream(iter(frames), path, fmt)
+
+    whole = sim.main_sim(ARGS, engine="listsched", output="table")["body"].to_frame()
+    assert rows == len(whole) and len(frames) > 1
+    pd.testing.assert_frame_equal(read(path.read_bytes(), fmt), whole, check_dtype=False)
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        export.to_bytes(pd.DataFrame({"a": [1]}), "dbf")
+
+
+def test_missing_dependency_is_an_import_error(monkeypatch):
+    monkeypatch.setattr(export, "openpyxl", None)
+    assert "xlsx" not in export.available_formats()
+    with pytest.raises(ImportError):
+        export.to_bytes(pd.DataFrame({"a": [1]}), "xlsx")
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+import cohorts
+import impacts
+import sim
+
+ARGS = {"buildings": [{"type": "apartment-condo", "gfa": 4000, "count": 20}, {"type": "one-family-house", "gfa": 150, "count": 40},
+                      {"type": "senior-housing", "gfa": 3000, "count": 2}],
+        "pre_con_time": 2, "base_year": 2030}
+
+
+def run(args):
+    response = sim.main_sim(args, engine="listsched", output="table", aggregate=True)
+    return response["cube"], response["impacts"]
+
+
+def per_type(cube, coefficients):
+    return np.array([coefficients.get(t, 0.0) for t in cube.types])
+
+
+def test_indicators_are_weighted_cube_metrics():
+    cube, indicators = run(ARGS)
+    assert list(indicators.metrics) == list(impacts.KERNELS)
+    assert np.array_equal(indicators.years, cube.years) and indicators.types == cube.types
+
+    per_m2 = impacts.KERNELS["embodied_carbon"]["coefficients"]["per_m2"]
+    assert np.allclose(indicators.metric("embodied_carbon"), cube.metric("volume") * per_type(cube, per_m2))
+
+    # stock kernels accumulate over the years
+    per_resident = impacts.KERNELS["tax_revenue"]["coefficients"]["per_resident"]
+    stock = sum(np.cumsum(cube.metric(h), axis=0) * per_resident[h] for h in cohorts.HOUSEHOLDS)
+    assert np.allclose(indicators.metric("tax_revenue"), stock)
+
+
+def test_overrides_merge_per_type_values():
+    _, default = run(ARGS)
+    cube, overridden = run(dict(ARGS, impacts={"embodied_carbon": {"per_m2": {"apartment-condo": 0.8}}}))
+    apartments = cube.types.index("apartment-condo")
+    others = [i for i in range(len(cube.types)) if i != apartments]
+    carbon = default.metric("embodied_carbon"), overridden.metric("embodied_carbon")
+    assert np.allclose(carbon[1][:, apartments], 2 * carbon[0][:, apartments])
+    assert np.allclose(carbon[1][:, others], carbon[0][:, others])
+    assert np.allclose(overridden.metric("tax_revenue"), default.metric("tax_revenue"))
+
+
+@pytest.mark.parametrize("overrides", [{"helicopters": {}}, {"school_pupils": {"per_m2": 1}}])
+def test_unknown_kernels_and_coefficients_are_rejected(overrides):
+    with pytest.raises(ValueError):
+        run(dict(ARGS, impacts=overrides))
+
+
+def test_registered_kernels_become_indicators(monkeypatch):
+    monkeypatch.setattr(impacts, "KERNELS", dict(impacts.KERNELS))
+    impacts.kernel("dwellings", basis="stock", unit="units", per_unit=1.0)(lambda c: {"units": c["per_unit"]})
+    cube = run(ARGS)[0]
+    names, values = impacts.evaluate(cube.values, cube.types, cube.metrics)
+    assert names[-1] == "dwellings"
+    assert np.allclose(values[:, :, -1], np.cumsum(cube.metric("units"), axis=0))
+
+
+def test_cohort_totals_replace_the_static_service_kernels():
+    cube, indicators = run(ARGS)
+    residents = cohorts.cohort_projection(cube)
+    static = impacts.totals(indicators)
+    dynamic = impacts.totals(indicators, residents, {"daycare_children": {"participation": 0.5}})
+    bands = cohorts.band_totals(residents)
+    rows = np.searchsorted(residents["years"], indicators.years)
+
+    assert np.allclose(dynamic["school_pupils"], bands["school"][rows])
+    assert np.allclose(dynamic["daycare_children"], 0.5 * bands["daycare"][rows])
+    assert np.allclose(dynamic["tax_revenue"], static["tax_revenue"])
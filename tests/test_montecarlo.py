@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+import montecarlo
+import sim
+
+ARGS = {
+    "buildings": [{"type": "apartment-condo", "gfa": 4000, "count": 20},
+                  {"type": "one-family-house", "gfa": 150, "count": 40},
+                  {"type": "multi-family-house", "gfa": 800, "count": 10}],
+    "pre_con_time": 2, "num_companies": 2, "base_year": 2030,
+    "unit_size_policy": {"apartment-condo": [50, 30, 25, 70]},
+}
+CERTAIN = {"duration_sigma": 0, "delay_sigma": 0, "share_concentration": 0}
+
+
+@pytest.mark.parametrize("phases", [False, True])
+def test_zero_uncertainty_equals_main_sim(phases):
+    args = dict(ARGS)
+    if phases:
+        args["phases"] = [{"name": "A", "pre_con_time": 1}, {"name": "B", "pre_con_time": 2, "after": "A"}]
+        args["buildings"] = [dict(b, phase=phase) for b, phase in zip(ARGS["buildings"], "ABA")]
+    cube = sim.main_sim(args, engine="listsched", output="table", aggregate=True)["cube"]
+    bands = montecarlo.main_sim_mc(args, replications=7, uncertainty=CERTAIN, workers=1)
+
+    first = int(np.argmax(cube.totals("volume") > 0))
+    assert list(bands["years"]) == list(cube.years[first:])
+    for p in range(len(bands["percentiles"])):
+        for m in montecarlo.HOUSEHOLDS:
+            assert np.allclose(bands[m][p], cube.cumulative(m)[first:]), m
+        columns = [cube.types.index(t) for t in bands["types"]]
+        assert np.allclose(bands["volume"][p], cube.metric("volume")[first:, columns])
+
+
+def test_replications_are_seeded_and_independent_of_workers():
+    a = montecarlo.main_sim_mc(ARGS, replications=600, seed=3, workers=1)
+    b = montecarlo.main_sim_mc(ARGS, replications=600, seed=3, workers=2)
+    c = montecarlo.main_sim_mc(ARGS, replications=600, seed=4, workers=1)
+    assert np.array_equal(a["population"], b["population"]) and np.array_equal(a["volume"], b["volume"])
+    assert not np.array_equal(a["population"], c["population"])
+
+
+def test_timing_uncertainty_keeps_the_final_population():
+    bands = montecarlo.main_sim_mc(ARGS, replications=500, uncertainty={"share_concentration": 0}, workers=1)
+    cube = sim.main_sim(ARGS, engine="listsched", output="table", aggregate=True)["cube"]
+    assert (np.diff(bands["population"], axis=0) >= 0).all()
+    assert np.allclose(bands["population"][:, -1], sum(cube.totals(m).sum() for m in montecarlo.HOUSEHOLDS))
+    assert (bands["population"][0] < bands["population"][-1]).any()
@@ -0,0 +1,67 @@
+import pytest
+
+import policy_solver
+import sim
+
+ARGS = {
+    "buildings": [{"type": "apartment-condo", "gfa": 4000, "count": 20}, {"type": "one-family-house", "gfa": 150, "count": 40},
+                  {"type": "multi-family-house", "gfa": 800, "count": 10}, {"type": "apartment-condo", "gfa": 2500, "count": 5}],
+    "pre_con_time": 2, "num_companies": 2, "base_year": 2030,
+}
+POPULATION = ("families", "singles", "other")
+
+
+@pytest.fixture(scope="module")
+def outcomes():
+    # (cost, pct_small_max, pct_large_min, cube) of every feasible expressible policy
+    found = []
+    for small in policy_solver.PCT_SMALL_MAX:
+        for large in policy_solver.PCT_LARGE_MIN:
+            if small + large > 100:
+                continue
+            args = dict(ARGS, unit_size_policy={"apartment-condo": [small, 30, large, 70]})
+            try:
+                cube = sim.main_sim(args, engine="listsched", output="table", aggregate=True)["cube"]
+            except ValueError:
+                continue
+            found.append((policy_solver.policy_cost(small, large), small, large, cube))
+    return found
+
+
+def brute_force(outcomes, year, families=None, population=None):
+    costs = []
+    for cost, small, large, cube in outcomes:
+        done = cube.years <= year
+        f = cube.totals("families")[done].sum()
+        p = sum(cube.totals(m)[done].sum() for m in POPULATION)
+        if (families is None or f >= families) and (population is None or p >= population):
+            costs.append(cost)
+    return min(costs, default=None)
+
+
+@pytest.mark.parametrize("year, families, population", [
+    (2040, 1500, None), (2045, None, 3000), (2060, 2500, 3500), (2036, 800, None), (2060, 99999, None),
+])
+def test_solver_matches_brute_force(outcomes, year, families, population):
+    result = policy_solver.solve_policy(ARGS, year=year, families=families, population=population)
+    expected = brute_force(outcomes, year, families, population)
+    if expected is None:
+        assert result["policy"] is None
+        return
+    assert result["cost"] == expected
+    assert result["pct_small_max"] + result["pct_large_min"] <= 100
+
+    # the returned policy reaches the targets in main_sim
+    cube = sim.main_sim(dict(ARGS, unit_size_policy=result["policy"]), engine="listsched", output="table",
+                        aggregate=True)["cube"]
+    done = cube.years <= year
+    assert families is None or cube.totals("families")[done].sum() >= families
+    assert population is None or sum(cube.totals(m)[done].sum() for m in POPULATION) >= population
+
+
+def test_only_expressible_policies_are_returned():
+    args = {"buildings": [{"type": "apartment-condo", "gfa": 3000, "count": 20}], "base_year": 2030}
+    base = sim.main_sim(args, output="table", aggregate=True)["cube"].totals("families").sum()
+    result = policy_solver.solve_policy(args, families=1.4 * base)
+    assert result["pct_small_max"] + result["pct_large_min"] <= 100
+    assert result["families"] >= 1.4 * base
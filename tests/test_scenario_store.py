@@ -0,0 +1,76 @@
+import datetime
+import time
+
+import numpy as np
+import pytest
+
+import scenario_store
+import sim
+
+ARGS = {"buildings": [{"type": "apartment-condo", "gfa": 4000, "count": 20},
+                      {"type": "one-family-house", "gfa": 150, "count": 40}],
+        "pre_con_time": 2, "num_companies": 2, "base_year": 2030}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = scenario_store.ScenarioStore(str(tmp_path / "runs.sqlite"))
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def helsinki(monkeypatch):
+    # a host clock ahead of UTC
+    monkeypatch.setenv("TZ", "Europe/Helsinki")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_fetch_or_compute_stores_the_main_sim_cube(store):
+    first = store.fetch_or_compute(ARGS, label="base")
+    second = store.fetch_or_compute(ARGS)
+    assert not first["cached"] and second["cached"] and first["hash"] == second["hash"]
+
+    reference = sim.main_sim(ARGS, engine="listsched", output="table", aggregate=True)["cube"]
+    assert np.array_equal(second["cube"].years, reference.years)
+    assert second["cube"].types == reference.types
+    assert np.allclose(second["cube"].values, reference.values)
+    assert set(store.run(first["hash"])["timings"]) >= {"construction", "allocation", "aggregation"}
+
+
+def test_runs_persist_across_connections(tmp_path):
+    path = str(tmp_path / "runs.sqlite")
+    store = scenario_store.ScenarioStore(path)
+    key = store.fetch_or_compute(ARGS)["hash"]
+    store.close()
+    reopened = scenario_store.ScenarioStore(path)
+    assert key in reopened and reopened.fetch_or_compute(ARGS)["cached"]
+    reopened.close()
+
+
+def test_query_filters_and_delete(store):
+    base = store.fetch_or_compute(ARGS, label="base")["hash"]
+    store.fetch_or_compute({**ARGS, "num_companies": 3, "unit_size_policy": {"apartment-condo": [50, 30, 25, 70]}},
+                           label="policy")
+
+    runs = store.query(num_companies=3)
+    assert runs["label"].tolist() == ["policy"] and runs["pct_small_max"].tolist() == [50]
+    with pytest.raises(ValueError):
+        store.query(foo=1)
+
+    assert list(store.compare([base]).columns) == ["base"]
+    store.delete(base)
+    assert base not in store and len(store) == 1
+
+
+def test_query_date_bounds_in_local_time(store, helsinki):
+    store.fetch_or_compute(ARGS)
+    now = datetime.datetime.now()   # naive local time, UTC+2/+3 here
+    minute = datetime.timedelta(minutes=1)
+    assert len(store.query(since=now - minute)) == 1
+    assert len(store.query(until=now - minute)) == 0
+    assert len(store.query(since=(now - minute).isoformat(), until=now + minute)) == 1
+    assert len(store.query(since=datetime.datetime.now(datetime.timezone.utc) + minute)) == 0
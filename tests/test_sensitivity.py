@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+import sensitivity
+import sim
+
+# sizes off the conceptor slider steps, as API input may have
+ARGS = {
+    "buildings": [{"type": "apartment-condo", "gfa": 4500, "count": 10},
+                  {"type": "one-family-house", "gfa": 125, "count": 40},
+                  {"type": "multi-family-house", "gfa": 800, "count": 6}],
+    "pre_con_time": 2,
+    "base_year": 2030,
+}
+
+
+def main_sim_population(args, years):
+    cube = sim.main_sim(args, engine="listsched", output="table", aggregate=True)["cube"]
+    cumulative = sum(cube.totals(m) for m in ("families", "singles", "other")).cumsum()
+    return np.interp(years, cube.years, cumulative, left=0, right=cumulative[-1])
+
+
+def scenario(values, r):
+    # main_sim args of design row r
+    params = sim.normalize_args(ARGS)
+    shares = {size: dict(share) for size, share in params["household_shares_estimates"].items()}
+    for size in ("medium", "large"):
+        p = np.array(shares[size]["distribution"], dtype=np.float64)
+        family = values[f"household_shares.{size}"][r]
+        shares[size]["distribution"] = [family, *(p[1:] / p[1:].sum() * (p.sum() - family))]
+    return {
+        **ARGS,
+        "avg_family_size": values["avg_family_size"][r],
+        "apt_efficiency": values["apt_efficiency"][r],
+        "num_companies": int(values["num_companies"][r]),
+        "pre_con_time": int(values["pre_con_time"][r]),
+        "household_shares_estimates": shares,
+        "buildings": sensitivity._sized_buildings(params["buildings"], values["project_size_scale"][r]),
+    }
+
+
+def test_evaluate_matches_main_sim():
+    problem = {**sensitivity.DEFAULT_PROBLEM, "pre_con_time": (0, 3)}
+    design = np.random.default_rng(1).random((8, len(problem)))
+    years, population = sensitivity.evaluate(ARGS, problem, design, workers=1)
+    values = sensitivity._factor_values(problem, design)
+    for r in range(len(design)):
+        assert np.allclose(population[r], main_sim_population(scenario(values, r), years))
+
+
+def test_evaluate_keeps_portfolio_without_size_factor():
+    years, population = sensitivity.evaluate(ARGS, {"avg_family_size": (3.5, 3.5)}, np.zeros((2, 1)), workers=1)
+    expected = main_sim_population(dict(ARGS, avg_family_size=3.5), years)
+    assert np.allclose(population, expected)
+
+
+@pytest.mark.parametrize("factor", ["base_year", "engine", "buildings", "household_shares.huge"])
+def test_evaluate_rejects_factors_it_does_not_apply(factor):
+    with pytest.raises(ValueError):
+        sensitivity.evaluate(ARGS, {factor: (0, 1)}, np.zeros((1, 1)), workers=1)
+
+
+def test_sobol_indices_of_a_constant_factor_are_zero():
+    result = sensitivity.sobol(ARGS, {"avg_family_size": (2.0, 4.0), "apt_efficiency": (0.8, 0.8)}, n=64, workers=1)
+    assert result["evaluations"] == 64 * 4
+    assert np.allclose(result["S1"][1], 0) and np.allclose(result["ST"][1], 0)
+    assert (result["ST"][0, result["ST"][0] > 0] > 0.9).all()
@@ -0,0 +1,120 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import service
+import sim
+from service import LocalClient, SimulationService
+
+BUILDINGS = [{"type": "apartment-condo", "gfa": 5000, "count": 6}]
+ARGS = {"buildings": BUILDINGS, "base_year": 2030}
+
+
+@pytest.fixture
+def client():
+    svc = SimulationService(processes=False, max_workers=2, max_queue=1)
+    yield LocalClient(svc)
+    svc.shutdown()
+
+
+@pytest.fixture
+def blocked(monkeypatch):
+    # worker runs that wait for release.set()
+    release = threading.Event()
+
+    def run_simulation(request):
+        release.wait(5)
+        return {"body": []}
+
+    monkeypatch.setattr(service, "run_simulation", run_simulation)
+    yield release
+    release.set()
+
+
+def test_simulate_returns_main_sim_records(client):
+    status, data = client.post("/simulate", {"args": ARGS, "aggregate": True})
+    expected = sim.main_sim(dict(ARGS, engine="listsched"), aggregate=True)
+    assert status == 200
+    assert data["body"] == expected["body"] and data["cube"] == expected["cube"]
+    assert data["hash"] == sim.args_hash(dict(ARGS, engine="listsched"))
+
+
+def test_batch_runs_in_request_order(client):
+    status, data = client.post("/simulate/batch", {"runs": [{"args": ARGS}, {"args": dict(ARGS, num_companies=3)}]})
+    assert status == 200
+    assert [r["body"] for r in data["results"]] == [
+        sim.main_sim(dict(ARGS, engine="listsched", num_companies=n))["body"] for n in (1, 3)
+    ]
+
+
+@pytest.mark.parametrize("args", [
+    {"foo": 1},
+    {"buildings": [{"type": "apartment-condo", "gfa": 0}]},
+    {"buildings": [{"type": "apartment-condo", "gfa": 100, "count": -1}]},
+    {"buildings": [{"type": "apartment-condo", "gfa": 100, "floors": 3}]},
+    {"buildings": BUILDINGS, "unit_size_policy": {"apartment-condo": [50, None, "x", 70]}},
+    {"buildings": BUILDINGS, "unit_size_policy": {"apartment-condo": [80, 30, 90, 70]}},
+    {"buildings": BUILDINGS, "construction_times": {"apartment-condo": 5}},
+    {"buildings": BUILDINGS, "household_shares_estimates": {"small": 1}},
+    {"buildings": [{"type": "apartment-condo", "gfa": 100, "phase": "B"}], "phases": [{"name": "A"}]},
+    {"buildings": BUILDINGS, "phases": [{"name": "A", "after": "B"}]},
+    {"buildings": BUILDINGS, "impacts": {"helicopters": {}}},
+    {"buildings": BUILDINGS, "impacts": {"school": {"no_such_coefficient": 1}}},
+    {"buildings": BUILDINGS, "engine": "quantum"},
+])
+def test_invalid_args_are_422(client, args):
+    status, data = client.post("/simulate", {"args": args})
+    assert status == 422 and data["error"]
+
+
+def test_batch_larger_than_capacity_is_422(client):
+    status, data = client.post("/simulate/batch", {"runs": [{"args": ARGS}] * 4})
+    assert status == 422 and "1..3" in data["error"]
+
+
+def test_routing_errors(client):
+    assert client.get("/nope")[0] == 404
+    assert client.get("/simulate")[0] == 405
+    assert client.get("/health") == (200, {"status": "ok", "pending": 0, "workers": 2})
+
+
+def test_full_queue_is_429(blocked):
+    async def scenario():
+        svc = SimulationService(processes=False, max_workers=1, max_queue=0)
+        client = LocalClient(svc)
+        first = asyncio.ensure_future(client.request("POST", "/simulate", {"args": ARGS}))
+        while svc.pending == 0:
+            await asyncio.sleep(0.01)
+        second = await client.request("POST", "/simulate", {"args": ARGS})
+        blocked.set()
+        result = await first, second
+        svc.shutdown()
+        return result
+
+    first, second = asyncio.run(scenario())
+    assert first[0] == 200 and second[0] == 429
+
+
+def test_timeout_is_504_and_keeps_the_slot_until_the_run_ends(blocked):
+    svc = SimulationService(processes=False, max_workers=1, max_queue=0, timeout=0.05)
+    status, _ = LocalClient(svc).post("/simulate", {"args": ARGS})
+    assert status == 504 and svc.pending == 1
+    blocked.set()
+    svc.shutdown()
+    for _ in range(100):
+        if svc.pending == 0:
+            break
+        time.sleep(0.01)
+    assert svc.pending == 0
+
+
+def test_worker_errors_are_json_500(client, monkeypatch):
+    def run_simulation(request):
+        raise KeyError("boom")
+
+    monkeypatch.setattr(service, "run_simulation", run_simulation)
+    status, data = client.post("/simulate", {"args": ARGS})
+    assert status == 500 and "KeyError" in data["error"]
+    assert client.app.pending == 0
@@ -0,0 +1,126 @@
+# equivalence tests of the fast paths against their reference implementations
+import random
+
+import numpy as np
+import pytest
+
+import sim
+
+TYPES = ["one-family-house", "multi-family-house", "apartment-condo", "senior-housing"]
+
+
+def random_args(seed, phases=False):
+    rng = random.Random(seed)
+    buildings = [
+        {"type": rng.choice(TYPES), "gfa": rng.choice([50, 120, 900, 5000, rng.randint(10, 9000)]),
+         "count": rng.randint(1, 40)}
+        for _ in range(rng.randint(1, 6))
+    ]
+    args = {"buildings": buildings, "pre_con_time": rng.randint(0, 4),
+            "num_companies": rng.randint(1, 5), "base_year": 2030}
+    if phases:
+        args["phases"] = [{"name": "A", "pre_con_time": 0}, {"name": "B", "pre_con_time": rng.randint(1, 3), "after": "A"}]
+        for b in buildings:
+            b["phase"] = rng.choice(["A", "B"])
+    return args
+
+
+# -------- construction engines -------
+
+@pytest.mark.parametrize("seed", range(40))
+def test_listsched_matches_simpy(seed):
+    args = random_args(seed, phases=seed % 2 == 1)
+    reference = sim.main_sim(args, engine="simpy")["body"]
+    assert sim.main_sim(args, engine="listsched")["body"] == reference
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_listsched_flat_matches_grouped(seed):
+    args = random_args(seed)
+    flat = [{"type": b["type"], "gfa": b["gfa"]} for b in args["buildings"] for _ in range(b["count"])]
+    grouped = sim.aggregate(sim.main_sim(args, engine="listsched", output="table")["body"])
+    expanded = sim.aggregate(sim.main_sim(dict(args, buildings=flat), engine="listsched", output="table")["body"])
+    assert np.array_equal(grouped.years, expanded.years)
+    assert np.allclose(grouped.values, expanded.values)
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_main_sim_iter_matches_main_sim(seed):
+    args = random_args(seed, phases=seed % 2 == 1)
+    chunks = list(sim.main_sim_iter(args))
+    years = [chunk["year"] for chunk in chunks]
+    assert years == sorted(set(years))
+    assert [row for chunk in chunks for row in chunk["body"]] == sim.main_sim(args, engine="listsched")["body"]
+
+
+# -------- units & households -------
+
+@pytest.mark.parametrize("policy", [None, {"apartment-condo": [40, 30, 50, 80]}])
+def test_grouped_allocation_matches_expanded(policy):
+    rng = np.random.default_rng(7)
+    types = rng.choice(TYPES, 500)
+    volumes = rng.choice([120.0, 900.0, 2500.0, 3600.0, 5000.0], 500)
+    table = sim.ProjectTable.from_records([{"type": t, "volume": v} for t, v in zip(types.tolist(), volumes.tolist())])
+
+    grouped = sim.apply_unit_size_policy(table, policy=policy, avg_family_size=2.8, apt_efficiency=0.85)
+    expanded = sim.allocate_units(types, volumes, policy=policy, avg_family_size=2.8, apt_efficiency=0.85)
+    for key, values in expanded.items():
+        assert np.array_equal(grouped[key], values.astype(grouped[key].dtype)), key
+
+
+# -------- sub-annual resolution -------
+
+@pytest.mark.parametrize("resolution", ["quarter", "month"])
+@pytest.mark.parametrize("seed", range(20))
+def test_sub_annual_totals(seed, resolution):
+    table = sim.main_sim(random_args(seed), engine="listsched", output="table")["body"]
+    periods = sim.RESOLUTIONS[resolution]
+    yearly = sim.aggregate(table)
+    cube = sim.aggregate(table, resolution)
+
+    # periods sum to the yearly cube
+    assert np.allclose(cube.values.reshape(len(yearly), periods, len(cube.types), -1).sum(axis=1), yearly.values)
+
+    # brute force: one completion per project at con_day + i * con_interval
+    expected = np.zeros((len(cube), len(cube.types)))
+    for row in table.to_records():
+        if row["type"] == "none":
+            continue
+        for i in range(row["count"]):
+            day = row["con_day"] + i * row["con_interval"]
+            year = 2030 + day // sim.DAYS_PER_YEAR
+            assert year == row["con_year"]
+            key = year * periods + (day % sim.DAYS_PER_YEAR) * periods // sim.DAYS_PER_YEAR
+            expected[key - cube.years[0], cube.types.index(row["type"])] += row["volume"]
+    assert np.allclose(cube.metric("volume"), expected)
+
+
+# -------- parameter grid -------
+
+def test_main_sim_grid_matches_main_sim():
+    base = {
+        "buildings": [{"type": "apartment-condo", "gfa": 4000, "count": 20}, {"type": "one-family-house", "gfa": 150, "count": 40},
+                      {"type": "multi-family-house", "gfa": 800, "count": 10}, {"type": "apartment-condo", "gfa": 2500, "count": 5}],
+        "pre_con_time": 2, "num_companies": 2, "base_year": 2030,
+        "unit_size_policy": {"apartment-condo": [50, 30, 25, 70]},
+    }
+    axes = {"num_companies": [1, 3], "pre_con_time": [1, 3], "apt_efficiency": [0.7, 0.85],
+            "avg_family_size": [3.0, 3.5], "pct_small_max": [20, 90], "pct_large_min": [10, 80]}
+    grid = sim.main_sim_grid(base, axes)
+    assert len(grid) == 2 ** len(axes) and not grid.feasible.all()
+
+    for i, scenario in enumerate(grid.scenarios):
+        args = dict(base, **{k: v for k, v in scenario.items() if k not in sim.GRID_POLICY_AXES})
+        args["unit_size_policy"] = {"apartment-condo": [scenario["pct_small_max"], 30, scenario["pct_large_min"], 70]}
+        try:
+            cube = sim.main_sim(args, engine="listsched", output="table", aggregate=True)["cube"]
+        except ValueError:
+            assert not grid.feasible[i]
+            assert np.isnan(grid.values[i, :, :, 1:]).all()
+            continue
+        assert grid.feasible[i]
+        first = int(np.searchsorted(grid.years, cube.years[0]))
+        rows = np.arange(first, first + len(cube))
+        columns = [grid.types.index(t) for t in cube.types]
+        assert np.allclose(grid.values[i][rows][:, columns], cube.values)
+        assert not np.delete(grid.values[i], rows, axis=0).any()